@@ -0,0 +1,30 @@
+'''Micro-benchmark of dotted-key access on JsonCfg, from 1 to 5 levels of nesting.
+
+The indexed lookup (`cfg[key]`) is compared with the recursive key resolution used before
+the flat key index was introduced.
+'''
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfg
+
+
+def main():
+    for depth in range(1, 6):
+        meta = make_meta(1000, depth=depth, fanout=4)
+        cfg = JsonCfg(meta)
+        key = list(leaf_keys(meta))[-1]
+        slow_lookup = cfg._JsonCfg__get_sub_config_or_value
+
+        t_slow = bench(lambda: slow_lookup(key).get())
+        t_fast = bench(lambda: cfg[key])
+        print('depth={} key={}'.format(depth, key))
+        report('  recursive lookup', t_slow)
+        report('  indexed cfg[key]', t_fast, baseline=t_slow)
+        if depth > 1:
+            section, leaf = key.rsplit('.', 1)
+            sub_cfg = cfg[section]
+            report('  cfg[section][leaf]', bench(lambda: sub_cfg[leaf]), baseline=t_slow)
+
+
+if __name__ == '__main__':
+    main()
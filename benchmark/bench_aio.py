@@ -0,0 +1,48 @@
+'''Loading many config files with asyncio, against calling update_from_file for each file.
+
+Parsing holds the GIL, so only the time files spend waiting on storage overlaps. A loader
+sleeping 20 ms per file stands in for slow (e.g. network) storage.
+'''
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfgSchema
+from jcfg import aio, loader
+
+NUM_FILES = 16
+SLOW_READ_SECONDS = 0.02
+
+
+def main():
+    meta = make_meta(10000, depth=3)
+    schema = JsonCfgSchema(meta)
+    keys = list(leaf_keys(meta))
+    cfg = schema.create()
+
+    loader.register_loader('.slow', lambda data: (time.sleep(SLOW_READ_SECONDS), loader.loads(data, '.json'))[1])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for ext in ('.json', '.slow'):
+            paths = []
+            for idx in range(NUM_FILES):
+                path = os.path.join(tmp_dir, 'config{}{}'.format(idx, ext))
+                with open(path, 'w') as wf:
+                    json.dump({key: cfg[key] for key in keys[idx::NUM_FILES]}, wf)
+                paths.append(path)
+
+            def _sequential():
+                for path in paths:
+                    cfg.update_from_file(path)
+
+            t_seq = bench(_sequential, number=1, repeat=3)
+            report('{} {} files, update_from_file each'.format(NUM_FILES, ext), t_seq)
+            report('{} {} files, aio.update_from_files'.format(NUM_FILES, ext),
+                   bench(lambda: asyncio.run(aio.update_from_files(cfg, paths)), number=1, repeat=3), baseline=t_seq)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+'''Read throughput of AtomicJsonCfg snapshots with many reader threads and one writer.'''
+import threading
+import time
+
+from common import make_meta
+
+from jcfg import JsonCfg
+from jcfg.atomic_cfg import AtomicJsonCfg
+
+
+def _run(atomic_cfg, num_readers, with_writer, duration=1.0):
+    stop_event = threading.Event()
+    read_counts = [0] * num_readers
+    write_count = [0]
+
+    def _read(idx):
+        count = 0
+        while not stop_event.is_set():
+            for _ in range(1000):
+                atomic_cfg.snapshot.section_0.section_0.key_0
+            count += 1000
+        read_counts[idx] = count
+
+    def _write():
+        i = 0
+        while not stop_event.is_set():
+            i += 1
+            atomic_cfg.update({'section_0.section_0.key_0': i})
+            write_count[0] += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=_read, args=(i,)) for i in range(num_readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=_write))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    # the main thread may wake up late under contention, so use the actual elapsed time
+    elapsed = time.perf_counter() - start
+    return sum(read_counts) / elapsed, write_count[0] / elapsed
+
+
+def main():
+    atomic_cfg = AtomicJsonCfg(JsonCfg(make_meta(100000, depth=3)))
+    for num_readers in (1, 8, 32):
+        for with_writer in (False, True):
+            reads, writes = _run(atomic_cfg, num_readers, with_writer)
+            print('readers={:<3d} writer={:<5s} {:>14,.0f} reads/s {:>8,.0f} writes/s'.format(
+                num_readers, str(with_writer), reads, writes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+'''Startup cost of loading a saved config from json, yaml and binary (.jcfgb) files.'''
+import os
+import tempfile
+
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfg, binary
+
+
+def main():
+    tmp_dir = tempfile.TemporaryDirectory()
+    for num_keys in (1000, 100000):
+        meta = make_meta(num_keys, depth=3)
+        keys = list(leaf_keys(meta))[::max(1, num_keys // 20)][:20]
+        cfg = JsonCfg(meta)
+        paths = {}
+        for ext in ('.json', '.yaml', '.jcfgb'):
+            paths[ext] = os.path.join(tmp_dir.name, 'config' + ext)
+            cfg.save_to_file(paths[ext])
+        print('{} keys, sizes: {}'.format(num_keys, ', '.join(
+            '{} {:,} bytes'.format(ext, os.path.getsize(path)) for ext, path in paths.items())))
+        repeat = 3 if num_keys > 1000 else 5
+
+        def _update_from_file(path):
+            config = JsonCfg(meta)
+            config.update_from_file(path)
+            return [config[key] for key in keys]
+
+        t_json = bench(lambda: _update_from_file(paths['.json']), number=1, repeat=repeat)
+        report('  JsonCfg + update_from_file(.json)', t_json)
+        report('  JsonCfg + update_from_file(.yaml)',
+               bench(lambda: _update_from_file(paths['.yaml']), number=1, repeat=repeat), baseline=t_json)
+        report('  JsonCfg + update_from_file(.jcfgb)',
+               bench(lambda: _update_from_file(paths['.jcfgb']), number=1, repeat=repeat), baseline=t_json)
+
+        t_parse = bench(lambda: JsonCfg._load_flat_file(paths['.json']), number=1, repeat=repeat)
+        report('  read + parse .json', t_parse)
+        report('  read + decode .jcfgb', bench(lambda: binary.load_flat_file(paths['.jcfgb']),
+                                               number=1, repeat=repeat), baseline=t_parse)
+
+        def _read_keys():
+            view = binary.load_file(paths['.jcfgb'])
+            return [view[key] for key in keys]
+        report('  mmap .jcfgb, read 20 keys', bench(_read_keys, repeat=repeat), baseline=t_parse)
+    tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+'''Cold (parse) against warm (cached) loads of config files with update_from_file.'''
+import os
+import tempfile
+
+from common import make_meta, bench, report
+
+from jcfg import JsonCfgSchema
+
+
+def main():
+    schema = JsonCfgSchema(make_meta(100000, depth=3))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for ext in ('.json', '.yaml'):
+            config_path = os.path.join(tmp_dir, 'config' + ext)
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            schema.create().save_to_file(config_path)
+            cfg = schema.create()
+            print('{}: {:.1f} MB'.format(ext, os.path.getsize(config_path) / 1e6))
+
+            t_cold = bench(lambda: cfg.update_from_file(config_path), number=1, repeat=1 if ext == '.yaml' else 3)
+            report('  cold update_from_file', t_cold)
+            cfg.update_from_file(config_path, cache=cache_dir)
+            report('  warm update_from_file(cache=...)',
+                   bench(lambda: cfg.update_from_file(config_path, cache=cache_dir), number=1, repeat=3),
+                   baseline=t_cold)
+
+            from jcfg.cache import load_flat_config
+            report('  warm load_flat_config only',
+                   bench(lambda: load_flat_config(config_path, cache_dir=cache_dir), number=1, repeat=3),
+                   baseline=t_cold)
+
+
+if __name__ == '__main__':
+    main()
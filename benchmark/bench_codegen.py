@@ -0,0 +1,44 @@
+'''Attribute access and loading of generated config classes, against JsonCfg.'''
+import os
+import tempfile
+
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfg, loader, codegen
+
+
+def main():
+    tmp_dir = tempfile.TemporaryDirectory()
+    meta = make_meta(1000, depth=3)
+    cfg = JsonCfg(meta)
+    Config = codegen.load_classes(meta, cache_dir=tmp_dir.name)
+    generated = Config.from_dict({})
+    key = list(leaf_keys(meta))[-1]
+    first, second, third = key.split('.')
+
+    t_jcfg = bench(lambda: cfg.section_0.section_0.key_0)
+    report('JsonCfg cfg.a.b.c', t_jcfg)
+    report('generated cfg.a.b.c', bench(lambda: generated.section_0.section_0.key_0), baseline=t_jcfg)
+    t_jcfg = bench(lambda: cfg[key])
+    report('JsonCfg cfg["a.b.c"]', t_jcfg)
+    report('generated cfg["a.b.c"]', bench(lambda: generated[key]), baseline=t_jcfg)
+    t_jcfg = bench(lambda: getattr(getattr(getattr(cfg, first), second), third))
+    report('JsonCfg getattr chain', t_jcfg)
+    report('generated getattr chain', bench(lambda: getattr(getattr(getattr(generated, first), second), third)),
+           baseline=t_jcfg)
+
+    config_path = os.path.join(tmp_dir.name, 'config.json')
+    loader.dump_file(cfg.to_dict(), config_path)
+
+    def _jcfg_load():
+        config = JsonCfg(meta)
+        config.update_from_file(config_path)
+    t_jcfg = bench(_jcfg_load, repeat=3)
+    report('JsonCfg(meta) + update_from_file (1k keys)', t_jcfg)
+    report('generated from_file (1k keys)', bench(lambda: Config.from_file(config_path), repeat=3),
+           baseline=t_jcfg)
+    tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
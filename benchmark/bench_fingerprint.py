@@ -0,0 +1,33 @@
+'''Fingerprint of a config after one change, against hashing json.dumps(cfg.to_dict()).'''
+import hashlib
+import json
+
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfg
+
+
+def main():
+    for depth in (1, 3, 10):
+        meta = make_meta(100000, depth=depth)
+        cfg = JsonCfg(meta)
+        key = [k for k in leaf_keys(meta) if isinstance(cfg[k], int)][-1]
+        print('100k keys, depth {}'.format(depth))
+
+        t_dumps = bench(lambda: hashlib.sha256(json.dumps(cfg.to_dict(), sort_keys=True).encode()).hexdigest(),
+                        number=1, repeat=3)
+        report('  sha256 of json.dumps(to_dict())', t_dumps)
+        copies = iter([cfg.copy() for _ in range(3)])
+        report('  first fingerprint()', bench(lambda: next(copies).fingerprint(), number=1, repeat=3),
+               baseline=t_dumps)
+
+        cfg.fingerprint()
+
+        def _change_and_fingerprint():
+            cfg[key] += 1
+            return cfg.fingerprint()
+        report('  setitem + fingerprint()', bench(_change_and_fingerprint, repeat=3), baseline=t_dumps)
+
+
+if __name__ == '__main__':
+    main()
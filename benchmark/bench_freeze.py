@@ -0,0 +1,33 @@
+'''Benchmark of attribute access on a live JsonCfg against its frozen snapshot.'''
+from common import bench, report
+
+from jcfg import JsonCfg
+
+
+def main():
+    cfg = JsonCfg({
+        'option_int': 1,
+        'sub_config': {
+            'sub_int': 0,
+            'sub_sub_config': {
+                'leaf_key': 0,
+            },
+        },
+    })
+    snap = cfg.freeze()
+
+    t_live = bench(lambda: cfg.sub_config.sub_int)
+    report('live cfg.sub_config.sub_int', t_live)
+    report('live cfg["sub_config.sub_int"]', bench(lambda: cfg['sub_config.sub_int']), baseline=t_live)
+    report('frozen snap.sub_config.sub_int', bench(lambda: snap.sub_config.sub_int), baseline=t_live)
+
+    t_live = bench(lambda: cfg.sub_config.sub_sub_config.leaf_key)
+    report('live cfg.sub_config.sub_sub_config.leaf_key', t_live)
+    report('frozen snap.sub_config.sub_sub_config.leaf_key',
+           bench(lambda: snap.sub_config.sub_sub_config.leaf_key), baseline=t_live)
+
+    report('cfg.freeze()', bench(cfg.freeze))
+
+
+if __name__ == '__main__':
+    main()
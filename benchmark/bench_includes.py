@@ -0,0 +1,55 @@
+'''Loading a config made of hundreds of included fragments: threads and the fragment cache.'''
+import json
+import os
+import tempfile
+
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfgSchema
+from jcfg import includes
+
+NUM_FRAGMENTS = 300
+
+
+def main():
+    meta = make_meta(30000, depth=3)
+    schema = JsonCfgSchema(meta)
+    keys = list(leaf_keys(meta))
+    template = schema.create()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # every top level config includes all fragments, each fragment includes a shared base
+        fragment_paths = []
+        base = {key: template[key] for key in keys[:1000]}
+        with open(os.path.join(tmp_dir, 'base.json'), 'w') as wf:
+            json.dump(base, wf)
+        for idx in range(NUM_FRAGMENTS):
+            path = os.path.join(tmp_dir, 'fragment{}.json'.format(idx))
+            values = {key: template[key] for key in keys[idx::NUM_FRAGMENTS]}
+            values['_include'] = 'base.json'
+            with open(path, 'w') as wf:
+                json.dump(values, wf)
+            fragment_paths.append(path)
+        config_path = os.path.join(tmp_dir, 'config.json')
+        with open(config_path, 'w') as wf:
+            json.dump({'_include': [os.path.basename(p) for p in fragment_paths]}, wf)
+
+        cfg = schema.create()
+
+        def _load(workers, cached):
+            def _run():
+                if not cached:
+                    includes.clear_cache()
+                cfg.update_from_file(config_path, workers=workers)
+            return _run
+
+        t_base = bench(_load(1, False), number=1, repeat=3)
+        report('{} fragments, 1 thread, cold'.format(NUM_FRAGMENTS), t_base)
+        report('{} fragments, thread pool, cold'.format(NUM_FRAGMENTS),
+               bench(_load(None, False), number=1, repeat=3), baseline=t_base)
+        report('{} fragments, fragment cache'.format(NUM_FRAGMENTS),
+               bench(_load(None, True), number=1, repeat=3), baseline=t_base)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+'''Reloading one changed layer of a layered config, against applying all layers again.'''
+import os
+import tempfile
+
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfgSchema
+from jcfg.layers import LayeredJsonCfg
+
+
+def main():
+    meta = make_meta(10000, depth=3)
+    schema = JsonCfgSchema(meta)
+    template = schema.create()
+    keys = [k for k in leaf_keys(meta) if isinstance(template[k], int)]
+    env = {'APP__' + key.replace('.', '__').upper(): '7' for key in keys[:100]}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for idx in range(3):
+            path = os.path.join(tmp_dir, 'layer{}.json'.format(idx))
+            cfg = schema.create()
+            cfg.update({key: idx for key in keys[idx::3]})
+            cfg.save_to_file(path)
+            paths.append(path)
+
+        def _apply_all():
+            cfg = schema.create()
+            for path in paths:
+                cfg.update_from_file(path)
+            cfg.update({key: int(env['APP__' + key.replace('.', '__').upper()]) for key in keys[:100]})
+
+        t_all = bench(_apply_all, number=1, repeat=3)
+        report('parse and apply all layers again', t_all)
+
+        layers = LayeredJsonCfg(schema.create())
+        for path in paths:
+            layers.add_file(path)
+        layers.add_env('APP', environ=env)
+
+        report('reload, nothing changed', bench(layers.reload, repeat=3), baseline=t_all)
+
+        env_name = 'APP__' + keys[0].replace('.', '__').upper()
+
+        def _reload_env():
+            env[env_name] = '8' if env[env_name] == '7' else '7'
+            layers.reload()
+        report('reload, one env var changed', bench(_reload_env, repeat=3), baseline=t_all)
+
+
+if __name__ == '__main__':
+    main()
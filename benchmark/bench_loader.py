@@ -0,0 +1,48 @@
+'''Throughput (MB/s) of config file parsing: jcfg loaders against jstyleson and yaml.safe_load.'''
+import json
+
+from common import make_meta, bench
+
+from jcfg import JsonCfg
+from jcfg import loader
+
+
+def _report(name, seconds, size, baseline=None):
+    line = '{:<40s} {:>10.1f} MB/s'.format(name, size / seconds / 1e6)
+    if baseline is not None:
+        line += '  x{:.1f}'.format(baseline / seconds)
+    print(line)
+
+
+def main():
+    cfg = JsonCfg(make_meta(100000, depth=3))
+    config_dict = cfg.to_dict()
+
+    json_text = '// generated config\n' + json.dumps(config_dict, indent=4)
+    json_data = json_text.encode('utf-8')
+    print('json: {:.1f} MB'.format(len(json_data) / 1e6))
+    try:
+        import jstyleson
+    except ImportError:
+        t_base = None
+    else:
+        t_base = bench(lambda: jstyleson.loads(json_text), number=1, repeat=3)
+        _report('  jstyleson.loads', t_base, len(json_data))
+    plain_data = json_data[json_data.index(b'{'):]
+    _report('  json.loads (no comments)', bench(lambda: json.loads(plain_data), number=1, repeat=3),
+            len(json_data), baseline=t_base)
+    _report('  jcfg loader', bench(lambda: loader.loads(json_data, 'config.json'), number=1, repeat=3),
+            len(json_data), baseline=t_base)
+
+    import yaml
+    yaml_text = yaml.safe_dump(config_dict)
+    yaml_data = yaml_text.encode('utf-8')
+    print('yaml: {:.1f} MB'.format(len(yaml_data) / 1e6))
+    t_base = bench(lambda: yaml.safe_load(yaml_text), number=1, repeat=1)
+    _report('  yaml.safe_load', t_base, len(yaml_data))
+    _report('  jcfg loader', bench(lambda: loader.loads(yaml_data, 'config.yaml'), number=1, repeat=3),
+            len(yaml_data), baseline=t_base)
+
+
+if __name__ == '__main__':
+    main()
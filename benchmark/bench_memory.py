@@ -0,0 +1,35 @@
+'''Memory per key of configs, built from a config meta and created by a schema.'''
+import gc
+import tracemalloc
+
+from common import make_meta
+
+from jcfg import JsonCfg, JsonCfgSchema
+
+NUM_KEYS = 200000
+
+
+def _allocated_bytes(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = func()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0], obj
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    for depth in (1, 3, 10):
+        meta = make_meta(NUM_KEYS, depth=depth)
+        cfg_bytes, cfg = _allocated_bytes(lambda: JsonCfg(meta))
+        schema = JsonCfgSchema(meta)
+        copy_bytes, copy = _allocated_bytes(schema.create)
+        print('depth {:>2}: JsonCfg(meta) {:>7.1f} bytes/key, schema.create() {:>7.1f} bytes/key, {:.1f} MB'.format(
+            depth, cfg_bytes / NUM_KEYS, copy_bytes / NUM_KEYS, cfg_bytes / 1e6))
+        del cfg, copy, schema
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+'''parse_args with large schemas and two cli flags: argparse path against the fast path.'''
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfgSchema
+
+
+def main():
+    for num_keys in (100, 1000, 10000):
+        meta = make_meta(num_keys, depth=2)
+        schema = JsonCfgSchema(meta)
+        cfg = schema.create()
+        int_keys = [key for key in leaf_keys(meta) if isinstance(cfg[key], int)]
+        args = ['--{}'.format(int_keys[0]), '3', '--{}'.format(int_keys[-1]), '-4']
+
+        print('keys={}'.format(num_keys))
+        t_argparse = bench(lambda: cfg.parse_args(args=args), repeat=3)
+        report('  parse_args()', t_argparse)
+        report('  parse_args(fast=True)', bench(lambda: cfg.parse_args(args=args, fast=True), repeat=3),
+               baseline=t_argparse)
+
+
+if __name__ == '__main__':
+    main()
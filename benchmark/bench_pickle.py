@@ -0,0 +1,33 @@
+'''Pickle payload size and unpickle time of JsonCfg, with and without a JsonCfgSchema.'''
+import pickle
+
+from common import make_meta, bench, report
+
+from jcfg import JsonCfg, JsonCfgSchema
+
+
+def main():
+    for num_keys in (10, 1000, 10000):
+        meta = make_meta(num_keys, depth=3)
+        schema = JsonCfgSchema(meta)
+        plain_cfg = JsonCfg(meta)
+        schema_cfg = schema.create()
+        print('keys={}'.format(num_keys))
+
+        # without pickle support, configs had to be sent as dicts and rebuilt
+        data = pickle.dumps(plain_cfg.to_dict())
+        def _rebuild():
+            cfg = schema.create()
+            cfg.update(pickle.loads(data))
+        t_base = bench(_rebuild, repeat=3)
+        print('  {:<24s} {:>10,} bytes'.format('to_dict()', len(data)))
+        report('    pickle.loads + update', t_base)
+
+        for name, obj in (('plain JsonCfg', plain_cfg), ('JsonCfg from schema', schema_cfg)):
+            data = pickle.dumps(obj)
+            print('  {:<24s} {:>10,} bytes'.format(name, len(data)))
+            report('    pickle.loads', bench(lambda: pickle.loads(data), repeat=3), baseline=t_base)
+
+
+if __name__ == '__main__':
+    main()
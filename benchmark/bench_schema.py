@@ -0,0 +1,20 @@
+'''Benchmark of JsonCfg instance creation, from the config meta and from a JsonCfgSchema.'''
+from common import make_meta, bench, report
+
+from jcfg import JsonCfg, JsonCfgSchema
+
+
+def main():
+    for num_keys in (10, 1000, 100000):
+        meta = make_meta(num_keys, depth=3)
+        schema = JsonCfgSchema(meta)
+        number = 1 if num_keys >= 100000 else None
+
+        t_meta = bench(lambda: JsonCfg(meta), number=number, repeat=3)
+        print('keys={}'.format(num_keys))
+        report('  JsonCfg(meta)', t_meta)
+        report('  schema.create()', bench(schema.create, number=number, repeat=3), baseline=t_meta)
+
+
+if __name__ == '__main__':
+    main()
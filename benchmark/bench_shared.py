@@ -0,0 +1,58 @@
+'''Per-task config cost with 16 process-pool workers and a 100k-key config.
+
+Sending the config dict with every task is compared with sending a SharedJsonCfg, which
+only pickles the shared memory name.
+'''
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import make_meta, leaf_keys
+
+from jcfg import JsonCfg
+from jcfg.shared import SharedJsonCfg
+
+NUM_WORKERS = 16
+NUM_TASKS = 320
+
+
+def _task_with_dict(config_dict, key):
+    value = config_dict
+    for part in key.split('.'):
+        value = value[part]
+    return value
+
+
+def _task_with_shared(shared_cfg, key):
+    return shared_cfg[key]
+
+
+def _run(executor, func, arg, keys):
+    start = time.perf_counter()
+    list(executor.map(func, [arg] * len(keys), keys))
+    return (time.perf_counter() - start) / len(keys)
+
+
+def main():
+    meta = make_meta(100000, depth=3)
+    cfg = JsonCfg(meta)
+    keys = list(leaf_keys(meta))[::100000 // NUM_TASKS][:NUM_TASKS]
+
+    config_dict = cfg.to_dict()
+    start = time.perf_counter()
+    shared_cfg = SharedJsonCfg(cfg)
+    print('publish into shared memory: {:.1f} ms'.format((time.perf_counter() - start) * 1e3))
+    print('pickled size: dict {:,} bytes, shared {:,} bytes'.format(
+        len(pickle.dumps(config_dict)), len(pickle.dumps(shared_cfg))))
+
+    with shared_cfg, ProcessPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        # warm up the workers
+        list(executor.map(abs, range(NUM_WORKERS * 4)))
+        t_dict = _run(executor, _task_with_dict, config_dict, keys)
+        t_shared = _run(executor, _task_with_shared, shared_cfg, keys)
+    print('per task, config dict:   {:8.3f} ms'.format(t_dict * 1e3))
+    print('per task, shared config: {:8.3f} ms  x{:.1f}'.format(t_shared * 1e3, t_dict / t_shared))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+'''Generating sweep variants, against copying the base config and setting each override.'''
+import gc
+import tracemalloc
+
+from common import make_meta, leaf_keys, bench, report
+
+from jcfg import JsonCfgSchema
+from jcfg.sweep import Sweep
+
+NUM_VARIANTS = 10000
+
+
+def _bytes_per_item(func, num_items):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        items = func()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] / num_items
+    finally:
+        del items
+        tracemalloc.stop()
+
+
+def main():
+    meta = make_meta(10000, depth=3)
+    base = JsonCfgSchema(meta).create()
+    keys = [key for key in leaf_keys(meta) if isinstance(base[key], int)][:4]
+
+    sweep = Sweep(base)
+    sweep.grid(keys[0], list(range(25)))
+    sweep.zip({keys[1]: list(range(20)), keys[2]: list(range(20))})
+    sweep.random(NUM_VARIANTS // 500, {keys[3]: lambda rng: rng.randrange(100)}, seed=0)
+    assert len(sweep) == NUM_VARIANTS
+    variants = list(sweep)
+
+    def _copy_and_set(variant):
+        cfg = base.copy()
+        for key, value in variant.overrides.items():
+            cfg[key] = value
+        return cfg
+
+    t_copy = bench(lambda: _copy_and_set(variants[1]), repeat=3)
+    report('copy + setitem per variant', t_copy)
+    report('sweep variant', bench(lambda: sweep[1], repeat=3), baseline=t_copy)
+    report('sweep variant, to_config()', bench(lambda: sweep[1].to_config(), repeat=3), baseline=t_copy)
+    report('sweep variant, freeze()', bench(lambda: sweep[1].freeze(), repeat=3), baseline=t_copy)
+
+    copy_bytes = _bytes_per_item(lambda: [_copy_and_set(v) for v in variants[:100]], 100)
+    sweep_bytes = _bytes_per_item(lambda: list(sweep), NUM_VARIANTS)
+    print('memory per variant: copy + setitem {:,.0f} bytes, sweep variant {:,.0f} bytes'.format(
+        copy_bytes, sweep_bytes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+'''Typed numeric lists (`_type: list[float]`) against plain lists: memory and load time.'''
+import os
+import random
+import tempfile
+import tracemalloc
+
+from common import bench, report
+
+from jcfg import JsonCfg
+
+NUM_ELEMENTS = 1000000
+
+
+def _value_bytes(cfg, config_path):
+    tracemalloc.start()
+    try:
+        cfg.update_from_file(config_path)
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    values = [random.random() for _ in range(NUM_ELEMENTS)]
+    plain_cfg = JsonCfg({'weights': [0.0]})
+    typed_cfg = JsonCfg({'weights': {'_default': [0.0], '_type': 'list[float]'}})
+    typed32_cfg = JsonCfg({'weights': {'_default': [0.0], '_type': 'list[float32]'}})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'config.json')
+        plain_cfg.weights = values
+        plain_cfg.save_to_file(config_path)
+        print('{:,} floats, {:.1f} MB json'.format(NUM_ELEMENTS, os.path.getsize(config_path) / 1e6))
+
+        for name, cfg in (('list', plain_cfg), ('list[float]', typed_cfg), ('list[float32]', typed32_cfg)):
+            cfg.weights = [0.0]
+            print('{:<48s} {:>12.1f} bytes/element'.format(
+                '  {} value memory'.format(name), _value_bytes(cfg, config_path) / NUM_ELEMENTS))
+
+        t_plain = bench(lambda: plain_cfg.update_from_file(config_path), number=1, repeat=3)
+        report('update_from_file, list', t_plain)
+        report('update_from_file, list[float]',
+               bench(lambda: typed_cfg.update_from_file(config_path), number=1, repeat=3), baseline=t_plain)
+
+        args = ['--weights'] + [str(v) for v in values[:100000]]
+        t_plain = bench(lambda: plain_cfg.parse_args(args=args, fast=True), number=1, repeat=3)
+        report('parse_args 100k items, list (kept as str)', t_plain)
+        report('parse_args 100k items, list[float]',
+               bench(lambda: typed_cfg.parse_args(args=args, fast=True), number=1, repeat=3), baseline=t_plain)
+
+
+if __name__ == '__main__':
+    main()
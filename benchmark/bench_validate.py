@@ -0,0 +1,31 @@
+'''Full config validation: sequential, on a thread pool, and with cached results.'''
+import time
+
+from common import bench, report
+
+from jcfg import JsonCfg
+
+
+def _slow_validator(x):
+    # stands for an i/o bound check, e.g. a path exists or a port is free
+    time.sleep(0.001)
+    return x >= 0
+
+
+def main():
+    meta = {'section_{}'.format(i): {'key_{}'.format(j): {'_default': j, '_validate': _slow_validator}
+                                     for j in range(20)} for i in range(10)}
+    cfg = JsonCfg(meta)
+    print('{} validated keys'.format(len(cfg._get_validation_plan())))
+
+    t_seq = bench(lambda: cfg.validate(use_cache=False), number=1, repeat=3)
+    report('validate(use_cache=False)', t_seq)
+    for workers in (4, 16):
+        report('validate(workers={}, use_cache=False)'.format(workers),
+               bench(lambda: cfg.validate(workers=workers, use_cache=False), number=1, repeat=3), baseline=t_seq)
+    cfg.validate()
+    report('validate(), all values cached', bench(cfg.validate, repeat=3), baseline=t_seq)
+
+
+if __name__ == '__main__':
+    main()
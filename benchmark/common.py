@@ -0,0 +1,56 @@
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_meta(num_keys, depth=1, fanout=None):
+    '''Build a synthetic config meta dict with `num_keys` leaves, nested `depth` levels deep.
+
+    Leaves cycle through int, float, str and list values so that every value type is covered.
+    '''
+    assert depth >= 1
+    if fanout is None:
+        fanout = max(2, int(round(num_keys ** (1.0 / depth))))
+    defaults = [1, 1.0, 'value', [1, 2, 3]]
+
+    counter = [0]
+
+    def _build(level, budget):
+        meta = {}
+        if level == depth:
+            for i in range(budget):
+                meta['key_{}'.format(i)] = defaults[counter[0] % len(defaults)]
+                counter[0] += 1
+            return meta
+        num_sections = min(fanout, budget)
+        for i in range(num_sections):
+            sub_budget = budget // num_sections + (1 if i < budget % num_sections else 0)
+            meta['section_{}'.format(i)] = _build(level + 1, sub_budget)
+        return meta
+
+    return _build(1, num_keys)
+
+
+def leaf_keys(meta, prefix=''):
+    for key, val in meta.items():
+        if isinstance(val, dict) and '_default' not in val:
+            yield from leaf_keys(val, prefix + key + '.')
+        else:
+            yield prefix + key
+
+
+def bench(func, number=None, repeat=5):
+    '''Return the best per-call time in seconds of `func`.'''
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(name, seconds, baseline=None):
+    line = '{:<48s} {:>12.3f} us {:>14,.0f} ops/s'.format(name, seconds * 1e6, 1.0 / seconds)
+    if baseline is not None:
+        line += '  x{:.1f}'.format(baseline / seconds)
+    print(line)
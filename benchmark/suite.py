@@ -0,0 +1,192 @@
+'''Benchmark suite of jcfg: construction, access, load, save and cli parsing.
+
+Every case runs on synthetic schemas of growing size and nesting depth, and reports the
+throughput (ops/s) and the peak memory allocated by one run (from tracemalloc). Results can
+be saved as json, and compared with a stored baseline:
+
+    python benchmark/suite.py                              # 10 to 10k keys
+    python benchmark/suite.py --full                       # up to 100k keys
+    python benchmark/suite.py --save results.json
+    python benchmark/suite.py --compare benchmark/baseline.json --fail-on-regression
+
+Everything runs offline, in temporary directories.
+'''
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from common import make_meta, leaf_keys
+
+from jcfg import JsonCfg, JsonCfgSchema
+
+QUICK_SIZES = (10, 1000, 10000)
+FULL_SIZES = QUICK_SIZES + (100000,)
+DEPTHS = (1, 3, 10)
+
+_cases = []
+
+
+def case(name, max_keys=None):
+    '''Register `setup(meta, tmp_dir) -> func`, where `func()` is the measured operation.'''
+    def _register(setup):
+        _cases.append((name, setup, max_keys))
+        return setup
+    return _register
+
+
+@case('construct.meta')
+def _construct_meta(meta, tmp_dir):
+    return lambda: JsonCfg(meta)
+
+
+@case('construct.schema')
+def _construct_schema(meta, tmp_dir):
+    schema = JsonCfgSchema(meta)
+    return schema.create
+
+
+@case('access.getitem')
+def _access_getitem(meta, tmp_dir):
+    cfg = JsonCfg(meta)
+    key = list(leaf_keys(meta))[-1]
+    return lambda: cfg[key]
+
+
+@case('access.setitem')
+def _access_setitem(meta, tmp_dir):
+    cfg = JsonCfg(meta)
+    key = [k for k in leaf_keys(meta) if isinstance(cfg[k], int)][-1]
+    return lambda: cfg.__setitem__(key, 3)
+
+
+@case('access.freeze')
+def _access_freeze(meta, tmp_dir):
+    return JsonCfg(meta).freeze
+
+
+def _file_case(ext, save):
+    def _setup(meta, tmp_dir):
+        cfg = JsonCfg(meta)
+        path = os.path.join(tmp_dir, 'config' + ext)
+        cfg.save_to_file(path)
+        if save:
+            return lambda: cfg.save_to_file(path)
+        return lambda: cfg.update_from_file(path)
+    return _setup
+
+
+case('load.json')(_file_case('.json', save=False))
+case('load.yaml', max_keys=10000)(_file_case('.yaml', save=False))
+case('save.json')(_file_case('.json', save=True))
+case('save.yaml', max_keys=10000)(_file_case('.yaml', save=True))
+
+
+@case('save.json.unchanged')
+def _save_unchanged(meta, tmp_dir):
+    cfg = JsonCfg(meta)
+    path = os.path.join(tmp_dir, 'config.json')
+    cfg.save_to_file(path)
+    return lambda: cfg.save_to_file(path, skip_unchanged=True)
+
+
+def _parse_args_case(fast):
+    def _setup(meta, tmp_dir):
+        cfg = JsonCfg(meta)
+        key = [k for k in leaf_keys(meta) if isinstance(cfg[k], int)][-1]
+        args = ['--{}'.format(key), '3']
+        return lambda: cfg.parse_args(args=args, fast=fast)
+    return _setup
+
+
+case('cli.argparse', max_keys=10000)(_parse_args_case(fast=False))
+case('cli.fast')(_parse_args_case(fast=True))
+
+
+def _measure(func, min_time=0.2, repeat=3):
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    best = min([elapsed / number] + [t / number for t in timer.repeat(repeat=repeat - 1, number=number)])
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return 1.0 / best, peak
+
+
+def run(sizes, depths, name_filter=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, setup, max_keys in _cases:
+            if name_filter is not None and name_filter not in name:
+                continue
+            for num_keys in sizes:
+                if max_keys is not None and num_keys > max_keys:
+                    continue
+                for depth in depths:
+                    meta = make_meta(num_keys, depth=depth)
+                    ops, peak = _measure(setup(meta, tmp_dir))
+                    case_id = '{}[keys={},depth={}]'.format(name, num_keys, depth)
+                    results[case_id] = {'ops_per_sec': ops, 'peak_memory': peak}
+                    print('{:<40s} {:>14,.1f} ops/s {:>12,} B peak'.format(case_id, ops, peak))
+                    sys.stdout.flush()
+    return results
+
+
+def compare(results, baseline, threshold):
+    '''Print throughput ratios against `baseline`, and return ids of regressed cases.'''
+    regressions = []
+    print('\n{:<40s} {:>10s} {:>10s}'.format('case', 'speed', 'memory'))
+    for case_id, result in results.items():
+        base = baseline.get(case_id)
+        if base is None:
+            continue
+        speed = result['ops_per_sec'] / base['ops_per_sec']
+        memory = result['peak_memory'] / base['peak_memory'] if base['peak_memory'] else 1.0
+        flag = ''
+        if speed < 1.0 / threshold:
+            flag = '  REGRESSION'
+            regressions.append(case_id)
+        print('{:<40s} {:>9.2f}x {:>9.2f}x{}'.format(case_id, speed, memory, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='jcfg benchmark suite')
+    parser.add_argument('--full', action='store_true', help='also run configs of 100k keys')
+    parser.add_argument('-k', dest='name_filter', help='only run cases whose name contains this')
+    parser.add_argument('--save', help='save results into this json file')
+    parser.add_argument('--compare', help='compare results with this baseline json file')
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='slowdown factor reported as a regression (default: 1.5)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run(FULL_SIZES if args.full else QUICK_SIZES, DEPTHS, args.name_filter)
+    print('finished in {:.1f} s'.format(time.perf_counter() - start))
+
+    if args.save is not None:
+        with open(args.save, 'w') as wf:
+            json.dump(results, wf, indent=2, sort_keys=True)
+    if args.compare is not None:
+        with open(args.compare) as rf:
+            regressions = compare(results, json.load(rf), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
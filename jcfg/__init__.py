@@ -1,4 +1,6 @@
-from .json_config import JsonCfg
+from .version import __version__
+from .json_config import JsonCfg, JsonCfgSchema
+from .frozen import FrozenCfg
 
 from .error import *
 
@@ -0,0 +1,54 @@
+'''asyncio counterparts of config loading, which keep file I/O and parsing off the event loop.
+
+    await cfg.aupdate_from_file('config.json')
+    await jcfg.aio.update_from_files(cfg, ['base.yaml', 'model.json', 'local.json'])
+
+Files are read and parsed concurrently on a bounded thread pool, so loading independent
+files takes about as long as the slowest one. Their values are then applied on the loop
+thread, in the order of the given paths (later files override earlier ones), as a single
+batch.
+'''
+import asyncio
+import os
+import threading
+
+# threads of the shared executor, enough to overlap the I/O of many files
+_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix='jcfg-aio')
+        return _executor
+
+
+async def load_flat_files(config_paths, cache=False, executor=None):
+    '''Return the flattened values of every file of `config_paths`, in the same order.
+
+    Files are loaded as by `JsonCfg.update_from_file`, concurrently on `executor`, or on a
+    shared pool of a bounded number of threads.
+    '''
+    from .json_config import JsonCfg
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor() if executor is None else executor
+    return await asyncio.gather(*[
+        loop.run_in_executor(executor, JsonCfg._load_flat_file, path, cache) for path in config_paths])
+
+
+async def update_from_files(config, config_paths, cache=False, executor=None):
+    '''Update `config` from all files of `config_paths`, later files override earlier ones.
+
+    All values are type checked and validated before any of them is assigned, as by
+    `JsonCfg.update`, so a file failing to load or validate leaves the config unchanged.
+    '''
+    flat_config = {}
+    for values in await load_flat_files(config_paths, cache, executor):
+        flat_config.update(values)
+    config.update(flat_config)
@@ -0,0 +1,60 @@
+'''Thread-safe JsonCfg, with lock-free reads of copy-on-write snapshots.'''
+import threading
+
+from . import loader
+from .frozen import freeze_value, replace_values
+from .json_config import JsonCfg
+
+
+class AtomicJsonCfg(object):
+    '''A JsonCfg shared between threads: one or more writers, and lock-free readers.
+
+    Readers get the current version as an immutable `FrozenCfg` from `snapshot`, a single
+    reference load, and never see a partially applied update. Writers serialize on a lock,
+    apply their update to a private JsonCfg (all or nothing, see `JsonCfg.update`), build the
+    next snapshot by rebuilding only the sections containing changed keys, and publish it
+    with a single reference assignment.
+    '''
+
+    def __init__(self, config):
+        self.__config = config.copy()
+        self.__write_lock = threading.Lock()
+        self.__snapshot = self.__config.freeze()
+        self.__version = 0
+
+    @property
+    def snapshot(self):
+        return self.__snapshot
+
+    @property
+    def version(self):
+        '''Number of updates published so far.'''
+        return self.__version
+
+    def __getitem__(self, key):
+        return self.__snapshot[key]
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.__snapshot, name)
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def update(self, mapping):
+        flat_mapping = loader.flatten_config(mapping, allow_private=True)
+        with self.__write_lock:
+            self.__config.update(flat_mapping)
+            changes = {key: freeze_value(self.__config[key]) for key in flat_mapping}
+            self.__snapshot = replace_values(self.__snapshot, changes)
+            self.__version += 1
+
+    def update_from_file(self, config_path, cache=False, workers=None):
+        '''Update from a file, loaded as by `JsonCfg.update_from_file`.'''
+        self.update(JsonCfg._load_flat_file(config_path, cache, workers))
+
+    def to_config(self):
+        '''Return a new JsonCfg with the values of the current snapshot.'''
+        with self.__write_lock:
+            return self.__config.copy()
@@ -0,0 +1,373 @@
+'''Compact binary encoding of flattened configs, decoded lazily from any buffer.
+
+Layout (all integers little endian):
+
+    header:  magic (8s), format version (H), reserved (H), count (I), and the offsets (Q)
+             of the sections below, and of the end of the encoded config
+    table:   `count` fixed size entries sorted by key: key offset (I), key length (I),
+             value type (B), padding (3x), index of the value in its section (I)
+    keys:    utf-8 encoded dotted keys, separated by '\0'
+    types:   the value type of each entry, one byte per entry, in the order of the table
+    ints:    int64 values
+    floats:  float64 values
+    bools:   one byte per value
+    strs:    `n + 1` uint64 offsets of the n strings inside of the string data section,
+             followed by the utf-8 encoded strings
+    objects: the same for json encoded values (lists, big ints, ...)
+
+A lookup binary searches the fixed size table, and decodes only the value of the found
+key, so reading a few keys of a big config does not depend on the config size. Values of
+each type are stored together, so that all values are decoded in a few bulk operations.
+
+Config files ending with `.jcfgb` use this encoding. `load_file` maps such a file into
+memory, and only reads the pages of the values which are accessed.
+'''
+import struct
+import sys
+from array import array
+from itertools import compress
+
+from .error import JCfgBinaryFormatError, JCfgInvalidKeyError, JCfgKeyNotFoundError
+from .frozen import freeze_value
+
+MAGIC = b'JCFGBIN\0'
+FORMAT_VERSION = 3
+EXT = '.jcfgb'
+
+_header_struct = struct.Struct('<8sHHI11Q')
+_entry_struct = struct.Struct('<IIB3xI')
+# the key offset and length, at the start of an entry
+_key_ref_struct = struct.Struct('<II')
+_int_struct = struct.Struct('<q')
+_float_struct = struct.Struct('<d')
+_offsets_struct = struct.Struct('<QQ')
+
+_TYPE_BOOL = ord('b')
+_TYPE_INT = ord('i')
+_TYPE_FLOAT = ord('f')
+_TYPE_STR = ord('s')
+_TYPE_JSON = ord('j')
+
+# value type -> table for bytes.translate, giving a 0/1 mask of the entries of this type
+_type_masks = {value_type: bytes(int(i == value_type) for i in range(256))
+               for value_type in (_TYPE_BOOL, _TYPE_INT, _TYPE_FLOAT, _TYPE_STR, _TYPE_JSON)}
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _to_little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def encode(items):
+    '''Encode (dotted key, value) pairs into bytes.'''
+    entries = sorted((key.encode('utf-8'), value) for key, value in items)
+
+    table = []
+    keys = []
+    key_offset = 0
+    types = bytearray(len(entries))
+    ints = array('q')
+    floats = array('d')
+    bools = bytearray()
+    strs = _VarSection()
+    objects = _VarSection()
+    for idx, (key, value) in enumerate(entries):
+        if b'\0' in key:
+            raise JCfgInvalidKeyError('Config key: {!r} contains a null char'.format(key))
+        value_class = value.__class__
+        if value_class is bool:
+            value_type, index = _TYPE_BOOL, len(bools)
+            bools.append(value)
+        elif value_class is int and _INT64_MIN <= value <= _INT64_MAX:
+            value_type, index = _TYPE_INT, len(ints)
+            ints.append(value)
+        elif value_class is float:
+            value_type, index = _TYPE_FLOAT, len(floats)
+            floats.append(value)
+        elif value_class is str:
+            value_type, index = _TYPE_STR, strs.append(value.encode('utf-8'))
+        else:
+            if hasattr(value, 'tolist'):
+                # typed lists, stored in arrays
+                value = value.tolist()
+            # json is stable across python versions, and safe to decode from untrusted files
+            value_type, index = _TYPE_JSON, objects.append(_dump_json(value))
+        types[idx] = value_type
+        table.append(_entry_struct.pack(key_offset, len(key), value_type, index))
+        keys.append(key)
+        key_offset += len(key) + 1
+
+    sections = [b''.join(table), b'\0'.join(keys), types, _to_little_endian(ints).tobytes(),
+                _to_little_endian(floats).tobytes(), bools] + strs.sections() + objects.sections()
+    section_offsets = []
+    offset = _header_struct.size
+    for section in sections:
+        section_offsets.append(offset)
+        offset += len(section)
+    header = _header_struct.pack(MAGIC, FORMAT_VERSION, 0, len(entries), *section_offsets, offset)
+    return b''.join([header] + sections)
+
+
+def _dump_json(value):
+    import json
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _load_json(data):
+    # not orjson, which decodes integers beyond 64 bits as floats
+    import json
+    try:
+        return json.loads(data)
+    except ValueError as e:
+        raise JCfgBinaryFormatError('Invalid json value in jcfg binary config: {}'.format(e))
+
+
+class _VarSection(object):
+    '''Offsets and data of variable sized values, while encoding.'''
+
+    def __init__(self):
+        self.offsets = array('Q', [0])
+        self.data = []
+        self.size = 0
+
+    def append(self, value_data):
+        self.data.append(value_data)
+        self.size += len(value_data)
+        self.offsets.append(self.size)
+        return len(self.data) - 1
+
+    def sections(self):
+        return [_to_little_endian(self.offsets).tobytes(), b''.join(self.data)]
+
+
+class _Layout(object):
+    __slots__ = ('count', 'table', 'keys', 'types', 'ints', 'floats', 'bools', 'str_offsets', 'str_data',
+                 'object_offsets', 'object_data', 'end')
+
+    def __init__(self, buffer):
+        if len(buffer) < _header_struct.size:
+            raise JCfgBinaryFormatError('Buffer is too small for a jcfg binary config')
+        magic, version, _, self.count, self.table, self.keys, self.types, self.ints, self.floats, \
+            self.bools, self.str_offsets, self.str_data, self.object_offsets, self.object_data, \
+            self.end = _header_struct.unpack_from(buffer)
+        if magic != MAGIC:
+            raise JCfgBinaryFormatError('Not a jcfg binary config')
+        if version != FORMAT_VERSION:
+            raise JCfgBinaryFormatError('Unsupported jcfg binary format version: {}'.format(version))
+        if self.end > len(buffer):
+            raise JCfgBinaryFormatError('Truncated jcfg binary config')
+
+
+def _load_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    return _to_little_endian(values).tolist()
+
+
+def _iter_var_values(buffer, offsets_start, data_start, data_end, decode):
+    offsets = _load_array('Q', buffer[offsets_start:data_start])
+    data = bytes(buffer[data_start:data_end])
+    return map(decode, map(data.__getitem__, map(slice, offsets, offsets[1:])))
+
+
+def decode_flat(buffer):
+    '''Decode all values of a binary encoded config into a dict of dotted keys.
+
+    Unlike values of BinaryCfgView, lists are decoded as plain lists.
+    '''
+    with memoryview(buffer) as buffer:
+        layout = _Layout(buffer)
+        if layout.count == 0:
+            return {}
+        keys = str(buffer[layout.keys:layout.types], 'utf-8').split('\0')
+        types = bytes(buffer[layout.types:layout.ints])
+        flat_config = dict(zip(compress(keys, types.translate(_type_masks[_TYPE_INT])),
+                               _load_array('q', buffer[layout.ints:layout.floats])))
+        flat_config.update(zip(compress(keys, types.translate(_type_masks[_TYPE_FLOAT])),
+                               _load_array('d', buffer[layout.floats:layout.bools])))
+        flat_config.update(zip(compress(keys, types.translate(_type_masks[_TYPE_BOOL])),
+                               map(bool, bytes(buffer[layout.bools:layout.str_offsets]))))
+
+        flat_config.update(zip(compress(keys, types.translate(_type_masks[_TYPE_STR])), _iter_var_values(
+            buffer, layout.str_offsets, layout.str_data, layout.object_offsets, bytes.decode)))
+        if layout.object_data > layout.object_offsets + 8:
+            # all values are decoded as a single json array
+            texts = list(_iter_var_values(buffer, layout.object_offsets, layout.object_data, layout.end, bytes))
+            flat_config.update(zip(compress(keys, types.translate(_type_masks[_TYPE_JSON])),
+                                   _load_json(b'[' + b','.join(texts) + b']')))
+        if len(flat_config) != layout.count:
+            raise JCfgBinaryFormatError('Unknown value types in jcfg binary config')
+        return flat_config
+
+
+def decode_dict(data):
+    '''Decode a binary encoded config into a nested dict, as parsed from a json file.'''
+    config_dict = {}
+    for key, value in decode_flat(data).items():
+        section = config_dict
+        names = key.split('.')
+        for name in names[:-1]:
+            section = section.setdefault(name, {})
+        section[names[-1]] = value
+    return config_dict
+
+
+def save_file(items, path):
+    '''Encode (dotted key, value) pairs into file `path`, which is replaced atomically.'''
+    from .loader import atomic_write
+    data = encode(items)
+    with atomic_write(path, 'wb') as wf:
+        wf.write(data)
+
+
+def _map_file(path):
+    import mmap
+    with open(path, 'rb') as rf:
+        try:
+            return mmap.mmap(rf.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can not be mapped
+            raise JCfgBinaryFormatError('Buffer is too small for a jcfg binary config')
+
+
+def load_file(path):
+    '''Return a BinaryCfgView of file `path`, mapped into memory.'''
+    return BinaryCfgView(_map_file(path))
+
+
+def load_flat_file(path):
+    '''Decode all values of file `path` into a dict of dotted keys, see `decode_flat`.'''
+    mapped = _map_file(path)
+    try:
+        return decode_flat(mapped)
+    finally:
+        mapped.close()
+
+
+class BinaryCfgView(object):
+    '''Read-only view of a binary encoded config, over bytes, mmap or shared memory.
+
+    Values are decoded on first access, and list values are returned as tuples. Sub configs
+    are accessed like with JsonCfg: `view['a.b']`, `view['a']['b']` or `view.a.b`.
+    '''
+
+    def __init__(self, buffer):
+        self.__buffer = memoryview(buffer).toreadonly()
+        self.__layout = _Layout(self.__buffer)
+        self.__count = self.__layout.count
+        self.__decoded = {}
+
+    def __len__(self):
+        return self.__count
+
+    def __entry(self, idx):
+        return _entry_struct.unpack_from(self.__buffer, self.__layout.table + idx * _entry_struct.size)
+
+    def __key_at(self, idx):
+        key_offset, key_len = _key_ref_struct.unpack_from(
+            self.__buffer, self.__layout.table + idx * _entry_struct.size)
+        start = self.__layout.keys + key_offset
+        return bytes(self.__buffer[start:start + key_len])
+
+    def __lower_bound(self, key):
+        lo, hi = 0, self.__count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.__key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __decode_at(self, idx):
+        _, _, value_type, index = self.__entry(idx)
+        layout = self.__layout
+        if value_type == _TYPE_INT:
+            return _int_struct.unpack_from(self.__buffer, layout.ints + index * 8)[0]
+        elif value_type == _TYPE_FLOAT:
+            return _float_struct.unpack_from(self.__buffer, layout.floats + index * 8)[0]
+        elif value_type == _TYPE_BOOL:
+            return self.__buffer[layout.bools + index] != 0
+        elif value_type == _TYPE_STR:
+            start, end = _offsets_struct.unpack_from(self.__buffer, layout.str_offsets + index * 8)
+            return str(self.__buffer[layout.str_data + start:layout.str_data + end], 'utf-8')
+        elif value_type == _TYPE_JSON:
+            start, end = _offsets_struct.unpack_from(self.__buffer, layout.object_offsets + index * 8)
+            return freeze_value(_load_json(bytes(self.__buffer[layout.object_data + start:layout.object_data + end])))
+        raise JCfgBinaryFormatError('Unknown value type: {}'.format(value_type))
+
+    def __contains__(self, key):
+        return self.__find(key) is not None
+
+    def __find(self, key):
+        key_bytes = key.encode('utf-8')
+        idx = self.__lower_bound(key_bytes)
+        if idx < self.__count and self.__key_at(idx) == key_bytes:
+            return idx
+        return None
+
+    def is_section(self, key):
+        prefix = key.encode('utf-8') + b'.'
+        idx = self.__lower_bound(prefix)
+        return idx < self.__count and self.__key_at(idx).startswith(prefix)
+
+    def get_value(self, key):
+        '''Return value of leaf `key`, decoded on first access.'''
+        try:
+            return self.__decoded[key]
+        except KeyError:
+            pass
+        idx = self.__find(key)
+        if idx is None:
+            raise JCfgKeyNotFoundError('Config key: {} not defined!'.format(key))
+        value = self.__decoded[key] = self.__decode_at(idx)
+        return value
+
+    def __getitem__(self, key):
+        try:
+            return self.__decoded[key]
+        except KeyError:
+            pass
+        idx = self.__find(key)
+        if idx is None:
+            if self.is_section(key):
+                return BinaryCfgSection(self, key)
+            raise JCfgKeyNotFoundError('Config key: {} not defined!'.format(key))
+        value = self.__decoded[key] = self.__decode_at(idx)
+        return value
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self.__getitem__(name)
+
+    def keys(self):
+        for idx in range(self.__count):
+            yield self.__key_at(idx).decode('utf-8')
+
+    def items(self):
+        for key in self.keys():
+            yield key, self.get_value(key)
+
+    def to_flat_dict(self):
+        return dict(self.items())
+
+
+class BinaryCfgSection(object):
+    '''A sub config of a BinaryCfgView.'''
+
+    def __init__(self, view, prefix):
+        self.__view = view
+        self.__prefix = prefix + '.'
+
+    def __getitem__(self, key):
+        return self.__view[self.__prefix + key]
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self.__getitem__(name)
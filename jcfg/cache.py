@@ -0,0 +1,78 @@
+'''On-disk cache of flattened config files.
+
+The flattened key/value mapping of a config file is stored in the `jcfg.binary` format,
+which is safe to decode from untrusted files, after a line with the path, mtime, size of
+the source file and the jcfg and python versions. A cache entry is only used when all of
+them match, otherwise the file is parsed again and the entry is rewritten.
+'''
+import os
+import sys
+
+from . import loader
+from .error import JCfgBinaryFormatError, JCfgInvalidKeyError
+from .version import __version__
+
+_CACHE_FORMAT = 2
+_CACHE_SUFFIX = '.jcfgcache'
+
+
+def get_cache_path(config_path, cache_dir=None):
+    '''Cache entry of `config_path`, next to it as a hidden file, or inside `cache_dir`.'''
+    config_path = os.path.abspath(config_path)
+    if cache_dir is None:
+        dir_name, base_name = os.path.split(config_path)
+        return os.path.join(dir_name, '.{}{}'.format(base_name, _CACHE_SUFFIX))
+    else:
+        import hashlib
+        digest = hashlib.sha1(config_path.encode('utf-8')).hexdigest()
+        return os.path.join(cache_dir, '{}{}'.format(digest, _CACHE_SUFFIX))
+
+
+def _get_cache_key(config_path, stat):
+    key = (_CACHE_FORMAT, __version__, tuple(sys.version_info[:2]), os.path.abspath(config_path),
+           stat.st_mtime_ns, stat.st_size)
+    # compared as text, the repr of a tuple of numbers and strings is a single line
+    return repr(key).encode('utf-8') + b'\n'
+
+
+def _read_cache(cache_path, cache_key):
+    from .binary import decode_flat
+    try:
+        with open(cache_path, 'rb') as rf:
+            data = rf.read()
+    except OSError:
+        return None
+    if not data.startswith(cache_key):
+        return None
+    try:
+        return decode_flat(memoryview(data)[len(cache_key):])
+    except (JCfgBinaryFormatError, ValueError):
+        return None
+
+
+def _write_cache(cache_path, cache_key, flat_config):
+    from .binary import encode
+    try:
+        data = encode(flat_config.items())
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with loader.atomic_write(cache_path, 'wb') as wf:
+            wf.write(cache_key)
+            wf.write(data)
+    except (OSError, ValueError, TypeError, JCfgInvalidKeyError):
+        # the cache is best effort: read-only dirs or values json can not encode just skip it
+        pass
+
+
+def load_flat_config(config_path, cache_dir=None):
+    '''Return the flattened config of `config_path`, from the cache if it is up to date.'''
+    stat = os.stat(config_path)
+    cache_key = _get_cache_key(config_path, stat)
+    cache_path = get_cache_path(config_path, cache_dir)
+
+    flat_config = _read_cache(cache_path, cache_key)
+    if flat_config is None:
+        flat_config = loader.flatten_file_config(loader.load_file(config_path))
+        # do not cache content of a file which was modified while being parsed
+        if _get_cache_key(config_path, os.stat(config_path)) == cache_key:
+            _write_cache(cache_path, cache_key, flat_config)
+    return flat_config
@@ -0,0 +1,440 @@
+'''Generate typed config classes from a config meta, with plain `__slots__` attribute access.
+
+    python -m jcfg.codegen myapp.settings:CONFIG_META -o myapp/config_classes.py
+    python -m jcfg.codegen config_meta.yaml -o config_classes.py --class-name AppConfig
+
+or, without writing a module into the source tree:
+
+    Config = jcfg.codegen.load_classes(CONFIG_META)   # generated once, cached by content hash
+    cfg = Config.from_file('config.json')
+    cfg.sub_config.sub_int                            # a slot load, no __getattr__
+
+Every section of the meta becomes a class with a slot per key, type annotations, defaults
+and a keyword `__init__`, which IDEs and type checkers understand. Values are type checked
+and validated (with the `_validate` callables of the meta) when set. `from_dict`,
+`from_file`, `update`, `to_dict` and `save_to_file` read and write the same json/yaml files
+as JsonCfg.
+
+Validators can not be written into source code, generated modules get them from the meta
+they were generated from: by importing it, if the meta was given as `module:attr`, or from
+`load_classes`.
+'''
+import hashlib
+import keyword
+import os
+
+from .error import JCfgInvalidKeyError, JCfgInvalidSetValueError, JCfgKeyNotFoundError, \
+    JCfgValueTypeMismatchError
+from .typed_list import TypedList
+from .validation import check_value, raise_failures
+from .version import __version__
+from . import loader
+
+# bumped whenever generated code changes, so that cached modules are generated again
+_CODEGEN_FORMAT = 1
+_HEADER = '# generated by jcfg.codegen, do not edit. digest: '
+
+_loaded_modules = {}
+
+
+class GeneratedCfg(object):
+    '''Base class of generated config classes.'''
+    __slots__ = ()
+    # set by generated classes: field names, sub config classes, and field -> (dotted key, type)
+    _jcfg_fields = ()
+    _jcfg_sections = {}
+    _jcfg_leaves = {}
+    # dotted key -> validator, shared by all classes of a generated module
+    _jcfg_validators = {}
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, self._jcfg_check(name, value))
+
+    def _jcfg_check(self, name, value):
+        '''Type check and validate `value` of field `name`, and return it as it is stored.'''
+        value = self._jcfg_check_type(name, value)
+        full_key, _ = self._jcfg_leaves[name]
+        validate_func = self._jcfg_validators.get(full_key)
+        if validate_func is not None:
+            passed, error = check_value(validate_func, value)
+            if not passed:
+                raise_failures([(full_key, value, error)])
+        return value
+
+    def _jcfg_check_type(self, name, value):
+        leaf = self._jcfg_leaves.get(name)
+        if leaf is None:
+            if name in self._jcfg_sections:
+                raise JCfgInvalidSetValueError('Cannot set value to a sub config: {}'.format(name))
+            raise JCfgKeyNotFoundError('Config key: {} not defined!'.format(name))
+        return _check_type(value, leaf[1])
+
+    def __getitem__(self, key):
+        value = self
+        for name in key.split('.'):
+            if not isinstance(value, GeneratedCfg) or name not in value._jcfg_fields:
+                raise JCfgKeyNotFoundError('Config key: {} not defined!'.format(key))
+            value = getattr(value, name)
+        return value
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name)) for name in self._jcfg_fields))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    @classmethod
+    def from_dict(cls, mapping):
+        '''Create a config of default values, updated from `mapping` as by `update`.'''
+        config = cls._jcfg_default()
+        config.update(mapping)
+        return config
+
+    @classmethod
+    def from_file(cls, config_path, cache=False):
+        '''Create a config of default values, updated from a json or yaml file as by
+        `JsonCfg.update_from_file`.'''
+        from .json_config import JsonCfg
+        config = cls._jcfg_default()
+        config.__update_flat(JsonCfg._load_flat_file(config_path, cache))
+        return config
+
+    def update(self, mapping):
+        '''Update values from a dict, which can be nested and/or use dotted keys.
+
+        All values are type checked and validated before any of them is assigned.
+        '''
+        self.__update_flat(loader.flatten_config(mapping, allow_private=True))
+
+    def update_from_file(self, config_path, cache=False):
+        from .json_config import JsonCfg
+        self.__update_flat(JsonCfg._load_flat_file(config_path, cache))
+
+    def __update_flat(self, flat_mapping):
+        resolved = []
+        for key, value in flat_mapping.items():
+            section = self
+            names = key.split('.')
+            for name in names[:-1]:
+                if name not in section._jcfg_sections:
+                    raise JCfgKeyNotFoundError('Config key: {} not defined!'.format(key))
+                section = getattr(section, name)
+            resolved.append((section, names[-1], section._jcfg_check_type(names[-1], value)))
+
+        failures = []
+        for section, name, value in resolved:
+            full_key, _ = section._jcfg_leaves[name]
+            validate_func = section._jcfg_validators.get(full_key)
+            if validate_func is not None:
+                passed, error = check_value(validate_func, value)
+                if not passed:
+                    failures.append((full_key, value, error))
+        if failures:
+            raise_failures(failures)
+
+        for section, name, value in resolved:
+            object.__setattr__(section, name, value)
+
+    def to_dict(self):
+        dst = {}
+        for name in self._jcfg_fields:
+            value = getattr(self, name)
+            if name in self._jcfg_sections:
+                dst[name] = value.to_dict()
+            elif isinstance(value, list):
+                dst[name] = _copy_list(value)
+            elif isinstance(self._jcfg_leaves[name][1], TypedList):
+                dst[name] = value.tolist()
+            else:
+                dst[name] = value
+        return dst
+
+    def save_to_file(self, save_path, indent=4, sort_keys=True):
+        '''Save values into a json or yaml file, which `JsonCfg.update_from_file` can read.'''
+        loader.dump_file(self.to_dict(), save_path, indent=indent, sort_keys=sort_keys)
+
+
+def _check_type(value, value_type):
+    # the same rules as JsonCfgValue.check
+    if isinstance(value, value_type):
+        return value
+    if isinstance(value, int) and value_type is float:
+        return value
+    if value_type.__class__ is TypedList:
+        return value_type.convert(value)
+    raise JCfgValueTypeMismatchError('The type of this config is set to {}, but is assigned a {}'.format(
+        str(value_type), str(type(value))))
+
+
+def _copy_list(value):
+    return [_copy_list(v) if isinstance(v, list) else v for v in value]
+
+
+def get_validators(config_meta):
+    '''Return the validators of `config_meta`, by dotted key.'''
+    from .json_config import JsonCfg
+    validators = {}
+
+    def _collect(config, prefix):
+        for key, val in config._iter_children():
+            if isinstance(val, JsonCfg):
+                _collect(val, prefix + key + '.')
+            elif val.validate_func is not None:
+                validators[prefix + key] = val.validate_func
+    _collect(JsonCfg(config_meta), '')
+    return validators
+
+
+def get_digest(config_meta, class_name='Config', meta_ref=None):
+    '''Content hash of the module generated for `config_meta`.'''
+    from .json_config import JsonCfg, _get_meta_fingerprint
+    # normalized as by JsonCfgSchema: tuple metas would be hashed by repr, with addresses of
+    # validators. Validators (and other callables) are left out, generated modules get them
+    # at runtime, and some have no signature stable across processes.
+    meta_fingerprint = _get_meta_fingerprint(_drop_callables(JsonCfg(config_meta).to_meta()))
+    signature = repr((_CODEGEN_FORMAT, __version__, class_name, meta_ref, meta_fingerprint))
+    return hashlib.sha1(signature.encode('utf-8')).hexdigest()
+
+
+def _drop_callables(meta):
+    return {key: _drop_callables(value) if isinstance(value, dict) else value
+            for key, value in meta.items() if not callable(value)}
+
+
+def generate_source(config_meta, class_name='Config', meta_ref=None):
+    '''Return the source of a module defining config class `class_name` for `config_meta`.
+
+    If `meta_ref` (`"module:attr"`) is given, the generated module imports the meta from
+    there to get its validators.
+    '''
+    from .json_config import JsonCfg
+    return _ModuleWriter(class_name, meta_ref).write(
+        JsonCfg(config_meta), get_digest(config_meta, class_name, meta_ref))
+
+
+def load_classes(config_meta, class_name='Config', cache_dir=None):
+    '''Return config class `class_name` generated for `config_meta`.
+
+    Modules are generated into `cache_dir` (by default `~/.cache/jcfg/codegen`) under the
+    content hash of the meta, so they are only generated again when the meta changes.
+    '''
+    digest = get_digest(config_meta, class_name)
+    module = _loaded_modules.get(digest)
+    if module is None:
+        if cache_dir is None:
+            cache_dir = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                                     'jcfg', 'codegen')
+        module_path = os.path.join(cache_dir, 'jcfg_{}_{}.py'.format(class_name, digest[:20]))
+        if _read_digest(module_path) != digest:
+            os.makedirs(cache_dir, exist_ok=True)
+            with loader.atomic_write(module_path, 'w', encoding='utf-8') as wf:
+                wf.write(generate_source(config_meta, class_name))
+        module = _import_file(module_path, 'jcfg_codegen_{}'.format(digest))
+        module._validators.update(get_validators(config_meta))
+        _loaded_modules[digest] = module
+    return getattr(module, class_name)
+
+
+def _import_file(path, module_name):
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _read_digest(path):
+    try:
+        with open(path, encoding='utf-8') as rf:
+            first_line = rf.readline()
+    except OSError:
+        return None
+    if not first_line.startswith(_HEADER):
+        return None
+    return first_line[len(_HEADER):].strip()
+
+
+class _ModuleWriter(object):
+
+    def __init__(self, class_name, meta_ref):
+        self.__class_name = class_name
+        self.__meta_ref = meta_ref
+        self.__class_names = set()
+        self.__typed_lists = {}
+        self.__class_blocks = []
+        self.__reserved = frozenset(dir(GeneratedCfg)) | {'from_dict', 'from_file', 'update_from_file'}
+
+    def write(self, config, digest):
+        self.__write_class(config, self.__class_name, '')
+        lines = [
+            _HEADER + digest,
+            'from jcfg.codegen import GeneratedCfg',
+            'from jcfg.error import JCfgValueTypeMismatchError',
+        ]
+        if self.__typed_lists:
+            lines.append('from jcfg.typed_list import get_typed_list_type')
+        if self.__meta_ref is not None:
+            module_name, _, attr = self.__meta_ref.partition(':')
+            lines.append('from jcfg.codegen import get_validators')
+            lines.append('from {} import {} as _config_meta'.format(module_name, attr))
+        lines += ['', '_object_setattr = object.__setattr__']
+        lines.append('# dotted key -> validator')
+        if self.__meta_ref is not None:
+            lines.append('_validators = get_validators(_config_meta)')
+        else:
+            lines.append('_validators = {}')
+        for typed_list, var_name in self.__typed_lists.items():
+            lines.append('{} = get_typed_list_type({!r}, {!r})'.format(var_name, typed_list.name, typed_list.use_numpy))
+        for block in self.__class_blocks:
+            lines += ['', ''] + block
+        return '\n'.join(lines) + '\n'
+
+    def __new_class_name(self, name):
+        class_name = name
+        idx = 1
+        while class_name in self.__class_names:
+            idx += 1
+            class_name = '{}{}'.format(name, idx)
+        self.__class_names.add(class_name)
+        return class_name
+
+    def __type_expr(self, value_type):
+        if value_type.__class__ is TypedList:
+            var_name = self.__typed_lists.get(value_type)
+            if var_name is None:
+                var_name = self.__typed_lists[value_type] = '_typed_list{}'.format(len(self.__typed_lists))
+            return var_name
+        return value_type.__name__
+
+    def __write_class(self, config, class_name, prefix):
+        from .json_config import JsonCfg
+        class_name = self.__new_class_name(class_name)
+        fields = []
+        sections = []
+        leaves = []
+        for key, val in config._iter_children():
+            if keyword.iskeyword(key) or key in self.__reserved:
+                raise JCfgInvalidKeyError('{} can not be a field of a generated class'.format(prefix + key))
+            fields.append(key)
+            if isinstance(val, JsonCfg):
+                sections.append((key, self.__write_class(val, '{}_{}'.format(class_name, key), prefix + key + '.')))
+            else:
+                leaves.append((key, val))
+
+        block = ['class {}(GeneratedCfg):'.format(class_name)]
+        # descriptions go into comments, as any text is safe there once split into lines
+        for key, val in leaves:
+            desc = val.get_meta('_desc')
+            if desc:
+                block += ['    # ' + line for line in '{}: {}'.format(key, desc).splitlines()]
+        block.append('    __slots__ = {!r}'.format(tuple(fields)))
+        block.append('    _jcfg_fields = {!r}'.format(tuple(fields)))
+        block.append('    _jcfg_sections = {{{}}}'.format(', '.join(
+            '{!r}: {}'.format(key, section_class) for key, section_class in sections)))
+        block.append('    _jcfg_leaves = {{{}}}'.format(', '.join(
+            '{!r}: ({!r}, {})'.format(key, prefix + key, self.__type_expr(val.type)) for key, val in leaves)))
+        block.append('    _jcfg_validators = _validators')
+        block.append('')
+        section_classes = dict(sections)
+        for key in fields:
+            if key in section_classes:
+                block.append('    {}: {!r}'.format(key, section_classes[key]))
+            else:
+                value_type = config._get_value_slot(key).type
+                if value_type.__class__ is TypedList:
+                    type_expr = "'numpy.ndarray'" if value_type.use_numpy else "'array.array'"
+                else:
+                    type_expr = value_type.__name__
+                block.append('    {}: {}'.format(key, type_expr))
+
+        # keyword __init__, with the defaults of the meta
+        block.append('')
+        params = []
+        body = []
+        for key in fields:
+            if key in section_classes:
+                params.append('{}: {!r} = None'.format(key, section_classes[key]))
+                body.append('        if {0} is None:\n            {0} = {1}._jcfg_default()\n'
+                            '        elif not isinstance({0}, {1}):\n'
+                            '            raise JCfgValueTypeMismatchError({2!r}.format(type({0})))\n'
+                            '        _object_setattr(self, {3!r}, {0})'.format(
+                                key, section_classes[key], 'Sub config {}{} should be a {}, got {{}}'.format(
+                                    prefix, key, section_classes[key]), key))
+            else:
+                val = config._get_value_slot(key)
+                default = val.get_plain()
+                if isinstance(default, list):
+                    params.append('{}=None'.format(key))
+                    body.append('        self.{0} = {1} if {0} is None else {0}'.format(key, _literal(default)))
+                else:
+                    params.append('{}={}'.format(key, _literal(default)))
+                    body.append('        self.{0} = {0}'.format(key))
+        block.append('    def __init__(self, *, {}):'.format(', '.join(params)))
+        block += body
+
+        # defaults, without checks, for from_dict and from_file
+        block += ['', '    @classmethod', '    def _jcfg_default(cls):', '        self = object.__new__(cls)']
+        for key in fields:
+            if key in section_classes:
+                value_expr = '{}._jcfg_default()'.format(section_classes[key])
+            else:
+                val = config._get_value_slot(key)
+                value_expr = _literal(val.get_plain())
+                if val.type.__class__ is TypedList:
+                    value_expr = '{}.convert({})'.format(self.__type_expr(val.type), value_expr)
+            block.append('        _object_setattr(self, {!r}, {})'.format(key, value_expr))
+        block.append('        return self')
+
+        self.__class_blocks.append(block)
+        return class_name
+
+
+def _literal(value):
+    '''Python source of a config value.'''
+    if isinstance(value, float) and value != value:
+        return "float('nan')"
+    if isinstance(value, float) and value in (float('inf'), float('-inf')):
+        return "float('{}')".format(value)
+    if isinstance(value, list):
+        return '[{}]'.format(', '.join(_literal(v) for v in value))
+    return repr(value)
+
+
+def _load_meta(source):
+    '''Load a config meta from a json/yaml file, or from `module:attr`.'''
+    if os.path.exists(source) or ':' not in source:
+        return loader.load_file(source), None
+    import importlib
+    module_name, _, attr = source.partition(':')
+    return getattr(importlib.import_module(module_name), attr), source
+
+
+def main(args=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m jcfg.codegen', description=__doc__.split('\n')[0])
+    parser.add_argument('source', help='config meta, as module:attr, or a json/yaml file')
+    parser.add_argument('-o', '--output', help='module file to write, stdout if not given')
+    parser.add_argument('--class-name', default='Config', help='name of the root config class')
+    args = parser.parse_args(args)
+
+    config_meta, meta_ref = _load_meta(args.source)
+    if args.output is None:
+        print(generate_source(config_meta, args.class_name, meta_ref), end='')
+        return
+    if _read_digest(args.output) == get_digest(config_meta, args.class_name, meta_ref):
+        # the schema did not change since the module was generated
+        return
+    with loader.atomic_write(args.output, 'w', encoding='utf-8') as wf:
+        wf.write(generate_source(config_meta, args.class_name, meta_ref))
+
+
+if __name__ == '__main__':
+    main()
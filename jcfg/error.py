@@ -24,4 +24,16 @@ class JCfgEmptyConfigError(JCfgError):
     pass
 
 class JCfgValidateFailError(JCfgError):
+    def __init__(self, message, failures=()):
+        super().__init__(message)
+        # (key, value, exception raised by the validator or None) of all failed keys
+        self.failures = list(failures)
+
+class JCfgBinaryFormatError(JCfgError):
+    pass
+
+class JCfgSchemaNotFoundError(JCfgError):
+    pass
+
+class JCfgIncludeCycleError(JCfgError):
     pass
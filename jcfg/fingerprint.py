@@ -0,0 +1,134 @@
+'''Content fingerprints of configs, updated incrementally after changes.
+
+The digest of a section is the sum (modulo 2**256) of one hash per child: a leaf hashes its
+key and value, a sub section hashes its key and its own digest. Sums do not depend on the
+order of keys, and a changed leaf only changes the terms on its path to the root: after a
+change, the fingerprint is updated in O(depth) hashes, instead of hashing the whole config.
+
+Values are encoded canonically, so the fingerprint does not depend on where values came
+from (json or yaml files, cli or code): numbers equal in value hash equal (e.g. `1` and
+`1.0`), but booleans differ from numbers, and lists, tuples and typed lists of equal
+elements hash equal.
+'''
+from hashlib import blake2b
+from math import isfinite
+
+_MODULUS = 1 << 256
+
+
+class _SectionDigest(object):
+    __slots__ = ('parent', 'name', 'depth', 'total', 'terms')
+
+    def __init__(self, parent, name, depth):
+        self.parent = parent
+        self.name = name
+        self.depth = depth
+        self.total = 0
+        # child key -> hash term of the child
+        self.terms = {}
+
+
+class ConfigDigest(object):
+    '''Digests of all sections of a config, and the pending changes of its values.'''
+
+    def __init__(self, config):
+        # JsonCfgValue -> (section digest, key) of every leaf
+        self.__leaves = {}
+        self.__root = self.__build(config, None, '', 0)
+        # JsonCfgValue written since the last update
+        self.pending = set()
+
+    def __build(self, config, parent, name, depth):
+        section = _SectionDigest(parent, name, depth)
+        terms = section.terms
+        leaf_keys = []
+        leaf_texts = []
+        for key, val in config._iter_children():
+            if val.__class__ is config.__class__:
+                terms[key] = _hash_section(key, self.__build(val, section, key, depth + 1).total)
+            else:
+                self.__leaves[val] = (section, key)
+                leaf_keys.append(key)
+                leaf_texts.append(_get_leaf_text(key, val.get()))
+        # leaves of a section are hashed in a single loop, the bulk of the work for big configs
+        terms.update(zip(leaf_keys, map(_hash_text, leaf_texts)))
+        section.total = sum(terms.values()) % _MODULUS
+        return section
+
+    def hexdigest(self):
+        if self.pending:
+            self.__update()
+        return blake2b(self.__root.total.to_bytes(32, 'big'), digest_size=32).hexdigest()
+
+    def __update(self):
+        pending = list(self.pending)
+        self.pending.difference_update(pending)
+        dirty = {}
+        for val in pending:
+            leaf = self.__leaves.get(val)
+            if leaf is None:
+                # a value of the same config tree, outside of this section
+                continue
+            section, key = leaf
+            if _add_term(section, key, _hash_leaf(key, val.get())):
+                dirty[id(section)] = section
+        # update parents bottom up, so that each section is hashed once
+        while dirty:
+            max_depth = max(section.depth for section in dirty.values())
+            next_dirty = {}
+            for section_id, section in dirty.items():
+                parent = section.parent
+                if section.depth == max_depth and parent is not None:
+                    if _add_term(parent, section.name, _hash_section(section.name, section.total)):
+                        next_dirty[id(parent)] = parent
+                elif section.depth < max_depth:
+                    next_dirty[section_id] = section
+            dirty = next_dirty
+
+
+def _add_term(section, key, term):
+    old_term = section.terms[key]
+    if term == old_term:
+        return False
+    section.terms[key] = term
+    section.total = (section.total + term - old_term) % _MODULUS
+    return True
+
+
+def _hash_leaf(key, value):
+    return _hash_text(_get_leaf_text(key, value))
+
+
+def _get_leaf_text(key, value):
+    # keys never contain '\0', and the value comes last, so the text is unambiguous
+    return 'v{}\0{}'.format(key, _encode_value(value))
+
+
+def _hash_text(text):
+    return int.from_bytes(blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=32).digest(), 'big')
+
+
+def _hash_section(key, total):
+    return int.from_bytes(blake2b('s{}\0{:064x}'.format(key, total).encode('utf-8'), digest_size=32).digest(), 'big')
+
+
+def _encode_value(value):
+    value_type = type(value)
+    if value_type is str:
+        return 's' + value
+    elif value_type is int:
+        return 'i%d' % value
+    elif value_type is float:
+        if isfinite(value) and value.is_integer():
+            return 'i%d' % value
+        return 'f%r' % value
+    elif value_type is bool:
+        return 'T' if value else 'F'
+    elif value is None:
+        return 'N'
+    if not isinstance(value, (list, tuple)):
+        # typed lists, stored in arrays
+        value = value.tolist()
+    # items are length prefixed, so that nested lists and strings are unambiguous
+    items = [_encode_value(item) for item in value]
+    return 'l' + ''.join(['%d:%s' % (len(item), item) for item in items])
@@ -0,0 +1,140 @@
+from .error import JCfgInvalidSetValueError, JCfgKeyNotFoundError
+
+
+class FrozenCfg(object):
+    '''Immutable snapshot of a JsonCfg, created by `JsonCfg.freeze()`.
+
+    Each section is an instance of a generated `__slots__` class whose slots are the config
+    keys, so `snap.sub_config.sub_int` is a plain attribute load. List values are stored as
+    tuples, which makes snapshots hashable and safe to share between threads.
+    '''
+    __slots__ = ()
+    __jcfg_fields__ = ()
+    __jcfg_slot_setters__ = ()
+
+    def __setattr__(self, key, value):
+        raise JCfgInvalidSetValueError('Cannot set value to a frozen config: {}'.format(key))
+
+    def __delattr__(self, key):
+        raise JCfgInvalidSetValueError('Cannot delete key of a frozen config: {}'.format(key))
+
+    def __getitem__(self, key):
+        value = self
+        for name in key.split('.'):
+            if not isinstance(value, FrozenCfg) or name not in value.__jcfg_fields__:
+                raise JCfgKeyNotFoundError('Config key: {} not defined!'.format(key))
+            value = getattr(value, name)
+        return value
+
+    def __values(self):
+        return tuple(getattr(self, name) for name in self.__jcfg_fields__)
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenCfg):
+            return NotImplemented
+        return self.__jcfg_fields__ == other.__jcfg_fields__ and self.__values() == other.__values()
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __hash__(self):
+        return hash((self.__jcfg_fields__, self.__values()))
+
+    def __reduce__(self):
+        return make_frozen_cfg, (self.__jcfg_fields__, self.__values())
+
+    def __repr__(self):
+        return 'FrozenCfg({})'.format(', '.join(
+            '{}={!r}'.format(name, getattr(self, name)) for name in self.__jcfg_fields__))
+
+    def keys(self):
+        for name in self.__jcfg_fields__:
+            value = getattr(self, name)
+            if isinstance(value, FrozenCfg):
+                for _k in value.keys():
+                    yield '{}.{}'.format(name, _k)
+            else:
+                yield name
+
+    def items(self):
+        for key in self.keys():
+            yield key, self.__getitem__(key)
+
+    def to_dict(self):
+        dst = {}
+        for name in self.__jcfg_fields__:
+            value = getattr(self, name)
+            if isinstance(value, FrozenCfg):
+                dst[name] = value.to_dict()
+            else:
+                dst[name] = _thaw_value(value)
+        return dst
+
+
+_frozen_classes = {}
+
+
+def _get_frozen_class(fields):
+    cls = _frozen_classes.get(fields)
+    if cls is None:
+        cls = type('FrozenCfg', (FrozenCfg,), {'__slots__': fields, '__jcfg_fields__': fields})
+        slots = []
+        for name in fields:
+            if name.startswith('__') and not name.endswith('__'):
+                # private names in __slots__ are mangled, the slot of `__x` is also set as `__x`
+                slot = cls.__dict__['_FrozenCfg' + name]
+                setattr(cls, name, slot)
+            else:
+                slot = cls.__dict__[name]
+            slots.append(slot)
+        cls.__jcfg_slot_setters__ = tuple(slot.__set__ for slot in slots)
+        _frozen_classes[fields] = cls
+    return cls
+
+
+def make_frozen_cfg(fields, values):
+    '''Create a frozen section, `fields` should be a sorted tuple of keys matching `values`.'''
+    cls = _get_frozen_class(fields)
+    obj = object.__new__(cls)
+    for setter, value in zip(cls.__jcfg_slot_setters__, values):
+        setter(obj, value)
+    return obj
+
+
+def replace_values(section, changes):
+    '''Return a copy of frozen `section` with values of dotted keys replaced by `changes`.
+
+    Only the sections on the paths of changed keys are rebuilt, all others are shared with
+    `section`.
+    '''
+    grouped = {}
+    for key, value in changes.items():
+        name, _, sub_key = key.partition('.')
+        grouped.setdefault(name, {})[sub_key] = value
+    values = []
+    for name in section.__jcfg_fields__:
+        value = getattr(section, name)
+        sub_changes = grouped.get(name)
+        if sub_changes is not None:
+            if '' in sub_changes:
+                value = sub_changes['']
+            else:
+                value = replace_values(value, sub_changes)
+        values.append(value)
+    return make_frozen_cfg(section.__jcfg_fields__, values)
+
+
+def freeze_value(value):
+    if isinstance(value, list):
+        return tuple(freeze_value(v) for v in value)
+    elif not isinstance(value, (int, float, str, tuple)) and hasattr(value, 'tolist'):
+        # typed lists, stored in arrays
+        return tuple(value.tolist())
+    return value
+
+
+def _thaw_value(value):
+    if isinstance(value, tuple):
+        return [_thaw_value(v) for v in value]
+    return value
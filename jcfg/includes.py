@@ -0,0 +1,143 @@
+'''Config files made of shared fragments, with the `_include` directive.
+
+A json or yaml config file can list other files (paths relative to the including file)
+at its top level:
+
+    {"_include": ["model/base.json", "data/imagenet.yaml"], "model.depth": 50}
+
+The included fragments may include further fragments, forming a DAG of files, which is
+checked for cycles. Values are merged depth first, in the listed order: the fragments
+included by a file come before the file itself, later fragments override earlier ones, and
+a fragment included several times is merged once, at its first occurrence.
+
+Independent fragments are read (and parsed) on a thread pool, one level of the DAG at a
+time. Parsed fragments are cached per process by path, and reused by any config including
+them, as long as the file stat is unchanged.
+'''
+import os
+
+from .error import JCfgIncludeCycleError, JCfgInvalidValueError
+from .json_config import _copy_value
+from . import loader
+
+# parsed fragments are dropped when more than this are cached, to bound memory
+_MAX_CACHED_FRAGMENTS = 10000
+
+_fragment_cache = {}
+
+
+class _Fragment(object):
+    __slots__ = ('stat', 'includes', 'values')
+
+    def __init__(self, stat, includes, values):
+        self.stat = stat
+        # absolute paths of the included fragments, in the listed order
+        self.includes = includes
+        # flattened values of the file itself, never modified once built
+        self.values = values
+
+
+def load_includes(config_path, flat_config, cache=False, workers=None, file_stats=None):
+    '''Return `flat_config` of `config_path` merged with all fragments it includes.
+
+    `flat_config` is the flattened content of `config_path`, including its `_include`
+    directive. With `cache`, fragments are also cached on disk, as by `update_from_file`.
+    Fragments are loaded on up to `workers` threads. If given, dict `file_stats` is filled
+    with the stat (inode, mtime, size) of every fragment, as seen when it was parsed.
+    '''
+    config_path = os.path.abspath(config_path)
+    values = dict(flat_config)
+    root = _Fragment(None, _get_include_paths(config_path, values.pop(loader.INCLUDE_KEY, None)), values)
+    fragments = _load_fragments(root, cache, workers)
+
+    merged = {}
+    for path in _get_merge_order(config_path, root, fragments):
+        if path == config_path:
+            merged.update(root.values)
+        else:
+            # cached values are shared by every config including the fragment, lists are copied
+            merged.update((key, _copy_value(value)) for key, value in fragments[path].values.items())
+    if file_stats is not None:
+        file_stats.update((path, fragment.stat) for path, fragment in fragments.items())
+    return merged
+
+
+def clear_cache():
+    _fragment_cache.clear()
+
+
+def _load_fragments(root, cache, workers):
+    # load the DAG level by level, so that all fragments of a level are loaded concurrently
+    fragments = {}
+    pending = list(dict.fromkeys(root.includes))
+    executor = None
+    try:
+        while pending:
+            if len(pending) > 1 and workers != 1:
+                if executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    executor = ThreadPoolExecutor(max_workers=workers)
+                loaded = list(executor.map(lambda path: _get_fragment(path, cache), pending))
+            else:
+                loaded = [_get_fragment(path, cache) for path in pending]
+            fragments.update(zip(pending, loaded))
+            pending = list(dict.fromkeys(path for fragment in loaded for path in fragment.includes
+                                         if path not in fragments))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return fragments
+
+
+def _get_fragment(path, cache):
+    stat = loader.get_file_stat(path)
+    fragment = _fragment_cache.get(path)
+    if fragment is not None and fragment.stat == stat:
+        return fragment
+
+    if cache:
+        from .cache import load_flat_config
+        values = load_flat_config(path, cache_dir=None if cache is True else cache)
+    else:
+        values = loader.flatten_file_config(loader.load_file(path))
+    fragment = _Fragment(stat, _get_include_paths(path, values.pop(loader.INCLUDE_KEY, None)), values)
+    # do not cache content of a file which was modified while being parsed
+    if loader.get_file_stat(path) == stat:
+        if len(_fragment_cache) >= _MAX_CACHED_FRAGMENTS:
+            _fragment_cache.clear()
+        _fragment_cache[path] = fragment
+    return fragment
+
+
+def _get_include_paths(path, include):
+    if include is None:
+        return ()
+    if isinstance(include, str):
+        include = [include]
+    if not isinstance(include, list) or not all(isinstance(p, str) for p in include):
+        raise JCfgInvalidValueError('{} of {} should be a path or a list of paths, got: {!r}'.format(
+            loader.INCLUDE_KEY, path, include))
+    dir_name = os.path.dirname(path)
+    return tuple(os.path.normpath(os.path.join(dir_name, p)) for p in include)
+
+
+def _get_merge_order(root_path, root, fragments):
+    '''Return paths in merge order, raise JCfgIncludeCycleError if fragments include each other.'''
+    order = []
+    done = set()
+    # iterative dfs, with the include chain of the current path kept for the error message
+    chain = [root_path]
+    stack = [iter(root.includes)]
+    while stack:
+        path = next(stack[-1], None)
+        if path is None:
+            stack.pop()
+            done.add(chain[-1])
+            order.append(chain.pop())
+        elif path in chain:
+            cycle = chain[chain.index(path):] + [path]
+            raise JCfgIncludeCycleError('Include cycle: {}'.format(' -> '.join(cycle)))
+        elif path not in done:
+            chain.append(path)
+            stack.append(iter(fragments[path].includes))
+    return order
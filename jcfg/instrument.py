@@ -0,0 +1,119 @@
+'''Opt-in instrumentation of configs: per-key read/write counters and load stage timings.
+
+    from jcfg import instrument
+
+    stats = instrument.enable()
+    cfg.update_from_file('config.json')
+    ...
+    print(stats.report(cfg)['never_read'])
+    instrument.disable()
+
+While disabled (the default), the only cost on config accesses is a check for None.
+Counters are kept per config value object, so `report(config)` maps them to the dotted
+keys of `config`, including keys read through sub configs. Counters are not locked, so
+counts of keys accessed concurrently from many threads may be slightly off.
+'''
+import contextlib
+import time
+import weakref
+
+_stats = None
+
+
+class ConfigStats(object):
+    '''Counters and stage timings collected while instrumentation is enabled.'''
+
+    def __init__(self):
+        self.__reads = weakref.WeakKeyDictionary()
+        self.__writes = weakref.WeakKeyDictionary()
+        self.__stages = {}
+
+    def count_read(self, jcfg_value):
+        self.__reads[jcfg_value] = self.__reads.get(jcfg_value, 0) + 1
+
+    def count_write(self, jcfg_value):
+        self.__writes[jcfg_value] = self.__writes.get(jcfg_value, 0) + 1
+
+    def add_stage_time(self, name, seconds):
+        calls, total = self.__stages.get(name, (0, 0.0))
+        self.__stages[name] = (calls + 1, total + seconds)
+
+    def reset(self):
+        self.__reads.clear()
+        self.__writes.clear()
+        self.__stages.clear()
+
+    def report(self, config):
+        '''Return counters of the leaf keys of `config`, and all stage timings, as a dict.
+
+        `reads` and `writes` only list keys accessed at least once, `never_read` lists all
+        other leaf keys in order. `stages` maps stage names (e.g. 'update_from_file.parse')
+        to their number of calls and total seconds.
+        '''
+        reads = {}
+        writes = {}
+        never_read = []
+        for key in config.keys():
+            jcfg_value = config._get_value_slot(key)
+            read_count = self.__reads.get(jcfg_value, 0)
+            if read_count:
+                reads[key] = read_count
+            else:
+                never_read.append(key)
+            write_count = self.__writes.get(jcfg_value, 0)
+            if write_count:
+                writes[key] = write_count
+        stages = {name: {'calls': calls, 'seconds': total}
+                  for name, (calls, total) in sorted(self.__stages.items())}
+        return {'reads': reads, 'writes': writes, 'never_read': never_read, 'stages': stages}
+
+    def dump_report(self, config, path, indent=4):
+        '''Save `report(config)` into a json or yaml file.'''
+        from . import loader
+        loader.dump_file(self.report(config), path, indent=indent, sort_keys=True)
+
+
+def enable():
+    '''Start collecting stats, and return the active ConfigStats.'''
+    global _stats
+    if _stats is None:
+        _stats = ConfigStats()
+    return _stats
+
+
+def disable():
+    '''Stop collecting stats, and return the ConfigStats collected so far, or None.'''
+    global _stats
+    stats, _stats = _stats, None
+    return stats
+
+
+def get_stats():
+    return _stats
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_null_stage = _NullStage()
+
+
+def stage(name):
+    '''Context manager timing stage `name` if instrumentation is enabled.'''
+    if _stats is None:
+        return _null_stage
+    return _timed_stage(_stats, name)
+
+
+@contextlib.contextmanager
+def _timed_stage(stats, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_stage_time(name, time.perf_counter() - start)
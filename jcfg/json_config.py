@@ -1,42 +1,141 @@
+import functools
+import itertools
+import math
+import os
 import re
-import argparse
-import json
-import pprint
-
-import jstyleson
-import yaml
+import sys
+import types
 
 from .error import JCfgInvalidKeyError, JCfgInvalidValueError, JCfgKeyNotFoundError, JCfgValueTypeMismatchError, \
-    JCfgInvalidSetValueError, JCfgEmptyConfigError, JCfgValidateFailError
+    JCfgInvalidSetValueError, JCfgEmptyConfigError, JCfgSchemaNotFoundError
+from .frozen import make_frozen_cfg, freeze_value
+from .typed_list import TypedList, get_typed_list_type
+from .validation import check_value, raise_failures
+from . import loader
+from . import instrument
 
 _DEFAULT_KEY = '_default'
+_NOT_SET = object()
+_modification_counter = itertools.count(1)
+
+
+class _ModificationState(object):
+    '''Modification version of a config tree, shared by the root config and all its sub configs.'''
+    __slots__ = ('version', 'digests')
+
+    def __init__(self):
+        self.version = 0
+        # ConfigDigest of every section of the tree with a fingerprint
+        self.digests = []
+
+    def touch(self):
+        # next() of itertools.count is atomic, so concurrent writers never share a version
+        self.version = next(_modification_counter)
+
+    def add_digest_writes(self, jcfg_values):
+        for digest in self.digests:
+            digest.pending.update(jcfg_values)
+
 
 class JsonCfg(object):
     __valid_key_pattern = r'[A-Za-z_][A-Za-z0-9_]*'
     __reo = re.compile(__valid_key_pattern)
+    __internal_attrs = ('_JsonCfg__config_desc', '_JsonCfg__key_index', '_JsonCfg__schema', '_JsonCfg__state',
+                       '_JsonCfg__validation_plan', '_JsonCfg__digest', '_JsonCfg__saved_files')
+    __slots__ = __internal_attrs + ('__weakref__',)
 
     def __init__(self, config_meta):
         if not isinstance(config_meta, dict):
             raise ValueError(
                 'Cannot init from {}, a dict is needed'.format(type(dict)))
-        self.__config_desc = self.__load_from(config_meta)
+        config_desc = self.__load_from(config_meta)
+        self.__init_section(config_desc, self.__build_key_index(config_desc), None, None)
+        self.__share_state(_ModificationState())
+
+    def __init_section(self, config_desc, key_index, schema, validation_plan):
+        set_attr = object.__setattr__
+        set_attr(self, '_JsonCfg__config_desc', config_desc)
+        set_attr(self, '_JsonCfg__key_index', key_index)
+        set_attr(self, '_JsonCfg__schema', schema)
+        set_attr(self, '_JsonCfg__validation_plan', validation_plan)
+        set_attr(self, '_JsonCfg__state', None)
+        set_attr(self, '_JsonCfg__digest', None)
+        # (abs path, indent, sort_keys) -> (version, file stat) of saves with skip_unchanged
+        set_attr(self, '_JsonCfg__saved_files', None)
+
+    @staticmethod
+    def __new_section(config_desc):
+        '''Create a sub config, which only indexes its direct children until a dotted key is used.'''
+        section = JsonCfg.__new__(JsonCfg)
+        section.__init_section(config_desc, config_desc, None, None)
+        return section
 
     @classmethod
     def __load_from(cls, config_meta):
         config_desc = {}
         if len(config_meta) == 0:
             raise JCfgEmptyConfigError()
+        reserved_keys = cls.__get_reserved_keys()
         for key in config_meta:
             cls.__assert_valid_key(key)
-            if key in dir(cls):
+            if key in reserved_keys:
                 raise JCfgInvalidKeyError('{} is reserved, should not be used as config key.'.format(key))
             value = config_meta[key]
             if isinstance(value, dict) and _DEFAULT_KEY not in value:
-                config_desc[key] = JsonCfg(config_meta[key])
+                config_desc[key] = cls.__new_section(cls.__load_from(value))
             else:
                 config_desc[key] = JsonCfgValue.create_from_value(value)
         return config_desc
 
+    @classmethod
+    def __get_reserved_keys(cls):
+        reserved_keys = cls.__dict__.get('_JsonCfg__reserved_keys')
+        if reserved_keys is None:
+            reserved_keys = frozenset(dir(cls))
+            cls.__reserved_keys = reserved_keys
+        return reserved_keys
+
+    @staticmethod
+    def __build_key_index(config_desc):
+        '''Flatten the config tree into a dotted-key -> JsonCfgValue/JsonCfg dict.
+
+        The tree structure never changes after construction and values are updated
+        in place, so the index stays valid for the lifetime of the config.
+        '''
+        key_index = {}
+        JsonCfg.__index_section(key_index, config_desc, '')
+        return key_index
+
+    @staticmethod
+    def __index_section(key_index, config_desc, prefix):
+        # a sub config is listed right before all of its own keys
+        for key, val in config_desc.items():
+            full_key = sys.intern(prefix + key) if prefix else key
+            key_index[full_key] = val
+            if val.__class__ is JsonCfg:
+                JsonCfg.__index_section(key_index, val.__config_desc, full_key + '.')
+
+    @staticmethod
+    def __iter_index_values(config_desc):
+        # values of a config tree, in the order of its key index
+        for val in config_desc.values():
+            yield val
+            if val.__class__ is JsonCfg:
+                yield from JsonCfg.__iter_index_values(val.__config_desc)
+
+    def __get_full_index(self):
+        key_index = self.__key_index
+        if key_index is self.__config_desc and any(val.__class__ is JsonCfg for val in key_index.values()):
+            key_index = self.__build_key_index(self.__config_desc)
+            object.__setattr__(self, '_JsonCfg__key_index', key_index)
+        return key_index
+
+    def __share_state(self, state):
+        object.__setattr__(self, '_JsonCfg__state', state)
+        for val in self.__config_desc.values():
+            if val.__class__ is JsonCfg:
+                val.__share_state(state)
+
     @classmethod
     def __assert_valid_key(cls, key):
         if cls.__reo.fullmatch(key) is None:
@@ -65,28 +164,101 @@ class JsonCfg(object):
             assert isinstance(sub_config, JsonCfg)
             return sub_config.__get_sub_config_or_value(key_list[1])
 
+    def __lookup(self, key):
+        try:
+            return self.__key_index[key]
+        except (KeyError, TypeError):
+            return self.__lookup_slow(key)
+
+    def __lookup_slow(self, key):
+        # dotted keys of a sub config are indexed on first use
+        key_index = self.__get_full_index()
+        try:
+            return key_index[key]
+        except (KeyError, TypeError):
+            # slow path, only used to report a proper error for invalid keys
+            return self.__get_sub_config_or_value(key)
+
     def __getitem__(self, key):
-        _value = self.__get_sub_config_or_value(key)
+        try:
+            _value = self.__key_index[key]
+        except (KeyError, TypeError):
+            _value = self.__lookup_slow(key)
         if isinstance(_value, JsonCfgValue):
+            if instrument._stats is not None:
+                instrument._stats.count_read(_value)
             return _value.get()
         else:
             assert isinstance(_value, JsonCfg), type(_value)
             return _value
 
     def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            # special methods looked up by pickle, copy, etc. are never config keys
+            raise AttributeError(name)
         return self.__getitem__(name)
     
     def __setitem__(self, key, value):
-        jcfg_value = self.__get_sub_config_or_value(key)
+        jcfg_value = self.__lookup(key)
         if not isinstance(jcfg_value, JsonCfgValue):
             raise JCfgInvalidSetValueError('Cannot set value to a sub config: {}'.format(key))
+        value = jcfg_value.check(value)
+        validate_func = jcfg_value.validate_func
+        if validate_func is not None:
+            passed, error = check_value(validate_func, value)
+            if not passed:
+                raise_failures([(key, value, error)])
         jcfg_value.set(value)
-        if jcfg_value.validate() is False:
-            raise JCfgValidateFailError('Validate failure of key: {}={}'.format(key, value))
+        state = self.__state
+        state.touch()
+        if state.digests:
+            state.add_digest_writes((jcfg_value,))
+        if instrument._stats is not None:
+            instrument._stats.count_write(jcfg_value)
+
+    def update(self, mapping):
+        '''Update config values from a dict, as a single batch.
+
+        `mapping` can be nested like the config, and/or use dotted keys. All keys are resolved,
+        type checked and validated before any value is assigned, so either all values are
+        updated, or none of them if an error is raised.
+        '''
+        self.__update_flat(loader.flatten_config(mapping, allow_private=True))
+
+    def __update_flat(self, flat_mapping):
+        resolved = []
+        for key, value in flat_mapping.items():
+            jcfg_value = self.__lookup(key)
+            if not isinstance(jcfg_value, JsonCfgValue):
+                raise JCfgInvalidSetValueError('Cannot set value to a sub config: {}'.format(key))
+            resolved.append((key, jcfg_value, jcfg_value.check(value)))
+
+        failures = []
+        for key, jcfg_value, value in resolved:
+            validate_func = jcfg_value.validate_func
+            if validate_func is not None:
+                passed, error = check_value(validate_func, value)
+                if not passed:
+                    failures.append((key, value, error))
+        if failures:
+            raise_failures(failures)
+
+        for _, jcfg_value, value in resolved:
+            jcfg_value.set(value)
+        if resolved:
+            state = self.__state
+            state.touch()
+            if state.digests:
+                state.add_digest_writes([jcfg_value for _, jcfg_value, _ in resolved])
+        if instrument._stats is not None:
+            for _, jcfg_value, _ in resolved:
+                instrument._stats.count_write(jcfg_value)
 
     def __setattr__(self, key, value):
-        if key == '_JsonCfg__config_desc':
-            if key not in self.__dict__:
+        if key in self.__internal_attrs:
+            try:
+                object.__getattribute__(self, key)
+            except AttributeError:
                 return object.__setattr__(self, key, value)
 
         return self.__setitem__(key, value)
@@ -108,12 +280,101 @@ class JsonCfg(object):
         dst = {}
         for key, val in self.__config_desc.items():
             if isinstance(val, JsonCfgValue):
-                dst[key] = val.get()
+                dst[key] = val.get_plain()
             else:
                 assert isinstance(val, JsonCfg)
                 dst[key] = val.to_dict()
         
         return dst
+
+    def copy(self):
+        '''Return a new config of the same schema, with values copied from this config.
+
+        Meta info (type, default, description, validator) is shared with this config, so
+        copying is much cheaper than building a new JsonCfg from the config meta.
+        '''
+        config_desc = self.__copy_desc()
+        # the new index reuses the key strings, walking the new tree in the same order
+        key_index = dict(zip(self.__get_full_index().keys(), self.__iter_index_values(config_desc)))
+        new_cfg = JsonCfg.__new__(JsonCfg)
+        new_cfg.__init_section(config_desc, key_index, self.__schema, self.__validation_plan)
+        new_cfg.__share_state(_ModificationState())
+        return new_cfg
+
+    def __copy_desc(self):
+        config_desc = {}
+        for key, val in self.__config_desc.items():
+            if val.__class__ is JsonCfg:
+                config_desc[key] = self.__new_section(val.__copy_desc())
+            else:
+                config_desc[key] = val.copy()
+        return config_desc
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __reduce__(self):
+        # pickled as a schema, which is sent by fingerprint if possible, plus a flat value array
+        if self.__schema is None:
+            JsonCfgSchema._from_config(self)
+        key_index = self.__get_full_index()
+        values = tuple(key_index[key].get() for key in self.__schema.leaf_keys)
+        return _restore_config, (self.__schema, values)
+
+    def _set_schema(self, schema):
+        object.__setattr__(self, '_JsonCfg__schema', schema)
+
+    def _get_value_slot(self, key):
+        return self.__get_full_index()[key]
+
+    def _restore_values(self, keys, values):
+        key_index = self.__get_full_index()
+        jcfg_values = [key_index[key] for key in keys]
+        for jcfg_value, value in zip(jcfg_values, values):
+            jcfg_value.set(value)
+        if self.__state.digests:
+            self.__state.add_digest_writes(jcfg_values)
+
+    def _iter_children(self):
+        return self.__config_desc.items()
+
+    def fingerprint(self):
+        '''Return a hex digest of config values, which is equal for configs of equal content.
+
+        The digest does not depend on key order, or on the files values were loaded from, and
+        numbers equal in value (e.g. `1` and `1.0`) are equal. It is updated incrementally:
+        after values are changed, only the sections containing them are hashed again.
+        '''
+        digest = self.__digest
+        if digest is None:
+            from .fingerprint import ConfigDigest
+            digest = ConfigDigest(self)
+            object.__setattr__(self, '_JsonCfg__digest', digest)
+            self.__state.digests.append(digest)
+        return digest.hexdigest()
+
+    def to_meta(self):
+        '''Return a config meta dict describing this config, which can build a new JsonCfg.'''
+        config_meta = {}
+        for key, val in self.__config_desc.items():
+            config_meta[key] = val.to_meta()
+        return config_meta
+
+    def freeze(self):
+        '''Return an immutable, hashable snapshot (FrozenCfg) of current config values.'''
+        fields = tuple(sorted(self.__config_desc.keys()))
+        values = []
+        for key in fields:
+            val = self.__config_desc[key]
+            if isinstance(val, JsonCfgValue):
+                values.append(freeze_value(val.get()))
+            else:
+                assert isinstance(val, JsonCfg)
+                values.append(val.freeze())
+        return make_frozen_cfg(fields, values)
     
     def public_keys(self):
         for key in sorted(self.__config_desc.keys()):
@@ -129,93 +390,439 @@ class JsonCfg(object):
         for key in self.public_keys():
             yield key, self.__getitem__(key)
 
-    def parse_args(self, description=None):
-        parser = argparse.ArgumentParser(description=description)
-        
-        cfg_file_dest = '@load_path'
-        parser.add_argument('-c', help='file path to update config', type=str, metavar='CONFIG_PATH', dest=cfg_file_dest)
+    def parse_args(self, description=None, args=None, fast=False):
+        '''Update config from cli options `args` (default: sys.argv[1:]).
 
-        cfg_save_dest = '@save_path'
-        parser.add_argument('-s', help='file path to dump final config', type=str, metavar='SAVE_PATH', dest=cfg_save_dest)
+        With `fast=True`, `--dotted.key value` options are parsed directly against the key
+        index, without building an argparse parser. Whenever the fast path can not give the
+        same result as argparse (e.g. `-h`, abbreviated or unknown options, invalid values),
+        it falls back to the argparse parser, which also reports errors.
+        '''
+        parsed = self._parse_cli(description, args, fast)
+        with instrument.stage('parse_args.apply'):
+            self.__apply_args(*parsed)
 
-        all_keys = list(self.public_keys())
-        for key in all_keys:
-            jcfg_value = self.__get_sub_config_or_value(key)
-            assert isinstance(jcfg_value, JsonCfgValue), key
-            jcfg_value.add_to_argument(parser, key)
-        
-        args = parser.parse_args()
+    def _parse_cli(self, description=None, args=None, fast=False):
+        '''Parse cli options, and return (load path, save path, cli values) without applying them.'''
+        if args is None:
+            args = sys.argv[1:]
+
+        if fast:
+            with instrument.stage('parse_args.parse'):
+                parsed = self.__fast_parse_args(args)
+            if parsed is not None:
+                return parsed
+
+        import argparse
+
+        with instrument.stage('parse_args.build'):
+            parser = argparse.ArgumentParser(description=description)
+
+            cfg_file_dest = '@load_path'
+            parser.add_argument('-c', help='file path to update config', type=str, metavar='CONFIG_PATH', dest=cfg_file_dest)
+
+            cfg_save_dest = '@save_path'
+            parser.add_argument('-s', help='file path to dump final config', type=str, metavar='SAVE_PATH', dest=cfg_save_dest)
+
+            all_keys = list(self.public_keys())
+            for key in all_keys:
+                jcfg_value = self.__lookup(key)
+                assert isinstance(jcfg_value, JsonCfgValue), key
+                jcfg_value.add_to_argument(parser, key)
+
+        with instrument.stage('parse_args.parse'):
+            args = parser.parse_args(args)
         args = vars(args)
         cfg_path = args.pop(cfg_file_dest)
-        if cfg_path is not None:
-            self.update_from_file(cfg_path)
-
         cfg_save_path = args.pop(cfg_save_dest)
 
+        all_keys = set(all_keys)
+        cli_values = {}
         for k, v in args.items():
             if v is None:
                 continue
             if k not in all_keys:
                 raise ValueError('Unkown config key: {}'.format(k))
-            
-            cfg_value = self.__get_sub_config_or_value(k)
-            if not isinstance(cfg_value, JsonCfgValue):
-                raise JCfgInvalidSetValueError('Cannot set value to a sub config: {}'.format(k))
-            cfg_value.set(v)
-            if cfg_value.validate() is False:
-                raise JCfgValidateFailError('Validate failure of key: {}={}'.format(k, v))
+            cli_values[k] = v
+        return cfg_path, cfg_save_path, cli_values
+
+    def __apply_args(self, cfg_path, cfg_save_path, cli_values):
+        # values from file are overridden by cli options, then applied as a single batch
+        new_values = self._load_flat_file(cfg_path) if cfg_path is not None else {}
+        new_values.update(cli_values)
+        self.__update_flat(new_values)
         
         if cfg_save_path is not None:
             self.save_to_file(cfg_save_path)
+
+    def __fast_parse_args(self, args):
+        '''Return (load path, save path, cli values), or None if argparse is needed.'''
+        key_index = self.__get_full_index()
+        cfg_path = None
+        cfg_save_path = None
+        cli_values = {}
+        idx = 0
+        while idx < len(args):
+            arg = args[idx]
+            if arg == '-c' or arg == '-s':
+                if idx + 1 >= len(args) or _looks_like_option(args[idx + 1]):
+                    return None
+                if arg == '-c':
+                    cfg_path = args[idx + 1]
+                else:
+                    cfg_save_path = args[idx + 1]
+                idx += 2
+                continue
+
+            if not arg.startswith('--') or arg == '--':
+                return None
+            key, has_inline_value, inline_value = arg[2:].partition('=')
+            jcfg_value = key_index.get(key)
+            if not isinstance(jcfg_value, JsonCfgValue) or key.startswith('_') or '._' in key or key == 'help':
+                return None
+            idx += 1
+
+            if jcfg_value.is_list:
+                if has_inline_value:
+                    items = [inline_value]
+                else:
+                    items = []
+                    while idx < len(args) and not _looks_like_option(args[idx]):
+                        items.append(args[idx])
+                        idx += 1
+                if jcfg_value.type != list:
+                    try:
+                        items = jcfg_value.type.parse_strs(items)
+                    except Exception:
+                        return None
+                cli_values[key] = items
+            else:
+                if has_inline_value:
+                    str_value = inline_value
+                elif idx < len(args) and not _looks_like_option(args[idx]):
+                    str_value = args[idx]
+                    idx += 1
+                else:
+                    return None
+                try:
+                    cli_values[key] = jcfg_value.parse_str(str_value)
+                except Exception:
+                    return None
+        return cfg_path, cfg_save_path, cli_values
     
-    def update_from_file(self, config_path):
-        if config_path.endswith('.yaml'):
-            with open(config_path, encoding='utf-8') as rf:
-                config = yaml.safe_load(rf)
+    def update_from_file(self, config_path, cache=False, workers=None):
+        '''Update config values from a json, yaml or binary (`.jcfgb`) file.
+
+        If `cache` is True, the flattened content of the file is cached next to it, or inside
+        directory `cache`, if it is a path. Later loads of the unchanged file skip parsing.
+        Fragments listed by an `_include` directive are loaded on up to `workers` threads,
+        see `jcfg.includes`.
+        '''
+        flat_config = self._load_flat_file(config_path, cache, workers)
+        with instrument.stage('update_from_file.apply'):
+            self.__update_flat(flat_config)
+
+    async def aupdate_from_file(self, config_path, cache=False, executor=None):
+        '''Awaitable `update_from_file`, which reads and parses the file on a thread pool.
+
+        See `jcfg.aio` to load many files concurrently.
+        '''
+        from .aio import update_from_files
+        await update_from_files(self, [config_path], cache, executor)
+
+    @staticmethod
+    def _load_flat_file(config_path, cache=False, workers=None):
+        if loader.is_binary_path(config_path):
+            # binary files are decoded without parsing, and need no cache
+            from .binary import load_flat_file
+            with instrument.stage('update_from_file.read'):
+                flat_config = load_flat_file(config_path)
+            for key in flat_config:
+                if key.rpartition('.')[2].startswith('_'):
+                    raise ValueError('Config key starts with "_" is private key, which is immutable!')
+            return flat_config
+        if cache:
+            from .cache import load_flat_config
+            with instrument.stage('update_from_file.cache'):
+                flat_config = load_flat_config(config_path, cache_dir=None if cache is True else cache)
         else:
-            # load config as json file
-            with open(config_path, encoding='utf-8') as rf:
-                config = jstyleson.load(rf)
-        
-        def _load_key_value_from_dict(config):
-            _ret_dict = {}
-            for k, v in config.items():
-                if isinstance(v, dict):
-                    _sub_ret_dict = _load_key_value_from_dict(v)
-                    for sub_k, sub_v in _sub_ret_dict.items():
-                        _new_k = '.'.join([k, sub_k])
-                        _ret_dict[_new_k] = sub_v
-                else:
-                    if k.startswith('_'):
-                        raise ValueError('Config key starts with "_" is private key, which is immutable!')
-                    _ret_dict[k] = v
-            return _ret_dict
-        
-        new_cfg = _load_key_value_from_dict(config)
-        for k, v in new_cfg.items():
-            self.__setitem__(k, v)
+            with instrument.stage('update_from_file.read'):
+                data = loader.read_file(config_path)
+            with instrument.stage('update_from_file.parse'):
+                config_dict = loader.loads(data, config_path)
+            with instrument.stage('update_from_file.flatten'):
+                flat_config = loader.flatten_file_config(config_dict)
+
+        if loader.INCLUDE_KEY in flat_config:
+            from .includes import load_includes
+            with instrument.stage('update_from_file.include'):
+                flat_config = load_includes(config_path, flat_config, cache, workers)
+        return flat_config
     
-    def save_to_file(self, save_path, indent=4, sort_keys=True):
-        config_dict = self.to_dict()
-        if save_path.endswith('.yaml'):
-            with open(save_path, 'w', encoding='utf-8') as wf:
-                yaml.safe_dump(config_dict, wf)
+    def save_to_file(self, save_path, indent=4, sort_keys=True, skip_unchanged=False):
+        '''Save config values into a json, yaml or binary (`.jcfgb`) file, and return True if the file was written.
+
+        If `skip_unchanged` is True, the write is skipped if no value was set since the last save
+        of this config into the same file, and the file was not changed since. Lists modified in
+        place are not noticed. The file is replaced atomically, and json is streamed from the
+        config without building a dict first.
+        '''
+        save_key = (os.path.abspath(save_path), indent, sort_keys)
+        version = self.__state.version
+        saved_files = self.__saved_files
+        if skip_unchanged and saved_files is not None and \
+                saved_files.get(save_key) == (version, loader.get_file_stat(save_path)):
+            return False
+
+        if loader.is_binary_path(save_path):
+            from .binary import save_file
+            save_file([(key, val.get()) for key, val in self.__get_full_index().items()
+                       if val.__class__ is JsonCfgValue], save_path)
+        elif loader.has_builtin_json_dumper(save_path):
+            encode = loader.make_json_encoder(indent, sort_keys)
+            with loader.atomic_write(save_path, 'w', encoding='utf-8') as wf:
+                wf.writelines(self.__iter_json_chunks(encode, indent, sort_keys, ''))
+        else:
+            loader.dump_file(self.to_dict(), save_path, indent=indent, sort_keys=sort_keys)
+        if skip_unchanged:
+            if saved_files is None:
+                saved_files = {}
+                object.__setattr__(self, '_JsonCfg__saved_files', saved_files)
+            saved_files[save_key] = (version, loader.get_file_stat(save_path))
+        return True
+
+    def __iter_json_chunks(self, encode, indent, sort_keys, prefix):
+        # same output as json.dump(self.to_dict(), wf, indent=indent, sort_keys=sort_keys)
+        if indent is None:
+            inner_prefix = prefix
+            first_sep, item_sep, end_sep = '', ', ', ''
         else:
-            with open(save_path, 'w') as wf:
-                json.dump(config_dict, wf, indent=indent, sort_keys=sort_keys)
+            inner_prefix = prefix + (' ' * indent if isinstance(indent, int) else indent)
+            first_sep, item_sep, end_sep = '\n' + inner_prefix, ',\n' + inner_prefix, '\n' + prefix
+
+        keys = sorted(self.__config_desc) if sort_keys else self.__config_desc
+        sep = first_sep
+        yield '{'
+        for key in keys:
+            val = self.__config_desc[key]
+            if isinstance(val, JsonCfgValue):
+                yield '{}{}: {}'.format(sep, encode(key), encode(val.get_plain(), inner_prefix))
+            else:
+                assert isinstance(val, JsonCfg)
+                yield '{}{}: '.format(sep, encode(key))
+                yield from val.__iter_json_chunks(encode, indent, sort_keys, inner_prefix)
+            sep = item_sep
+        yield end_sep + '}'
 
     def print_config(self, indent=4):
+        import pprint
+
         config_dict = self.to_dict()
         pprint.pprint(config_dict, indent=4)
     
-    def validate(self):
-        for key in self.keys():
-            jcfg_value = self.__get_by_keys(key.split('.'))
-            if jcfg_value.validate() is False:
-                raise JCfgValidateFailError('Validate failure of key: {}={}'.format(key, jcfg_value.get()))
+    def validate(self, workers=None, use_cache=True):
+        '''Validate all values, and raise JCfgValidateFailError listing every failed key.
+
+        With `workers` > 1, validators run concurrently on a thread pool of that size. Values
+        which passed once are not validated again if `use_cache` is True.
+        '''
+        key_index = self.__get_full_index()
+        self._get_validation_plan().run(lambda key: key_index[key].get(), workers, use_cache)
+
+    def _get_validation_plan(self):
+        '''Return the validators of all leaf keys, compiled once and shared by copies of this config.'''
+        plan = self.__validation_plan
+        if plan is None:
+            from .validation import ValidationPlan
+            plan = ValidationPlan((key, val.validate_func) for key, val in self.__get_full_index().items()
+                                  if isinstance(val, JsonCfgValue) and val.validate_func is not None)
+            object.__setattr__(self, '_JsonCfg__validation_plan', plan)
+        return plan
+
+
+class JsonCfgSchema(object):
+    '''A config meta compiled once, which creates new JsonCfg instances cheaply.
+
+    The config meta is parsed and validated only when the schema is built, `create()` then
+    only copies the value slots of a template config.
+
+    Schemas are registered by fingerprint in a per-process cache, and configs created by a
+    schema are pickled as the schema fingerprint plus their values. The receiving process
+    must have built the same schema (e.g. at module level) to unpickle them. Configs not
+    created by a schema, and configs of schemas with validators which have no signature
+    stable across processes (e.g. bound methods), are pickled with their config meta instead.
+    '''
+
+    def __init__(self, config_meta):
+        self.__init_from_template(JsonCfg(config_meta), registered=True)
+
+    @classmethod
+    def _from_config(cls, config):
+        '''Build an unregistered schema, for a config not created by a schema.'''
+        schema = cls.__new__(cls)
+        schema.__init_from_template(config.copy(), registered=False)
+        config._set_schema(schema)
+        return schema
+
+    def __init_from_template(self, template, registered):
+        template._set_schema(self)
+        template._get_validation_plan()
+        self.__template = template
+        self.__leaf_keys = tuple(template.keys())
+        self.__fingerprint = _get_meta_fingerprint(template.to_meta())
+        self.__registered = registered and self.__fingerprint is not None
+        if self.__registered:
+            _schema_cache.setdefault(self.__fingerprint, self)
+        elif self.__fingerprint is not None:
+            if len(_unregistered_schemas) >= _MAX_UNREGISTERED_SCHEMAS:
+                _unregistered_schemas.clear()
+            _unregistered_schemas.setdefault(self.__fingerprint, self)
+
+    @property
+    def fingerprint(self):
+        '''Hex digest of the config meta, None if some validator has no stable signature.'''
+        return self.__fingerprint
+
+    @property
+    def leaf_keys(self):
+        return self.__leaf_keys
+
+    def create(self):
+        return self.__template.copy()
+
+    def create_from_values(self, values):
+        '''Create a config, with values of all `leaf_keys` in order, without validating them.'''
+        cfg = self.__template.copy()
+        cfg._restore_values(self.__leaf_keys, values)
+        return cfg
+
+    def __reduce__(self):
+        if self.__registered:
+            return _load_schema, (self.__fingerprint,)
+        else:
+            return _load_schema, (self.__fingerprint, self.__template.to_meta())
+
+
+_schema_cache = {}
+# schemas built for pickling configs not created by a schema, or rebuilt when unpickling
+# them; cleared when full, as they are not referenced by user code
+_unregistered_schemas = {}
+_MAX_UNREGISTERED_SCHEMAS = 64
+
+
+def _load_schema(fingerprint, config_meta=None):
+    schema = _schema_cache.get(fingerprint) or _unregistered_schemas.get(fingerprint)
+    if schema is None:
+        if config_meta is None:
+            raise JCfgSchemaNotFoundError(
+                'Config schema {} is not built in this process, build a JsonCfgSchema with the same '
+                'config meta before unpickling configs created by it.'.format(fingerprint))
+        schema = JsonCfgSchema._from_config(JsonCfg(config_meta))
+    return schema
+
+
+def _restore_config(schema, values):
+    return schema.create_from_values(values)
+
+
+def _get_meta_fingerprint(config_meta):
+    '''Hex digest of a config meta, or None if it holds callables without a stable signature.'''
+    import hashlib
+
+    def _signature(meta):
+        sig = []
+        for key in sorted(meta):
+            value = meta[key]
+            if isinstance(value, dict):
+                sig.append((key, _signature(value)))
+            elif callable(value):
+                sig.append((key, _get_object_signature(value, set())))
+            else:
+                sig.append((key, type(value).__name__, repr(value)))
+        return tuple(sig)
+
+    try:
+        signature = _signature(config_meta)
+    except _NoStableSignature:
+        return None
+    return hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()
+
+
+class _NoStableSignature(Exception):
+    pass
+
+
+def _get_object_signature(value, seen):
+    '''Signature of a validator, or of a value it refers to, the same in any process.
+
+    Functions are identified by their name, their code, their defaults and the values they
+    close over, so that e.g. `lambda x: x <= max_n` built with different `max_n` differ.
+    Raise _NoStableSignature for objects which can only be told apart by identity.
+    '''
+    if value is None or value is Ellipsis or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return type(value).__name__, repr(value)
+    if id(value) in seen:
+        # a recursive function, or a container holding itself
+        return ('recursive',)
+    seen.add(id(value))
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(_get_object_signature(v, seen) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return type(value).__name__, tuple(sorted(repr(_get_object_signature(v, seen)) for v in value))
+    if isinstance(value, dict):
+        return 'dict', tuple((repr(k), _get_object_signature(v, seen))
+                             for k, v in sorted(value.items(), key=lambda item: repr(item[0])))
+    if isinstance(value, types.CodeType):
+        return ('code', value.co_code, _get_object_signature(value.co_consts, seen), value.co_names,
+                value.co_varnames, value.co_freevars)
+    if isinstance(value, functools.partial):
+        return ('partial', _get_object_signature(value.func, seen), _get_object_signature(value.args, seen),
+                _get_object_signature(value.keywords, seen))
+    if isinstance(value, types.MethodType):
+        return 'method', _get_object_signature(value.__func__, seen), _get_object_signature(value.__self__, seen)
+    code = getattr(value, '__code__', None)
+    if code is not None:
+        cells = []
+        for cell in getattr(value, '__closure__', None) or ():
+            try:
+                cells.append(_get_object_signature(cell.cell_contents, seen))
+            except ValueError:
+                # a cell which is not assigned yet
+                cells.append(('empty',))
+        return ('function', getattr(value, '__module__', None), getattr(value, '__qualname__', None),
+                _get_object_signature(code, seen),
+                _get_object_signature(getattr(value, '__defaults__', None), seen),
+                _get_object_signature(getattr(value, '__kwdefaults__', None), seen), tuple(cells))
+    owner = getattr(value, '__self__', None)
+    if hasattr(value, '__qualname__') and (owner is None or isinstance(owner, (type, type(sys)))):
+        # classes, and builtin functions or methods not bound to an instance
+        return 'named', getattr(value, '__module__', None), value.__qualname__
+    # other objects (e.g. bound methods) can only be told apart by identity
+    raise _NoStableSignature(type(value).__qualname__)
+
+
+def _copy_value(value):
+    if isinstance(value, list):
+        return [_copy_value(v) for v in value]
+    return value
+
+
+def _same_value(a, b):
+    # 1 and 1.0, or 1 and True, are different config values
+    return type(a) is type(b) and a == b
+
+
+_negative_number_reo = re.compile(r'^-\d+$|^-\d*\.\d+$')
+
+
+def _looks_like_option(arg):
+    # same rule as argparse, for a parser without options looking like negative numbers
+    return arg.startswith('-') and arg != '-' and _negative_number_reo.match(arg) is None
 
 
 def _str2bool(s):
+    import argparse
+
     if s.lower() in ['1', 'true']:
         return True
     elif s.lower() in ['0', 'false']:
@@ -224,57 +831,159 @@ def _str2bool(s):
         raise argparse.ArgumentTypeError('Boolean value (1 or true for True, 0 or false for False) expected.')
 
 
+class _ValueMeta(object):
+    '''Type, default, validator and extra meta info of a config value.
+
+    Equal meta records are shared by all values (e.g. the same option repeated in many sub
+    configs), so a value only costs its own slot plus a reference to the record.
+    '''
+    __slots__ = ('type', 'default', 'validate_func', 'extra')
+
+    def __init__(self, value_type, default, validate_func, extra):
+        self.type = value_type
+        self.default = default
+        self.validate_func = validate_func
+        self.extra = extra
+
+
+# meta records by (type, default type, default, validator, extra items), plus the sign of float
+# defaults (-0.0 == 0.0); cleared when full, to bound memory held by defaults
+_value_metas = {}
+_MAX_VALUE_METAS = 100000
+
+
+def _get_value_meta(value_type, default, validate_func, extra):
+    if value_type is list:
+        # list defaults are mutable, thus never shared
+        return _ValueMeta(value_type, default, validate_func, extra)
+    cache_key = (value_type, default.__class__, default, validate_func)
+    if default.__class__ is float:
+        cache_key += (math.copysign(1.0, default),)
+    if extra:
+        cache_key += tuple(sorted(extra.items()))
+    try:
+        return _value_metas[cache_key]
+    except KeyError:
+        pass
+    except TypeError:
+        # unhashable extra meta is not shared
+        return _ValueMeta(value_type, default, validate_func, extra)
+    if len(_value_metas) >= _MAX_VALUE_METAS:
+        _value_metas.clear()
+    meta = _value_metas[cache_key] = _ValueMeta(value_type, default, validate_func, extra)
+    return meta
+
+
 class JsonCfgValue(object):
+    __slots__ = ('__value', '__meta', '__weakref__')
+
     def __init__(self, value, value_type, default, **extra_attr):
+        validate_func = extra_attr.pop('_validate', None)
+        if validate_func is not None:
+            assert callable(validate_func), 'Validate_func need to be callable!'
         self.__value = value
-        self.__type = value_type
-        self.__default = default
-        self.__validate_func = extra_attr.pop('_validate', None)
-        if self.__validate_func is not None:
-            assert callable(self.__validate_func), 'Validate_func need to be callable!'
-        self.__extra = extra_attr
+        self.__meta = _get_value_meta(value_type, default, validate_func, extra_attr)
 
     def get(self):
         return self.__value
 
+    def get_plain(self):
+        '''Return the value, with typed lists converted to lists, e.g. to be dumped as json.'''
+        if self.__meta.type.__class__ is TypedList:
+            return self.__value.tolist()
+        return self.__value
+
+    @property
+    def default(self):
+        return self.__meta.default
+
+    def to_meta(self):
+        '''Return the dict form of the config meta of this value.'''
+        meta = self.__meta
+        config_meta = {_DEFAULT_KEY: meta.default}
+        config_meta.update(meta.extra)
+        if meta.validate_func is not None:
+            config_meta['_validate'] = meta.validate_func
+        return config_meta
+
+    def __reduce__(self):
+        meta = self.__meta
+        return _restore_value, (self.__value, meta.type, meta.default, meta.validate_func, meta.extra)
+
+    def copy(self):
+        new_value = JsonCfgValue.__new__(JsonCfgValue)
+        meta = new_value.__meta = self.__meta
+        value = self.__value
+        if isinstance(value, list):
+            value = _copy_value(value)
+        elif meta.type.__class__ is TypedList:
+            value = meta.type.copy(value)
+        new_value.__value = value
+        return new_value
+
     @property
     def type(self):
-        return self.__type
+        return self.__meta.type
 
-    def set(self, value):
-        if isinstance(value, self.__type):
-            self.__value = value
+    @property
+    def is_list(self):
+        value_type = self.__meta.type
+        return value_type == list or value_type.__class__ is TypedList
+
+    @property
+    def validate_func(self):
+        return self.__meta.validate_func
+
+    def check(self, value):
+        '''Type check `value`, and return it as it would be stored by `set()`.'''
+        value_type = self.__meta.type
+        if isinstance(value, value_type):
+            return value
         else:
-            if isinstance(value, int) and self.__type == float:
-                self.__value = value
+            if isinstance(value, int) and value_type == float:
+                return value
+            elif value_type.__class__ is TypedList:
+                return value_type.convert(value)
             else:
                 raise JCfgValueTypeMismatchError('The type of this config is set to {}, but is assigned a {}'.format(
-                    str(self.__type), str(type(value))))
+                    str(value_type), str(type(value))))
+
+    def set(self, value):
+        self.__value = self.check(value)
     
-    def validate(self):
-        if self.__validate_func is None:
+    def validate(self, value=_NOT_SET):
+        '''Validate `value`, or the current value if not given.'''
+        validate_func = self.__meta.validate_func
+        if validate_func is None:
             return True
         else:
-            return self.__validate_func(self.get())
+            return validate_func(self.get() if value is _NOT_SET else value)
     
     def get_meta(self, key):
-        if key in self.__extra:
-            return self.__extra[key]
-        else:
-            return None
+        return self.__meta.extra.get(key)
     
+    def parse_str(self, s):
+        '''Convert cli string `s` to the type of this value, as argparse would.'''
+        value_type = self.__meta.type
+        if value_type == bool:
+            return _str2bool(s)
+        return value_type(s)
+
     def add_to_argument(self, arg_parser, key):
         desc = self.get_meta('_desc')
         if desc is not None:
             help_info = '{}. type: {}, default: {}'.format(desc, self.type, self.get())
         else:
             help_info = 'type: {}, default: {}'.format(self.type, self.get())
-        if self.__type == list:
+        value_type = self.__meta.type
+        if value_type == list:
             arg_parser.add_argument('--{}'.format(key), nargs='*', help=help_info)
-        elif self.__type == bool:
+        elif value_type.__class__ is TypedList:
+            arg_parser.add_argument('--{}'.format(key), nargs='*', type=value_type.element_type, help=help_info)
+        elif value_type == bool:
             arg_parser.add_argument('--{}'.format(key), type=_str2bool, help=help_info)
         else:
-            arg_parser.add_argument('--{}'.format(key), type=self.__type, help=help_info)
+            arg_parser.add_argument('--{}'.format(key), type=value_type, help=help_info)
         return
 
     @classmethod
@@ -326,11 +1035,17 @@ class JsonCfgValue(object):
     def __create_from_dict_value(cls, value):
         assert isinstance(value, dict)
         assert _DEFAULT_KEY in value
+        value = dict(value)  # never mutate the config meta provided by user
         default = value.pop(_DEFAULT_KEY)
 
         # get description
         desc = value.get('_desc', '')
         assert isinstance(desc, str), 'Description for a key should be str!'
+        if '_type' in value:
+            typed_list = get_typed_list_type(value['_type'], value.get('_numpy', False))
+            return JsonCfgValue(typed_list.convert(default), typed_list, default, **value)
         return cls.__create_from_pure_value(default, **value)
 
 
+def _restore_value(value, value_type, default, validate_func, extra):
+    return JsonCfgValue(value, value_type, default, _validate=validate_func, **extra)
@@ -0,0 +1,255 @@
+'''Layered config sources: files, environment variables, dicts and cli options.
+
+    layers = LayeredJsonCfg(cfg)
+    layers.add_file('base.yaml')
+    layers.add_file('local.json')
+    layers.add_env('APP')          # e.g. APP__SUB_CONFIG__SUB_INT=3
+    layers.add_args()              # cli options, and the file given by `-c`
+    layers.source_of('sub_config.sub_int')   # -> 'env:APP'
+
+Layers are applied in the order they were added, later layers override earlier ones, and
+keys defined by no layer keep the value the config had before. Each layer is parsed once
+and kept as a flat dict. When a layer is added, replaced, reloaded or removed, only the keys
+it defines are merged again, and only values which actually changed are applied to the
+config, as a single batch.
+'''
+import os
+
+from .error import JCfgInvalidValueError, JCfgKeyNotFoundError
+from .json_config import _copy_value, _same_value
+from . import loader
+
+_DEFAULT_SOURCE = 'default'
+
+
+class _Layer(object):
+
+    def __init__(self, name, values, read_func=None, source_state=None):
+        self.name = name
+        self.values = values
+        # read_func(source_state) returns (new source state, new values), or None if the
+        # source did not change since `source_state`
+        self.read_func = read_func
+        self.source_state = source_state
+
+    def read(self):
+        if self.read_func is None:
+            return None
+        result = self.read_func(self.source_state)
+        if result is None:
+            return None
+        return _Layer(self.name, result[1], self.read_func, result[0])
+
+
+class LayeredJsonCfg(object):
+    '''Keep `config` equal to the merge of an ordered list of named source layers.'''
+
+    def __init__(self, config):
+        self.__config = config
+        self.__layers = []
+        self.__merged = {}      # key -> (layer name, value), for keys defined by any layer
+        self.__base = {}        # values of keys before any layer defined them
+        self.__env_keys = None
+        self.__num_dict_layers = 0
+
+    @property
+    def config(self):
+        return self.__config
+
+    @property
+    def layer_names(self):
+        return [layer.name for layer in self.__layers]
+
+    def add_dict(self, mapping, name=None):
+        '''Add (or replace, if `name` exists) a layer of programmatic values.'''
+        values = loader.flatten_config(mapping, allow_private=True)
+        if name is None:
+            name = 'dict:{}'.format(self.__num_dict_layers)
+            self.__num_dict_layers += 1
+        return self.__set_layer(_Layer(name, values))
+
+    def add_file(self, config_path, name=None, cache=False):
+        '''Add a layer of a json/yaml config file, which is parsed again by `reload()` only if it
+        (or a fragment it includes) changed.'''
+        def _read_file(old_state):
+            # stat before parsing, so that a file changed while being parsed is read again
+            paths = (config_path,) if old_state is None else tuple(path for path, _ in old_state)
+            new_state = tuple((path, loader.get_file_stat(path)) for path in paths)
+            if new_state == old_state:
+                return None
+            if cache:
+                from .cache import load_flat_config
+                values = load_flat_config(config_path, cache_dir=None if cache is True else cache)
+            else:
+                values = loader.flatten_file_config(loader.load_file(config_path))
+            if loader.INCLUDE_KEY in values:
+                from .includes import load_includes
+                file_stats = {}
+                values = load_includes(config_path, values, cache, file_stats=file_stats)
+                new_state = new_state[:1] + tuple(file_stats.items())
+            else:
+                new_state = new_state[:1]
+            return new_state, values
+
+        return self.__set_layer(_Layer(name or config_path, None, _read_file).read())
+
+    def add_env(self, prefix, environ=None, name=None):
+        '''Add a layer of environment variables named `<prefix>__<KEY>__<SUB_KEY>`.
+
+        Keys are matched case insensitively. Values are converted like cli options, and list
+        values are given as json, e.g. `APP__NAMES='["a", "b"]'`.
+        '''
+        environ = os.environ if environ is None else environ
+        env_prefix = prefix + '__'
+
+        def _read_env(old_env):
+            env = {k: v for k, v in environ.items() if k.startswith(env_prefix)}
+            if env == old_env:
+                return None
+            return env, self.__convert_env(env, env_prefix)
+
+        return self.__set_layer(_Layer(name or 'env:{}'.format(prefix), None, _read_env).read())
+
+    def add_args(self, args=None, description=None, fast=True, name='cli'):
+        '''Add a layer of cli options (default: sys.argv[1:]), like `JsonCfg.parse_args()`.
+
+        A file given by `-c` is added as a layer `<name>:file` right below the cli layer, and
+        the merged config is saved into the file given by `-s`.
+        '''
+        cfg_path, cfg_save_path, cli_values = self.__config._parse_cli(description, args, fast)
+        if cfg_path is not None:
+            self.add_file(cfg_path, name='{}:file'.format(name))
+        self.__set_layer(_Layer(name, cli_values))
+        if cfg_save_path is not None:
+            self.__config.save_to_file(cfg_save_path)
+        return name
+
+    def remove(self, name):
+        '''Remove layer `name`, keys it defined fall back to lower layers.'''
+        layer = self.__get_layer(name)
+        layers = [l for l in self.__layers if l is not layer]
+        self.__commit(layers, layer.values.keys())
+
+    def reload(self, name=None):
+        '''Read file and env layers (or only layer `name`) again if their source changed.
+
+        Return the dict of values applied to the config.
+        '''
+        layers = list(self.__layers)
+        changed_keys = set()
+        for idx, layer in enumerate(layers):
+            if name is not None and layer.name != name:
+                continue
+            new_layer = layer.read()
+            if new_layer is not None:
+                changed_keys.update(layer.values.keys())
+                changed_keys.update(new_layer.values.keys())
+                layers[idx] = new_layer
+        return self.__commit(layers, changed_keys)
+
+    def source_of(self, key):
+        '''Name of the layer which supplied the value of leaf `key`, or 'default'.'''
+        merged = self.__merged.get(key)
+        if merged is None:
+            self.__config._get_value_slot(key)  # raise for unknown keys
+            return _DEFAULT_SOURCE
+        return merged[0]
+
+    def sources(self, key):
+        '''List (layer name, value) of all layers defining `key`, from lowest to highest precedence.'''
+        return [(layer.name, layer.values[key]) for layer in self.__layers if key in layer.values]
+
+    def provenance(self):
+        '''Dict of all leaf keys to the name of the layer which supplied their value.'''
+        return {key: self.source_of(key) for key in self.__config.keys()}
+
+    def __get_layer(self, name):
+        for layer in self.__layers:
+            if layer.name == name:
+                return layer
+        raise KeyError('No config layer named: {}'.format(name))
+
+    def __set_layer(self, new_layer):
+        layers = list(self.__layers)
+        changed_keys = set(new_layer.values.keys())
+        for idx, layer in enumerate(layers):
+            if layer.name == new_layer.name:
+                changed_keys.update(layer.values.keys())
+                layers[idx] = new_layer
+                break
+        else:
+            layers.append(new_layer)
+        self.__commit(layers, changed_keys)
+        return new_layer.name
+
+    def __commit(self, layers, changed_keys):
+        '''Merge `changed_keys` again over `layers`, apply changed values, then keep `layers`.'''
+        merged = {}
+        for key in changed_keys:
+            for layer in reversed(layers):
+                if key in layer.values:
+                    merged[key] = (layer.name, layer.values[key])
+                    break
+
+        updates = {}
+        new_base = {}
+        for key in changed_keys:
+            old = self.__merged.get(key)
+            new = merged.get(key)
+            if old is None:
+                if new is None:
+                    continue
+                if key not in self.__base:
+                    new_base[key] = _copy_value(self.__config._get_value_slot(key).get_plain())
+                old_value = self.__base.get(key, new_base.get(key))
+                new_value = new[1]
+            else:
+                old_value = old[1]
+                new_value = self.__base[key] if new is None else new[1]
+            if not _same_value(old_value, new_value):
+                updates[key] = _copy_value(new_value)
+
+        # raises without changing anything if a value is invalid
+        self.__config.update(updates)
+
+        self.__layers = layers
+        self.__base.update(new_base)
+        for key in changed_keys:
+            if key in merged:
+                self.__merged[key] = merged[key]
+            else:
+                self.__merged.pop(key, None)
+        return updates
+
+    def __convert_env(self, env, env_prefix):
+        if self.__env_keys is None:
+            exact_keys = {}
+            upper_keys = {}
+            for key in self.__config.public_keys():
+                env_key = key.replace('.', '__')
+                exact_keys[env_key] = key
+                # None marks keys which differ only by case, these must be given in exact case
+                upper_keys[env_key.upper()] = None if env_key.upper() in upper_keys else key
+            self.__env_keys = exact_keys, upper_keys
+
+        exact_keys, upper_keys = self.__env_keys
+        values = {}
+        for env_name, str_value in env.items():
+            env_key = env_name[len(env_prefix):]
+            key = exact_keys.get(env_key) or upper_keys.get(env_key.upper())
+            if key is None:
+                raise JCfgKeyNotFoundError('Environment variable {} matches no config key'.format(env_name))
+            jcfg_value = self.__config._get_value_slot(key)
+            try:
+                if jcfg_value.is_list:
+                    import json
+                    value = json.loads(str_value)
+                    if not isinstance(value, list):
+                        raise ValueError('a json list is expected')
+                else:
+                    value = jcfg_value.parse_str(str_value)
+            except Exception as e:
+                raise JCfgInvalidValueError('Invalid value of environment variable {}={!r}: {}'.format(
+                    env_name, str_value, e))
+            values[key] = value
+        return values
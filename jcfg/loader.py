@@ -0,0 +1,261 @@
+'''Pluggable loaders and dumpers of config files, selected by file extension.
+
+A loader parses the raw bytes of a config file into a dict, a dumper writes a config dict
+into an opened text file. Files with an unregistered extension are handled as json, and
+`.jcfgb` files are binary encoded, see `jcfg.binary`.
+'''
+import os
+import re
+import contextlib
+
+_JSON_EXT = '.json'
+# same as jcfg.binary.EXT, which is only imported when such files are used
+_BINARY_EXT = '.jcfgb'
+# directive of config files, listing fragment files merged before the file itself
+INCLUDE_KEY = '_include'
+
+_loaders = {}
+_dumpers = {}
+
+
+def register_loader(ext, loads_func):
+    '''Register `loads_func(data: bytes) -> dict` for config files ending with `ext`.'''
+    _loaders[ext.lower()] = loads_func
+
+
+def register_dumper(ext, dump_func):
+    '''Register `dump_func(config_dict, wf, indent, sort_keys)` for config files ending with `ext`.'''
+    _dumpers[ext.lower()] = dump_func
+
+
+def _get_ext(path, registry):
+    ext = os.path.splitext(path)[1].lower()
+    return ext if ext in registry else _JSON_EXT
+
+
+def read_file(path):
+    with open(path, 'rb') as rf:
+        return rf.read()
+
+
+def loads(data, path):
+    '''Parse `data` read from `path` with the loader registered for its extension.'''
+    return _loaders[_get_ext(path, _loaders)](data)
+
+
+def load_file(path):
+    return loads(read_file(path), path)
+
+
+def get_file_stat(path):
+    '''Return (inode, mtime, size) of file `path`, which change when it is replaced or
+    modified, or None if it does not exist.'''
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def is_binary_path(path):
+    return os.path.splitext(path)[1].lower() == _BINARY_EXT
+
+
+def dump_file(config_dict, path, indent=4, sort_keys=True):
+    '''Write `config_dict` into `path`, which is replaced atomically.'''
+    if is_binary_path(path):
+        from .binary import save_file
+        save_file(flatten_config(config_dict, allow_private=True).items(), path)
+        return
+    with atomic_write(path, 'w', encoding='utf-8') as wf:
+        dump(config_dict, wf, path, indent=indent, sort_keys=sort_keys)
+
+
+def dump(config_dict, wf, path, indent=4, sort_keys=True):
+    '''Write `config_dict` into text file `wf`, in the format given by the extension of `path`.'''
+    _dumpers[_get_ext(path, _dumpers)](config_dict, wf, indent, sort_keys)
+
+
+def has_builtin_json_dumper(path):
+    '''True if `path` is dumped as json by the builtin dumper, which JsonCfg can stream into.'''
+    return not is_binary_path(path) and _dumpers[_get_ext(path, _dumpers)] is _dump_json
+
+
+def flatten_config(config, allow_private=False):
+    '''Flatten a nested config dict into a dict of dotted keys.'''
+    _ret_dict = {}
+    for k, v in config.items():
+        if isinstance(v, dict):
+            _sub_ret_dict = flatten_config(v, allow_private)
+            for sub_k, sub_v in _sub_ret_dict.items():
+                _new_k = '.'.join([k, sub_k])
+                _ret_dict[_new_k] = sub_v
+        else:
+            if k.startswith('_') and not allow_private:
+                raise ValueError('Config key starts with "_" is private key, which is immutable!')
+            _ret_dict[k] = v
+    return _ret_dict
+
+
+def flatten_file_config(config_dict):
+    '''Flatten the dict parsed from a config file, keeping its top level `_include` directive.'''
+    if isinstance(config_dict, dict) and INCLUDE_KEY in config_dict:
+        config_dict = dict(config_dict)
+        include = config_dict.pop(INCLUDE_KEY)
+        flat_config = flatten_config(config_dict)
+        flat_config[INCLUDE_KEY] = include
+        return flat_config
+    return flatten_config(config_dict)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', encoding=None):
+    '''Open a temp file next to `path`, which replaces `path` only if the block succeeds.
+
+    Readers (and concurrent writers) never see a partially written file. If `path` is a
+    symlink, its target is replaced.
+    '''
+    import tempfile
+
+    path = os.path.realpath(path)
+    dir_name, base_name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix='.{}.'.format(base_name), suffix='.tmp', dir=dir_name)
+    try:
+        # mkstemp creates the file as 0600, keep the permission a plain open() would give
+        try:
+            file_mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            file_mode = 0o666 & ~umask
+        os.chmod(tmp_path, file_mode)
+        with os.fdopen(fd, mode, encoding=encoding) as wf:
+            yield wf
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+# json with js-style comments and trailing commas. Runs of plain chars and whole strings are
+# matched (and kept) first, so that comment markers or commas inside of strings are untouched,
+# and the regex engine does not have to stop at every char of the text.
+_json_string_pattern = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+_json_comment_reo = re.compile(
+    r'((?:[^"/]+|' + _json_string_pattern + r')+)|//[^\n]*|/\*.*?\*/', re.S)
+_json_trailing_comma_reo = re.compile(
+    r'((?:[^",]+|' + _json_string_pattern + r'|,(?!\s*[}\]]))+)|,(\s*[}\]])')
+
+_json_loads = None
+
+
+def strip_json_comments(text):
+    '''Remove js-style comments and trailing commas from json `text`.'''
+    if '/' in text:
+        text = _json_comment_reo.sub(r'\1', text)
+    if _may_have_trailing_comma(text):
+        text = _json_trailing_comma_reo.sub(r'\1\2', text)
+    return text
+
+
+def _may_have_trailing_comma(text):
+    # quick check before the regex: str.find of the few closing brackets is much faster than
+    # scanning every char with a regex, e.g. for configs with long lists of numbers
+    for bracket in '}]':
+        idx = text.find(bracket)
+        while idx != -1:
+            # a window long enough for usual indents, a window of only spaces is a "maybe"
+            before = text[max(0, idx - 256):idx].rstrip()
+            if before.endswith(',') or (not before and idx > 256):
+                return True
+            idx = text.find(bracket, idx + 1)
+    return False
+
+
+def _get_json_loads():
+    global _json_loads
+    if _json_loads is None:
+        import json
+        try:
+            import orjson
+        except ImportError:
+            _json_loads = json.loads
+        else:
+            def _orjson_loads(text):
+                try:
+                    return orjson.loads(text)
+                except orjson.JSONDecodeError:
+                    # e.g. NaN or integers beyond 64 bits, which json accepts
+                    return json.loads(text)
+            _json_loads = _orjson_loads
+    return _json_loads
+
+
+def _load_json(data):
+    return _get_json_loads()(strip_json_comments(data.decode('utf-8')))
+
+
+def _dump_json(config_dict, wf, indent, sort_keys):
+    import json
+    json.dump(config_dict, wf, indent=indent, sort_keys=sort_keys)
+
+
+def make_json_encoder(indent, sort_keys):
+    '''Return `encode(value, prefix='') -> str`, giving the same text as `json.dumps` for a
+    config value nested in a json document indented by `prefix`.
+
+    Scalars and lists are encoded directly, which is much faster than a `json.dumps` call
+    per value.
+    '''
+    import json
+    from json.encoder import encode_basestring_ascii
+    from math import isfinite
+
+    encode = json.JSONEncoder(indent=indent, sort_keys=sort_keys).encode
+    indent_str = ' ' * indent if isinstance(indent, int) else indent
+
+    def _encode_value(value, prefix=''):
+        value_type = type(value)
+        if value_type is str:
+            return encode_basestring_ascii(value)
+        elif value_type is bool:
+            return 'true' if value else 'false'
+        elif value_type is int:
+            return int.__repr__(value)
+        elif value_type is float and isfinite(value):
+            return float.__repr__(value)
+        elif value_type is list and value:
+            if indent is None:
+                return '[{}]'.format(', '.join([_encode_value(v) for v in value]))
+            inner_prefix = prefix + indent_str
+            return '[\n{}{}\n{}]'.format(
+                inner_prefix, (',\n' + inner_prefix).join([_encode_value(v, inner_prefix) for v in value]), prefix)
+        text = encode(value)
+        if prefix and indent is not None:
+            text = text.replace('\n', '\n' + prefix)
+        return text
+    return _encode_value
+
+
+def _load_yaml(data):
+    import yaml
+    return yaml.load(data, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+def _load_binary(data):
+    from .binary import decode_dict
+    return decode_dict(data)
+
+
+def _dump_yaml(config_dict, wf, indent, sort_keys):
+    import yaml
+    yaml.dump(config_dict, wf, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper), sort_keys=sort_keys)
+
+
+register_loader(_JSON_EXT, _load_json)
+register_dumper(_JSON_EXT, _dump_json)
+for _ext in ('.yaml', '.yml'):
+    register_loader(_ext, _load_yaml)
+    register_dumper(_ext, _dump_yaml)
+register_loader(_BINARY_EXT, _load_binary)
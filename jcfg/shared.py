@@ -0,0 +1,127 @@
+'''Zero-copy sharing of a JsonCfg with worker processes, through shared memory.
+
+    with SharedJsonCfg(cfg) as shared_cfg:
+        executor.submit(work, shared_cfg)  # only the shared memory name is pickled
+
+    def work(shared_cfg):
+        shared_cfg.view.sub_config.sub_int  # values are decoded lazily from shared memory
+
+The config is encoded once with `jcfg.binary`. Workers map the shared memory read-only the
+first time they receive it and then reuse the mapping, so the cost per task does not
+depend on the config size. Up to `MAX_ATTACHED_VIEWS` mappings are kept per process, the
+least recently attached ones are released first, or explicitly with `view.detach()`.
+'''
+import os
+import sys
+
+from . import binary
+
+# name -> view, in order of last attach
+_attached_views = {}
+MAX_ATTACHED_VIEWS = 32
+
+
+class SharedCfgView(binary.BinaryCfgView):
+    '''Read-only view of a config published in shared memory, pickled by name.'''
+
+    def __init__(self, buffer, name, owner=None):
+        super(SharedCfgView, self).__init__(buffer)
+        self.__name = name
+        # the object owning the mapped memory, kept alive as long as this view
+        self.__owner = owner
+
+    @property
+    def name(self):
+        return self.__name
+
+    def __reduce__(self):
+        return attach_shared_cfg, (self.__name,)
+
+    def detach(self):
+        '''Stop reusing the mapping of this config, which is released once no view refers to it.'''
+        detach_shared_cfg(self.__name)
+
+
+def _map_shared_memory(name):
+    from multiprocessing.shared_memory import SharedMemory
+    if os.name == 'nt':
+        shm = SharedMemory(name=name)
+        return shm.buf, shm
+    if sys.version_info >= (3, 13):
+        # not tracked, else the resource tracker of the worker would unlink the block on exit
+        shm = SharedMemory(name=name, track=False)
+        return shm.buf, shm
+    # before python 3.13, attaching a SharedMemory always registers it with the resource
+    # tracker, so map it directly on posix
+    import mmap
+    import _posixshmem
+    fd = _posixshmem.shm_open('/' + name, os.O_RDONLY, mode=0o600)
+    try:
+        mm = mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+    return mm, mm
+
+
+def attach_shared_cfg(name):
+    '''Return the read-only view of shared config `name`, mapped once per process.'''
+    view = _attached_views.get(name)
+    if view is not None:
+        # move to the end, as the most recently attached
+        _attached_views.pop(name, None)
+        _attached_views[name] = view
+        return view
+    buffer, owner = _map_shared_memory(name)
+    view = SharedCfgView(buffer, name, owner)
+    while len(_attached_views) >= MAX_ATTACHED_VIEWS:
+        # the mapping is released when the evicted view is no longer referenced
+        _attached_views.pop(next(iter(_attached_views)), None)
+    _attached_views[name] = view
+    return view
+
+
+def detach_shared_cfg(name):
+    '''Forget the view of shared config `name`, the next attach maps it again.'''
+    _attached_views.pop(name, None)
+
+
+class SharedJsonCfg(object):
+    '''Publish the current values of `config` into a new shared memory block.
+
+    The block is freed by `unlink()` (or when leaving the `with` block). Pickling this object
+    only sends the block name, and is unpickled as a `SharedCfgView`.
+    '''
+
+    def __init__(self, config, name=None):
+        from multiprocessing.shared_memory import SharedMemory
+
+        data = binary.encode(config.items())
+        self.__shm = SharedMemory(name=name, create=True, size=len(data))
+        self.__shm.buf[:len(data)] = data
+        self.__view = SharedCfgView(data, self.__shm.name)
+        _attached_views[self.__shm.name] = self.__view
+
+    @property
+    def name(self):
+        return self.__shm.name
+
+    @property
+    def view(self):
+        return self.__view
+
+    def __reduce__(self):
+        return attach_shared_cfg, (self.name,)
+
+    def close(self):
+        self.__shm.close()
+
+    def unlink(self):
+        _attached_views.pop(self.__shm.name, None)
+        self.__shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.unlink()
@@ -0,0 +1,229 @@
+'''Hyperparameter sweeps: many variants of a base config, over axes of dotted keys.
+
+    sweep = Sweep(cfg)
+    sweep.grid('optim.lr', [0.1, 0.01, 0.001])
+    sweep.zip({'model.depth': [18, 50], 'model.width': [64, 128]})
+    sweep.random(8, {'optim.wd': lambda rng: rng.uniform(0, 1e-3), 'data.aug': ['flip', 'crop']}, seed=0)
+    len(sweep)                    # 3 * 2 * 8 variants
+    for variant in sweep:         # or sweep[idx], e.g. with the task id of an array job
+        variant.optim.lr
+        variant.to_config()       # a JsonCfg, to run or save
+
+Variants are the cartesian product of the axes, the last axis varies fastest. They are built
+lazily, and only hold the values they override: all other values are read from the base
+config, which the sweep copies once. Axis values are type checked and validated when the
+axis is added, so variants need no validation.
+'''
+import itertools
+import math
+import random
+
+from .error import JCfgInvalidKeyError, JCfgKeyNotFoundError, JCfgInvalidSetValueError
+from .frozen import replace_values, freeze_value
+from .json_config import JsonCfg, JsonCfgValue, _copy_value
+from .typed_list import TypedList
+from .validation import check_value, raise_failures
+
+
+class Sweep(object):
+    '''Variants of a base JsonCfg, over grid, zipped and random axes.'''
+
+    def __init__(self, config):
+        self.__base = config.copy()
+        self.__frozen_base = None
+        # every axis is a tuple of points, a point is a tuple of (key, value) overrides
+        self.__axes = []
+        self.__swept_keys = set()
+
+    def grid(self, key, values):
+        '''Add an axis, where `key` takes every value of `values`.'''
+        return self.__add_axis([key], [((key, value),) for value in values])
+
+    def zip(self, values_by_key):
+        '''Add an axis, where all keys of `values_by_key` take their n-th values together.'''
+        keys = list(values_by_key)
+        columns = [list(values_by_key[key]) for key in keys]
+        if len(set(map(len, columns))) > 1:
+            raise ValueError('Zipped values should be of the same length: {}'.format(
+                ', '.join('{}: {}'.format(key, len(column)) for key, column in zip(keys, columns))))
+        return self.__add_axis(keys, [tuple(zip(keys, row)) for row in zip(*columns)])
+
+    def random(self, num_samples, samplers, seed=None):
+        '''Add an axis of `num_samples` random points.
+
+        `samplers` maps keys to either a callable taking a `random.Random` and returning a
+        value, or a list of values to choose from. Points are the same for the same seed.
+        '''
+        rng = random.Random(seed)
+        keys = list(samplers)
+        points = []
+        for _ in range(num_samples):
+            point = []
+            for key in keys:
+                sampler = samplers[key]
+                point.append((key, sampler(rng) if callable(sampler) else rng.choice(sampler)))
+            points.append(tuple(point))
+        return self.__add_axis(keys, points)
+
+    def __add_axis(self, keys, points):
+        for key in keys:
+            if key in self.__swept_keys:
+                raise JCfgInvalidKeyError('Config key: {} is already swept by another axis'.format(key))
+        checked = {}
+        axis = []
+        for point in points:
+            # equal values are checked once, and shared by all points using them
+            axis.append(tuple((key, self.__check(checked, key, value)) for key, value in point))
+        self.__axes.append(tuple(axis))
+        self.__swept_keys.update(keys)
+        return self
+
+    def __check(self, checked, key, value):
+        cache_key = None
+        if isinstance(value, (bool, int, float, str)):
+            # with the sign of floats, as -0.0 == 0.0
+            cache_key = (key, type(value), value, math.copysign(1.0, value) if type(value) is float else None)
+        if cache_key is not None and cache_key in checked:
+            return checked[cache_key]
+        try:
+            jcfg_value = self.__base._get_value_slot(key)
+        except (KeyError, TypeError):
+            raise JCfgKeyNotFoundError('Config key: {} not defined!'.format(key))
+        if not isinstance(jcfg_value, JsonCfgValue):
+            raise JCfgInvalidSetValueError('Cannot set value to a sub config: {}'.format(key))
+        value = jcfg_value.check(value)
+        if jcfg_value.validate_func is not None:
+            passed, error = check_value(jcfg_value.validate_func, value)
+            if not passed:
+                raise_failures([(key, value, error)])
+        if cache_key is not None:
+            checked[cache_key] = value
+        return value
+
+    def __len__(self):
+        num_variants = 1
+        for axis in self.__axes:
+            num_variants *= len(axis)
+        return num_variants
+
+    def __iter__(self):
+        for index, points in enumerate(itertools.product(*self.__axes)):
+            yield SweepVariant(self, index, _merge_points(points))
+
+    def __getitem__(self, index):
+        '''Return the variant at `index`, in the order of iteration.'''
+        num_variants = len(self)
+        if index < 0:
+            index += num_variants
+        if not 0 <= index < num_variants:
+            raise IndexError('Variant index out of range: {}'.format(index))
+        points = []
+        rest = index
+        for axis in reversed(self.__axes):
+            rest, idx = divmod(rest, len(axis))
+            points.append(axis[idx])
+        return SweepVariant(self, index, _merge_points(reversed(points)))
+
+    def _get_base_value(self, key):
+        return self.__base[key]
+
+    def _copy_value(self, key, value):
+        # list and typed list values are shared by variants (and the base), hand out copies
+        value_type = self.__base._get_value_slot(key).type
+        if value_type.__class__ is TypedList:
+            return value_type.copy(value)
+        return _copy_value(value)
+
+    def _to_config(self, overrides):
+        config = self.__base.copy()
+        config._restore_values(overrides.keys(), [self._copy_value(key, value) for key, value in overrides.items()])
+        return config
+
+    def _freeze(self, overrides):
+        if self.__frozen_base is None:
+            self.__frozen_base = self.__base.freeze()
+        return replace_values(self.__frozen_base, {key: freeze_value(value) for key, value in overrides.items()})
+
+
+def _merge_points(points):
+    overrides = {}
+    for point in points:
+        overrides.update(point)
+    return overrides
+
+
+class SweepVariant(object):
+    '''A variant of a sweep: the base config, with the values of its axes points.
+
+    Values are read like from a JsonCfg, e.g. `variant.optim.lr` or `variant['optim.lr']`,
+    but variants are read only. Config keys named like methods of this class (e.g.
+    `overrides`) are only reachable with `variant[key]`.
+    '''
+    __slots__ = ('__sweep', '__index', '__overrides')
+
+    def __init__(self, sweep, index, overrides):
+        self.__sweep = sweep
+        self.__index = index
+        self.__overrides = overrides
+
+    @property
+    def index(self):
+        return self.__index
+
+    @property
+    def overrides(self):
+        '''Dotted keys and values overridden by this variant.'''
+        return {key: self.__sweep._copy_value(key, value) for key, value in self.__overrides.items()}
+
+    def __getitem__(self, key):
+        return _get_variant_value(self.__sweep, self.__overrides, key)
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+        return self.__getitem__(name)
+
+    def __repr__(self):
+        return 'SweepVariant({}, {!r})'.format(self.__index, self.__overrides)
+
+    def to_config(self):
+        '''Return a new JsonCfg of the base config, with the values of this variant.'''
+        return self.__sweep._to_config(self.__overrides)
+
+    def to_dict(self):
+        return self.to_config().to_dict()
+
+    def freeze(self):
+        '''Return a FrozenCfg of this variant, sharing unchanged sections with other variants.'''
+        return self.__sweep._freeze(self.__overrides)
+
+
+class _VariantSection(object):
+    # a sub config of a variant, e.g. `variant.optim`
+    __slots__ = ('__sweep', '__overrides', '__prefix')
+
+    def __init__(self, sweep, overrides, prefix):
+        self.__sweep = sweep
+        self.__overrides = overrides
+        self.__prefix = prefix
+
+    def __getitem__(self, key):
+        return _get_variant_value(self.__sweep, self.__overrides, self.__prefix + key)
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+        return self.__getitem__(name)
+
+    def __repr__(self):
+        return '_VariantSection({!r})'.format(self.__prefix[:-1])
+
+
+def _get_variant_value(sweep, overrides, key):
+    try:
+        value = overrides[key]
+    except KeyError:
+        value = sweep._get_base_value(key)
+        if isinstance(value, JsonCfg):
+            return _VariantSection(sweep, overrides, key + '.')
+    return sweep._copy_value(key, value)
@@ -0,0 +1,95 @@
+'''Typed numeric list options, stored in compact `array.array` (or NumPy) buffers.
+
+An option declared as `{'_default': [...], '_type': 'list[float]'}` keeps its value as an
+`array('d')` instead of a list of Python floats: 8 bytes per element instead of ~32, elements
+are type checked when set, and lists parsed from files or cli options are converted in a
+single C loop. Consumers get a buffer, e.g. `memoryview(cfg.weights)` or
+`numpy.frombuffer(cfg.weights)` without any copy. With `'_numpy': True`, values are NumPy
+arrays instead.
+'''
+from .error import JCfgInvalidValueError, JCfgValueTypeMismatchError
+
+# _type name -> (array typecode, python element type)
+_ELEMENT_TYPES = {
+    'list[int]': ('q', int),
+    'list[int32]': ('i', int),
+    'list[float]': ('d', float),
+    'list[float32]': ('f', float),
+}
+
+_typed_list_types = {}
+
+
+class TypedList(object):
+    '''Value type of a typed list option, used like a type by JsonCfgValue.'''
+
+    def __init__(self, name, use_numpy=False):
+        self.name = name
+        self.typecode, self.element_type = _ELEMENT_TYPES[name]
+        self.use_numpy = use_numpy
+        if use_numpy:
+            try:
+                import numpy
+            except ImportError:
+                raise JCfgInvalidValueError('NumPy is needed for option type {} with _numpy=True'.format(name))
+            self.__array_type = numpy.ndarray
+            self.__dtype = numpy.dtype(self.typecode)
+        else:
+            from array import array
+            self.__array_type = array
+
+    def __instancecheck__(self, value):
+        # `isinstance(value, typed_list)` is True for values stored as is, without a copy
+        if self.use_numpy:
+            return type(value) is self.__array_type and value.dtype == self.__dtype
+        return type(value) is self.__array_type and value.typecode == self.typecode
+
+    def __repr__(self):
+        return '{}{}'.format(self.name, ' (numpy)' if self.use_numpy else '')
+
+    def __reduce__(self):
+        return get_typed_list_type, (self.name, self.use_numpy)
+
+    def convert(self, value):
+        '''Return `value` (a list, tuple or any array) as an array of this type.'''
+        if isinstance(value, (str, bytes)) or not hasattr(value, '__len__'):
+            raise JCfgValueTypeMismatchError('The type of this config is set to {}, but is assigned a {}'.format(
+                self, type(value)))
+        if self.use_numpy:
+            import numpy
+            return self.__convert_numpy(numpy, value)
+        try:
+            if type(value) is self.__array_type:
+                return self.__array_type(self.typecode, value.tolist())
+            return self.__array_type(self.typecode, value)
+        except (TypeError, OverflowError) as e:
+            raise JCfgValueTypeMismatchError('Invalid element of {} config: {}'.format(self, e))
+
+    def __convert_numpy(self, numpy, value):
+        array = numpy.asarray(value)
+        if array.ndim != 1:
+            raise JCfgValueTypeMismatchError('A 1-d list is needed for {} config'.format(self))
+        if self.element_type is int:
+            valid = array.dtype.kind in 'iu' or (array.size == 0 and array.dtype.kind == 'f')
+        else:
+            valid = array.dtype.kind in 'iuf'
+        if not valid:
+            raise JCfgValueTypeMismatchError('Invalid elements of {} config, dtype: {}'.format(self, array.dtype))
+        return numpy.array(array, dtype=self.__dtype)
+
+    def parse_strs(self, strs):
+        '''Convert cli strings into an array of this type.'''
+        return self.convert(list(map(self.element_type, strs)))
+
+    def copy(self, value):
+        return value.copy() if self.use_numpy else value[:]
+
+
+def get_typed_list_type(name, use_numpy=False):
+    typed_list = _typed_list_types.get((name, use_numpy))
+    if typed_list is None:
+        if name not in _ELEMENT_TYPES:
+            raise JCfgInvalidValueError('Unknown option type: {}, supported: {}'.format(
+                name, ', '.join(sorted(_ELEMENT_TYPES))))
+        typed_list = _typed_list_types[(name, use_numpy)] = TypedList(name, use_numpy)
+    return typed_list
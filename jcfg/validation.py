@@ -0,0 +1,109 @@
+'''Validation of all values of a config, in a single pass.
+
+The `_validate` callables of a config are compiled once into a flat list of (dotted key,
+validator), which is shared by all copies of the config. A validation runs every validator
+whose (key, value) pair did not pass before, optionally on a thread pool for slow validators
+(e.g. checking that paths exist), and reports all failures at once.
+
+Every entry point (set, update, files, cli options and `validate()`) applies the same rule,
+with `check_value`: a validator fails if it returns False, or raises an exception.
+'''
+import math
+
+from .error import JCfgValidateFailError
+
+# results of more (key, value) pairs than this are dropped, to bound memory
+_MAX_CACHE_SIZE = 100000
+
+
+class ValidationPlan(object):
+    '''Validators of the leaf keys of a config, with cached results.'''
+
+    def __init__(self, validators):
+        self.__validators = tuple(validators)
+        self.__passed = set()
+
+    def __len__(self):
+        return len(self.__validators)
+
+    def clear_cache(self):
+        self.__passed.clear()
+
+    def run(self, get_value, workers=None, use_cache=True):
+        '''Run validators on values given by `get_value(key)`, raise JCfgValidateFailError if any fails.
+
+        Validators returning False, or raising an exception, fail. Pairs of a key and a value
+        which already passed are not validated again if `use_cache` is True, so validators are
+        expected to give the same result for the same value.
+        '''
+        pending = []
+        for key, validate_func in self.__validators:
+            value = get_value(key)
+            cache_key = _get_cache_key(key, value) if use_cache else None
+            if cache_key is not None and cache_key in self.__passed:
+                continue
+            pending.append((key, validate_func, value, cache_key))
+
+        if workers is not None and workers > 1 and len(pending) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_run_validator, pending))
+        else:
+            results = [_run_validator(item) for item in pending]
+
+        failures = []
+        for (key, _, value, cache_key), (passed, error) in zip(pending, results):
+            if passed:
+                if cache_key is not None:
+                    if len(self.__passed) >= _MAX_CACHE_SIZE:
+                        self.__passed.clear()
+                    self.__passed.add(cache_key)
+            else:
+                failures.append((key, value, error))
+
+        if failures:
+            raise_failures(failures, 'Validate failure of {} key(s): '.format(len(failures)))
+
+
+def check_value(validate_func, value):
+    '''Return (passed, exception raised by the validator or None).'''
+    try:
+        return validate_func(value) is not False, None
+    except Exception as e:
+        return False, e
+
+
+def raise_failures(failures, prefix='Validate failure of key: '):
+    '''Raise JCfgValidateFailError for a list of (key, value, exception or None).'''
+    errors = [error for _, _, error in failures if error is not None]
+    raise JCfgValidateFailError(prefix + ', '.join(_format_failure(*failure) for failure in failures),
+                                failures) from (errors[0] if errors else None)
+
+
+def _run_validator(item):
+    _, validate_func, value, _ = item
+    return check_value(validate_func, value)
+
+
+def _format_failure(key, value, error):
+    if error is None:
+        return '{}={!r}'.format(key, value)
+    return '{}={!r} ({}: {})'.format(key, value, type(error).__name__, error)
+
+
+def _get_cache_key(key, value):
+    '''Hashable key of (key, value), including types, so that e.g. 1 and True differ.'''
+    value_key = _get_value_key(value)
+    return None if value_key is None else (key, value_key)
+
+
+def _get_value_key(value):
+    if isinstance(value, list):
+        items = tuple(_get_value_key(v) for v in value)
+        return None if None in items else (list, items)
+    if type(value) is float:
+        # -0.0 == 0.0, tell them apart by sign
+        return float, value, math.copysign(1.0, value)
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return type(value), value
+    return None
@@ -0,0 +1,184 @@
+'''Hot reload of a config file into a JsonCfg.
+
+`JsonCfgWatcher` watches a config file (with inotify on Linux, or by polling `os.stat`
+elsewhere), and on change reloads it, applies only the keys whose values changed, and
+notifies the subscribers of those keys.
+'''
+import os
+import threading
+
+from .json_config import JsonCfg, _same_value
+from . import loader
+
+# inotify event masks, from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_EVENT_HEADER_SIZE = 16
+
+
+class _InotifyWaiter(object):
+    '''Wait for writes to a file, by watching its directory with inotify.
+
+    The directory is watched instead of the file itself, so that files replaced by editors
+    or by atomic renames keep being watched.
+    '''
+
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        dir_name, self.__file_name = os.path.split(os.path.abspath(path))
+        self.__file_name = os.fsencode(self.__file_name)
+        self.__fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.__fd, os.fsencode(dir_name), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.__fd)
+            raise OSError(errno, 'inotify_add_watch failed: {}'.format(dir_name))
+
+    def wait(self, timeout):
+        '''Return True if the file was written within `timeout` seconds.'''
+        import select
+        import struct
+
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(self.__fd, 65536)
+        except BlockingIOError:
+            return False
+        offset = 0
+        changed = False
+        while offset + _IN_EVENT_HEADER_SIZE <= len(data):
+            _, _, _, name_len = struct.unpack_from('iIII', data, offset)
+            offset += _IN_EVENT_HEADER_SIZE
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if name == self.__file_name:
+                changed = True
+        return changed
+
+    def close(self):
+        os.close(self.__fd)
+
+
+class JsonCfgWatcher(object):
+    '''Reload `config_path` into `config` whenever the file changes.
+
+    Only keys whose values differ from the previously loaded content are applied to the
+    config. Subscribers registered with `subscribe(key, callback)` are called with a dict of
+    the changed dotted keys under `key` (a leaf key, a sub config key, or '' for all keys).
+    Keys removed from the file keep their current values. Files are loaded as by
+    `JsonCfg.update_from_file`, with their `_include` fragments, but only `config_path` itself
+    is watched.
+    '''
+
+    def __init__(self, config, config_path, interval=1.0, use_inotify=True, on_error=None):
+        self.__config = config
+        self.__config_path = config_path
+        self.__interval = interval
+        self.__use_inotify = use_inotify
+        self.__on_error = on_error
+        self.__subscribers = {}
+        self.__loaded = None
+        self.__file_stat = None
+        self.__lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    def subscribe(self, key, callback):
+        self.__subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, key, callback):
+        self.__subscribers[key].remove(callback)
+
+    def reload(self):
+        '''Reload the file now, apply changed values and return them as a dict of dotted keys.'''
+        with self.__lock:
+            self.__file_stat = loader.get_file_stat(self.__config_path)
+            new_loaded = JsonCfg._load_flat_file(self.__config_path)
+            old_loaded = self.__loaded
+            changed = {}
+            for key, value in new_loaded.items():
+                if old_loaded is not None and key in old_loaded and _same_value(old_loaded[key], value):
+                    continue
+                if old_loaded is None and _same_value(self.__config[key], value):
+                    continue
+                changed[key] = value
+
+            self.__config.update(changed)
+            self.__loaded = new_loaded
+
+        if changed:
+            self.__notify(changed)
+        return changed
+
+    def __notify(self, changed):
+        for sub_key, callbacks in list(self.__subscribers.items()):
+            if sub_key == '':
+                sub_changed = changed
+            elif sub_key in changed:
+                sub_changed = {sub_key: changed[sub_key]}
+            else:
+                prefix = sub_key + '.'
+                sub_changed = {k: v for k, v in changed.items() if k.startswith(prefix)}
+            if sub_changed:
+                for callback in list(callbacks):
+                    callback(sub_changed)
+
+    def __run(self):
+        waiter = None
+        if self.__use_inotify:
+            try:
+                waiter = _InotifyWaiter(self.__config_path)
+            except (OSError, AttributeError):
+                # no inotify on this platform, fall back to polling
+                waiter = None
+        try:
+            while not self.__stop_event.is_set():
+                if waiter is not None:
+                    waiter.wait(self.__interval)
+                else:
+                    self.__stop_event.wait(self.__interval)
+                if self.__stop_event.is_set():
+                    break
+                if loader.get_file_stat(self.__config_path) == self.__file_stat:
+                    continue
+                try:
+                    self.reload()
+                except Exception as e:
+                    # e.g. a file being written by a non-atomic editor, retried on next change
+                    if self.__on_error is not None:
+                        self.__on_error(e)
+                    else:
+                        import warnings
+                        warnings.warn('Failed to reload config file {}: {!r}'.format(self.__config_path, e))
+        finally:
+            if waiter is not None:
+                waiter.close()
+
+    def start(self):
+        '''Load the file once, then watch it in a daemon thread.'''
+        assert self.__thread is None, 'Watcher is already started!'
+        self.reload()
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name='JsonCfgWatcher', daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__stop_event.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
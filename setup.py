@@ -4,9 +4,13 @@ import setuptools
 with open('./README.md') as rfile:
     long_desc = rfile.read()
 
+version = {}
+with open('./jcfg/version.py') as rfile:
+    exec(rfile.read(), version)
+
 setuptools.setup(
     name='jcfg',
-    version='0.10.2',
+    version=version['__version__'],
     description='A json-based configuration helper lib for python',
     long_description=long_desc,
     long_description_content_type='text/markdown',
@@ -15,7 +19,6 @@ setuptools.setup(
     url='https://github.com/chkap/jcfg',
     packages=['jcfg'],
     install_requires=[
-        "jstyleson",
         "pyyaml"
     ],
     classifiers=[
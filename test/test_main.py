@@ -1,11 +1,30 @@
 
 import unittest
+import os
 import sys
 sys.path.insert(0, '..')
 import subprocess
+import copy
+import pickle
+import tempfile
+import threading
+import array
+import math
+import asyncio
 from pathlib import Path
 
-from jcfg import JsonCfg
+from jcfg import JsonCfg, FrozenCfg, JsonCfgSchema
+from jcfg import loader, cache, instrument, includes, aio
+from jcfg.watch import JsonCfgWatcher
+from jcfg.atomic_cfg import AtomicJsonCfg
+from jcfg.layers import LayeredJsonCfg
+from jcfg.sweep import Sweep
+from jcfg import fingerprint as fingerprint_module
+from jcfg import codegen
+from jcfg import binary
+from jcfg.shared import SharedJsonCfg
+from jcfg import JCfgBinaryFormatError, JCfgSchemaNotFoundError, JCfgInvalidValueError, JCfgIncludeCycleError
+from jcfg.json_config import JsonCfgValue
 from jcfg import JCfgKeyNotFoundError, JCfgInvalidKeyError, JCfgValueTypeMismatchError, JCfgInvalidSetValueError, JCfgValidateFailError
 
 test_config = {
@@ -265,6 +284,85 @@ class TestValidate(unittest.TestCase):
         except JCfgValidateFailError:
             pass
 
+    def _make_config(self, calls):
+        def _is_positive(x):
+            calls.append(x)
+            return x > 0
+
+        def _check_name(x):
+            calls.append(x)
+            if x == 'bad':
+                raise ValueError('bad name')
+        return JsonCfg({
+            'a': {'_default': 1, '_validate': _is_positive},
+            'b': 2,
+            'sub': {'c': (1, 'desc', _is_positive), 'name': {'_default': 'x', '_validate': _check_name}},
+        })
+
+    def test_validate_all(self):
+        calls = []
+        cfg = self._make_config(calls)
+        cfg.validate()
+        self.assertEqual(calls, [1, 1, 'x'])
+
+        # values which passed are cached
+        cfg.validate()
+        self.assertEqual(len(calls), 3)
+        cfg.validate(use_cache=False)
+        self.assertEqual(len(calls), 6)
+
+        # bypass validation on set, to report all failures of validate() at once
+        cfg._get_value_slot('a').set(-1)
+        cfg._get_value_slot('sub.c').set(0)
+        cfg._get_value_slot('sub.name').set('bad')
+        for workers in (None, 4):
+            with self.assertRaises(JCfgValidateFailError) as ctx:
+                cfg.validate(workers=workers)
+            failures = ctx.exception.failures
+            self.assertEqual([(key, value) for key, value, _ in failures], [('a', -1), ('sub.c', 0), ('sub.name', 'bad')])
+            self.assertIsInstance(failures[2][2], ValueError)
+        cfg.sub.name = 'y'
+        with self.assertRaises(JCfgValidateFailError):
+            cfg.sub.validate()
+
+    def test_signed_zero_not_cached(self):
+        cfg = JsonCfg({'a': (0.0, 'desc', lambda x: math.copysign(1.0, x) > 0)})
+        cfg.validate()
+        cfg._get_value_slot('a').set(-0.0)
+        with self.assertRaises(JCfgValidateFailError):
+            cfg.validate()
+
+    def test_update_reports_all_failures(self):
+        cfg = self._make_config([])
+        with self.assertRaises(JCfgValidateFailError) as ctx:
+            cfg.update({'a': -1, 'b': 3, 'sub.c': -2})
+        self.assertEqual(ctx.exception.failures, [('a', -1, None), ('sub.c', -2, None)])
+        self.assertEqual((cfg.a, cfg.b), (1, 2))
+
+    def test_raising_validator_reported(self):
+        cfg = self._make_config([])
+        with self.assertRaises(JCfgValidateFailError) as ctx:
+            cfg.sub.name = 'bad'
+        self.assertIsInstance(ctx.exception.failures[0][2], ValueError)
+        with self.assertRaises(JCfgValidateFailError) as ctx:
+            cfg.update({'a': -1, 'sub.name': 'bad'})
+        failures = ctx.exception.failures
+        self.assertEqual([(key, value) for key, value, _ in failures], [('a', -1), ('sub.name', 'bad')])
+        self.assertIsInstance(failures[1][2], ValueError)
+        self.assertEqual((cfg.a, cfg.sub.name), (1, 'x'))
+
+    def test_shared_by_schema(self):
+        calls = []
+        schema = JsonCfgSchema(self._make_config(calls).to_meta())
+        schema.create().validate()
+        self.assertEqual(len(calls), 3)
+        cfg = schema.create()
+        cfg.validate()
+        self.assertEqual(len(calls), 3)
+        cfg.a = 5
+        cfg.validate()
+        self.assertEqual(calls[-1], 5)
+
 
 class TestYaml(unittest.TestCase):
 
@@ -285,6 +383,1241 @@ class TestYaml(unittest.TestCase):
         cfg.save_to_file('example_dump/config_output.yaml')
 
 
+class TestKeyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.config = JsonCfg(test_config)
+
+    def test_dotted_keys_match_nested_access(self):
+        for key in self.config.keys():
+            sub_config = self.config
+            for part in key.split('.'):
+                sub_config = sub_config[part]
+            self.assertEqual(self.config[key], sub_config)
+
+    def test_index_follows_updates(self):
+        self.config.f.f_d.f_d_a = 'changed'
+        self.assertEqual(self.config['f.f_d.f_d_a'], 'changed')
+        self.config['f.f_a'] = 5
+        self.assertEqual(self.config.f.f_a, 5)
+
+    def test_invalid_keys(self):
+        with self.assertRaises(JCfgKeyNotFoundError):
+            self.config['f.not_exist']
+        with self.assertRaises(JCfgInvalidKeyError):
+            self.config['a.b']
+
+    def test_sub_config_dotted_keys(self):
+        sub_config = self.config.f
+        self.assertEqual(sub_config['f_d.f_d_a'], self.config['f.f_d.f_d_a'])
+        sub_config['f_d.f_d_a'] = 'changed'
+        self.assertEqual(self.config.f.f_d.f_d_a, 'changed')
+        sub_copy = sub_config.copy()
+        sub_copy['f_d.f_d_a'] = 'copied'
+        self.assertEqual(sub_copy.f_d.f_d_a, 'copied')
+        self.assertEqual(sub_config.f_d.f_d_a, 'changed')
+        with self.assertRaises(JCfgKeyNotFoundError):
+            sub_config['f_d.not_exist']
+
+    def test_compact_layout(self):
+        config = JsonCfg({'a': {'x': 1, 'y': 'value'}, 'b': {'x': 1, 'y': 'value'}})
+        self.assertFalse(hasattr(config, '__dict__'))
+        self.assertFalse(hasattr(config._get_value_slot('a.x'), '__dict__'))
+        # equal meta info is shared, values are not
+        self.assertIs(config._get_value_slot('a.x')._JsonCfgValue__meta,
+                      config._get_value_slot('b.x')._JsonCfgValue__meta)
+        config.a.x = 2
+        self.assertEqual(config.b.x, 1)
+        with self.assertRaises(JCfgInvalidSetValueError):
+            config.a = 1
+        # -0.0 == 0.0, but they are different defaults
+        meta = JsonCfg({'a': 0.0, 'b': -0.0}).to_meta()
+        self.assertEqual([math.copysign(1.0, meta[key]['_default']) for key in 'ab'], [1.0, -1.0])
+
+
+class TestFreeze(unittest.TestCase):
+
+    def setUp(self):
+        self.config = JsonCfg(test_config)
+
+    def test_freeze_values(self):
+        snap = self.config.freeze()
+        self.assertIsInstance(snap, FrozenCfg)
+        self.assertIsInstance(snap.f.f_d, FrozenCfg)
+        self.assertEqual(snap.f.f_a, 1)
+        self.assertEqual(snap['f.f_d.f_d_b'], ('a', 'b', 'c'))
+        self.assertEqual(list(snap.keys()), list(self.config.keys()))
+        self.assertEqual(snap.to_dict(), self.config.to_dict())
+
+    def test_snapshot_is_immutable(self):
+        snap = self.config.freeze()
+        with self.assertRaises(JCfgInvalidSetValueError):
+            snap.a = 2
+        with self.assertRaises(JCfgInvalidSetValueError):
+            snap.f.f_a = 2
+        with self.assertRaises(JCfgKeyNotFoundError):
+            snap['f.not_exist']
+
+        self.config.a = 2
+        self.assertEqual(snap.a, 1)
+        self.assertEqual(self.config.freeze().a, 2)
+
+    def test_snapshot_is_hashable(self):
+        snap = self.config.freeze()
+        same_snap = JsonCfg(test_config).freeze()
+        self.assertEqual(snap, same_snap)
+        self.assertEqual(hash(snap), hash(same_snap))
+
+        self.config.f.f_a = 2
+        self.assertNotEqual(snap, self.config.freeze())
+        self.assertEqual(len({snap, same_snap, self.config.freeze()}), 2)
+
+    def test_private_keys(self):
+        config = JsonCfg({'_fields': 1, 'sub': {'_slot_setters': 'x'}})
+        snap = config.freeze()
+        self.assertEqual((snap._fields, snap.sub._slot_setters), (1, 'x'))
+        self.assertEqual(snap.to_dict(), config.to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(snap)), snap)
+
+        config = JsonCfg({'__x': 1, 'a': 2, 'sub': {'__y': [3]}})
+        snap = config.freeze()
+        self.assertEqual((snap['__x'], getattr(snap.sub, '__y'), snap.a), (1, (3,), 2))
+        self.assertEqual(snap.to_dict(), config.to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(snap)), snap)
+        config['__x'] = 5
+        self.assertEqual(config.freeze()['__x'], 5)
+
+
+class TestSchema(unittest.TestCase):
+
+    def test_create_from_schema(self):
+        schema = JsonCfgSchema(test_config)
+        cfg_a = schema.create()
+        cfg_b = schema.create()
+        self.assertEqual(cfg_a.to_dict(), JsonCfg(test_config).to_dict())
+
+        cfg_a.f.f_a = 10
+        cfg_a['f.f_d.f_d_b'].append('d')
+        self.assertEqual(cfg_b.f.f_a, 1)
+        self.assertEqual(cfg_b['f.f_d.f_d_b'], ['a', 'b', 'c'])
+        self.assertEqual(cfg_a['f.f_a'], 10)
+
+    def test_schema_keeps_validator(self):
+        schema = JsonCfgSchema({'a': (0, 'desc', lambda x: x >= 0)})
+        cfg = schema.create()
+        with self.assertRaises(JCfgValidateFailError):
+            cfg.a = -1
+
+    def test_closure_validators(self):
+        def _make_meta(max_n):
+            return {'a': (0, 'desc', lambda x: x <= max_n)}
+        schema_a = JsonCfgSchema(_make_meta(1))
+        schema_b = JsonCfgSchema(_make_meta(10))
+        self.assertNotEqual(schema_a.fingerprint, schema_b.fingerprint)
+        self.assertEqual(schema_a.fingerprint, JsonCfgSchema(_make_meta(1)).fingerprint)
+        cfg = pickle.loads(pickle.dumps(schema_b.create()))
+        cfg.a = 5
+        self.assertEqual(cfg.a, 5)
+
+        # lambdas on the same line differ by their code
+        metas = [{'a': (0, '', lambda x: x > 0)}, {'a': (0, '', lambda x: x < 100)}]
+        self.assertNotEqual(JsonCfgSchema(metas[0]).fingerprint, JsonCfgSchema(metas[1]).fingerprint)
+
+    def test_copy(self):
+        cfg = JsonCfg(test_config)
+        cfg.a = 3
+        cfg_copy = copy.deepcopy(cfg)
+        self.assertEqual(cfg_copy.to_dict(), cfg.to_dict())
+        cfg_copy.f.f_d.f_d_a = 'changed'
+        self.assertEqual(cfg.f.f_d.f_d_a, 's')
+        self.assertEqual(cfg_copy['f.f_d.f_d_a'], 'changed')
+
+    def test_reserved_key(self):
+        with self.assertRaises(JCfgInvalidKeyError):
+            JsonCfg({'keys': 1})
+
+
+class TestLoader(unittest.TestCase):
+
+    def test_json_with_comments(self):
+        text = '''/* block comment, with "quotes" */
+        {
+            "url": "http://example.com/*not_a_comment*/",  // line comment
+            "list": [1, 2, 3, ],
+            "trailing": ",]",
+            "nested": {"a": "//", },
+        }'''
+        config = loader.loads(text.encode('utf-8'), 'config.json')
+        self.assertEqual(config, {
+            'url': 'http://example.com/*not_a_comment*/',
+            'list': [1, 2, 3],
+            'trailing': ',]',
+            'nested': {'a': '//'},
+        })
+
+    def test_load_comment_file(self):
+        config = loader.load_file('test_config_with_comments.json')
+        self.assertEqual(config['d'], [1, 2, 3, 4])
+        self.assertEqual(config['f']['f_d']['f_d_a'], 'new_s_from_file')
+
+    def test_yml_and_custom_format(self):
+        output_dir = Path('example_dump')
+        output_dir.mkdir(parents=True, exist_ok=True)
+        cfg = JsonCfg({'a': 1, 'b': {'c': [1, 2]}})
+        cfg.a = 2
+        cfg.save_to_file('example_dump/config_output.yml')
+        self.assertEqual(loader.load_file('example_dump/config_output.yml'), cfg.to_dict())
+
+        self.addCleanup(loader._loaders.pop, '.kv')
+        loader.register_loader('.kv', lambda data: dict(
+            line.split('=', 1) for line in data.decode('utf-8').splitlines()))
+        (output_dir / 'config.kv').write_text('a=x\nb=y\n')
+        self.assertEqual(loader.load_file('example_dump/config.kv'), {'a': 'x', 'b': 'y'})
+
+
+class TestFileCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+        self.config_path = str(self.tmp_dir / 'config.json')
+        Path(self.config_path).write_text('{"a": 2, "f": {"f_a": 3}}')
+
+    def _load_without_parsing(self, cfg, **kwargs):
+        orig_loads = loader.loads
+        def _fail_loads(data, path):
+            raise AssertionError('config file should be loaded from cache')
+        loader.loads = _fail_loads
+        try:
+            cfg.update_from_file(self.config_path, **kwargs)
+        finally:
+            loader.loads = orig_loads
+
+    def test_cache_next_to_file(self):
+        JsonCfg(test_config).update_from_file(self.config_path, cache=True)
+        self.assertTrue(os.path.exists(cache.get_cache_path(self.config_path)))
+
+        cfg = JsonCfg(test_config)
+        self._load_without_parsing(cfg, cache=True)
+        self.assertEqual(cfg.a, 2)
+        self.assertEqual(cfg.f.f_a, 3)
+
+    def test_cache_dir_and_invalidation(self):
+        cache_dir = str(self.tmp_dir / 'cache')
+        cfg = JsonCfg(test_config)
+        cfg.update_from_file(self.config_path, cache=cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self._load_without_parsing(cfg, cache=cache_dir)
+
+        stat = os.stat(self.config_path)
+        Path(self.config_path).write_text('{"a": 5}')
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        cfg.update_from_file(self.config_path, cache=cache_dir)
+        self.assertEqual(cfg.a, 5)
+        self._load_without_parsing(cfg, cache=cache_dir)
+
+    def test_corrupted_cache(self):
+        cache_path = cache.get_cache_path(self.config_path)
+        Path(cache_path).write_bytes(b'not a cache entry')
+        cfg = JsonCfg(test_config)
+        cfg.update_from_file(self.config_path, cache=True)
+        self.assertEqual(cfg.a, 2)
+        self._load_without_parsing(cfg, cache=True)
+
+        # entries are stored as a key line and a binary config, never unmarshalled
+        data = Path(cache_path).read_bytes()
+        key_line, _, payload = data.partition(b'\n')
+        self.assertIn(repr(tuple(sys.version_info[:2])).encode('utf-8'), key_line)
+        self.assertEqual(binary.decode_flat(payload), {'a': 2, 'f.f_a': 3})
+        Path(cache_path).write_bytes(data[:-3])
+        cfg.update_from_file(self.config_path, cache=True)
+        self.assertEqual(cfg.f.f_a, 3)
+
+
+class TestIncludes(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(includes.clear_cache)
+        self.tmp_dir = Path(tmp_dir.name)
+        (self.tmp_dir / 'frag').mkdir()
+        self._write('frag/base.json', '{"a": 2, "c": "base", "f": {"f_a": 10}}')
+        self._write('frag/model.yaml', '_include: base.json\nc: model\nf:\n  f_b: 20\n')
+        self._write('frag/data.json', '{"_include": "base.json", "f.f_a": 30}')
+        self._write('config.json', '{"_include": ["frag/model.yaml", "frag/data.json"], "b": 3.0}')
+
+    def _write(self, name, text):
+        (self.tmp_dir / name).write_text(text)
+        return str(self.tmp_dir / name)
+
+    def test_merge_order(self):
+        for workers in (None, 1):
+            cfg = JsonCfg(test_config)
+            cfg.update_from_file(str(self.tmp_dir / 'config.json'), workers=workers)
+            self.assertEqual(cfg.a, 2)
+            self.assertEqual(cfg.b, 3.0)
+            self.assertEqual(cfg.c, 'model')
+            # data.json comes after model.yaml, base.json is merged only once, before both
+            self.assertEqual(cfg.f.f_a, 30)
+            self.assertEqual(cfg.f.f_b, 20)
+
+    def test_fragment_cache(self):
+        JsonCfg(test_config).update_from_file(str(self.tmp_dir / 'config.json'))
+        orig_loads = loader.loads
+        parsed = []
+        def _loads(data, path):
+            parsed.append(os.path.basename(path))
+            return orig_loads(data, path)
+        loader.loads = _loads
+        try:
+            cfg = JsonCfg(test_config)
+            cfg.update_from_file(self._write('other.json', '{"_include": "frag/data.json"}'))
+            self.assertEqual(parsed, ['other.json'])
+            self._write('frag/data.json', '{"_include": "base.json", "f.f_a": 40, "c": "data"}')
+            cfg.update_from_file(str(self.tmp_dir / 'other.json'))
+        finally:
+            loader.loads = orig_loads
+        self.assertEqual(parsed, ['other.json', 'other.json', 'data.json'])
+        self.assertEqual((cfg.f.f_a, cfg.c), (40, 'data'))
+
+    def test_cached_lists_not_shared(self):
+        self._write('frag/base.json', '{"d": [1, 2]}')
+        config_path = str(self.tmp_dir / 'config.json')
+        cfg = JsonCfg(test_config)
+        cfg.update_from_file(config_path)
+        cfg.d.append(99)
+        other = JsonCfg(test_config)
+        other.update_from_file(config_path)
+        self.assertEqual(other.d, [1, 2])
+
+    def test_cycle(self):
+        self._write('frag/base.json', '{"_include": "../config.json", "a": 2}')
+        with self.assertRaises(JCfgIncludeCycleError) as cm:
+            JsonCfg(test_config).update_from_file(str(self.tmp_dir / 'config.json'))
+        self.assertIn('base.json', str(cm.exception))
+        self._write('self.json', '{"_include": "self.json"}')
+        with self.assertRaises(JCfgIncludeCycleError):
+            JsonCfg(test_config).update_from_file(str(self.tmp_dir / 'self.json'))
+
+    def test_invalid_include(self):
+        with self.assertRaises(JCfgInvalidValueError):
+            JsonCfg(test_config).update_from_file(self._write('bad.json', '{"_include": 1}'))
+        with self.assertRaises(FileNotFoundError):
+            JsonCfg(test_config).update_from_file(self._write('missing.json', '{"_include": "nope.json"}'))
+
+    def test_disk_cache_and_layers(self):
+        cfg = JsonCfg(test_config)
+        cfg.update_from_file(str(self.tmp_dir / 'config.json'), cache=True)
+        self.assertEqual(cfg.f.f_a, 30)
+
+        layers = LayeredJsonCfg(JsonCfg(test_config))
+        layers.add_file(str(self.tmp_dir / 'config.json'))
+        self.assertEqual(layers.config.f.f_a, 30)
+        self._write('frag/data.json', '{"f.f_a": 50}')
+        layers.reload()
+        self.assertEqual(layers.config.f.f_a, 50)
+        self.assertEqual(layers.config.a, 2)
+
+
+class TestAsyncLoad(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+        self.paths = []
+        for idx, text in enumerate(['{"a": 2, "c": "first"}', 'a: 3\nf:\n  f_a: 4\n', '{"f.f_a": 5}']):
+            path = self.tmp_dir / 'config{}.{}'.format(idx, 'yaml' if idx == 1 else 'json')
+            path.write_text(text)
+            self.paths.append(str(path))
+
+    def test_aupdate_from_file(self):
+        cfg = JsonCfg(test_config)
+        orig_loads = loader.loads
+        threads = []
+        def _loads(data, path):
+            threads.append(threading.current_thread())
+            return orig_loads(data, path)
+        loader.loads = _loads
+        try:
+            asyncio.run(cfg.aupdate_from_file(self.paths[0]))
+        finally:
+            loader.loads = orig_loads
+        self.assertEqual((cfg.a, cfg.c), (2, 'first'))
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_update_from_files_in_order(self):
+        cfg = JsonCfg(test_config)
+        asyncio.run(aio.update_from_files(cfg, self.paths))
+        self.assertEqual((cfg.a, cfg.c, cfg.f.f_a), (3, 'first', 5))
+
+        cfg = JsonCfg(test_config)
+        asyncio.run(aio.update_from_files(cfg, self.paths[::-1]))
+        self.assertEqual((cfg.a, cfg.f.f_a), (2, 4))
+
+    def test_failure_leaves_config_unchanged(self):
+        cfg = JsonCfg(test_config)
+        bad_path = self.tmp_dir / 'bad.json'
+        bad_path.write_text('{"a": "not an int"}')
+        with self.assertRaises(JCfgValueTypeMismatchError):
+            asyncio.run(aio.update_from_files(cfg, self.paths + [str(bad_path)]))
+        with self.assertRaises(FileNotFoundError):
+            asyncio.run(aio.update_from_files(cfg, [str(self.tmp_dir / 'missing.json')] + self.paths))
+        self.assertEqual((cfg.a, cfg.f.f_a), (1, 1))
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.config = JsonCfg(test_config)
+        self.sweep = Sweep(self.config)
+        self.sweep.grid('a', [1, 2, 3])
+        self.sweep.zip({'f.f_a': [10, 20], 'f.f_d.f_d_a': ['x', 'y']})
+        self.sweep.random(4, {'b': lambda rng: rng.uniform(0, 1), 'c': ['p', 'q']}, seed=0)
+
+    def test_axes(self):
+        variants = list(self.sweep)
+        self.assertEqual(len(self.sweep), 24)
+        self.assertEqual(len(variants), 24)
+        self.assertEqual([v['a'] for v in variants[::8]], [1, 2, 3])
+        self.assertEqual([(v.f.f_a, v.f.f_d.f_d_a) for v in variants[:8:4]], [(10, 'x'), (20, 'y')])
+        # random points are reproducible, and keys not swept keep their base value
+        self.assertEqual([v.b for v in variants[:4]], [v.b for v in variants[4:8]])
+        self.assertEqual([v.b for v in variants[:4]], [v.b for v in Sweep(self.config).random(
+            4, {'b': lambda rng: rng.uniform(0, 1), 'c': ['p', 'q']}, seed=0)])
+        self.assertEqual(variants[5].d, [1, 2, 3, 4])
+        for idx in (0, 5, 23, -1):
+            self.assertEqual(self.sweep[idx].overrides, variants[idx].overrides)
+        with self.assertRaises(IndexError):
+            self.sweep[24]
+        # -0.0 == 0.0, but they are different axis values
+        self.assertEqual([math.copysign(1.0, v.b) for v in Sweep(self.config).grid('b', [0.0, -0.0])], [1.0, -1.0])
+
+    def test_variants_share_base(self):
+        variant = self.sweep[9]
+        self.assertEqual(set(variant.overrides), {'a', 'b', 'c', 'f.f_a', 'f.f_d.f_d_a'})
+        variant.d.append(5)
+        self.config.a = 7
+        self.assertEqual(self.sweep[0].d, [1, 2, 3, 4])
+
+        cfg = variant.to_config()
+        self.assertIsInstance(cfg, JsonCfg)
+        self.assertEqual((cfg.a, cfg.f.f_a, cfg.f.f_b), (2, 10, 2))
+        frozen = variant.freeze()
+        self.assertEqual(frozen.to_dict(), cfg.to_dict())
+        self.assertIs(frozen.f.f_c, self.sweep[0].freeze().f.f_c)
+
+    def test_list_overrides_not_shared(self):
+        sweep = Sweep(JsonCfg(dict(test_config, w={'_default': [], '_type': 'list[float]'})))
+        sweep.zip({'d': [[1], [2]], 'w': [[1.0], [2.0]]})
+        cfg = sweep[0].to_config()
+        cfg.d.append(99)
+        cfg.w.append(99.0)
+        self.assertEqual(sweep[0].d, [1])
+        self.assertEqual(list(sweep[0].w), [1.0])
+        self.assertEqual(sweep[0].to_config().d, [1])
+        sweep[0].w.append(99.0)
+        self.assertEqual(list(sweep[0].overrides['w']), [1.0])
+
+    def test_invalid_axes(self):
+        sweep = Sweep(JsonCfg({'a': (1, 'positive', lambda x: x > 0), 'f': {'f_a': 1}}))
+        with self.assertRaises(JCfgValidateFailError):
+            sweep.grid('a', [1, -1])
+        with self.assertRaises(JCfgValueTypeMismatchError):
+            sweep.grid('a', ['1'])
+        with self.assertRaises(JCfgKeyNotFoundError):
+            sweep.grid('f.not_exist', [1])
+        with self.assertRaises(JCfgInvalidSetValueError):
+            sweep.grid('f', [1])
+        with self.assertRaises(ValueError):
+            sweep.zip({'a': [1, 2], 'f.f_a': [1]})
+        sweep.grid('a', [1, 2])
+        with self.assertRaises(JCfgInvalidKeyError):
+            sweep.zip({'a': [1], 'f.f_a': [1]})
+        self.assertEqual(len(sweep), 2)
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_canonical(self):
+        config = JsonCfg(test_config)
+        reordered = JsonCfg(dict(reversed(list(test_config.items()))))
+        self.assertEqual(config.fingerprint(), reordered.fingerprint())
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        json_path = os.path.join(tmp_dir.name, 'config.json')
+        yaml_path = os.path.join(tmp_dir.name, 'config.yaml')
+        Path(json_path).write_text('{"b": 2.0, "f": {"f_d": {"f_d_b": ["x"]}}}')
+        Path(yaml_path).write_text('f:\n  f_d:\n    f_d_b: [x]\nb: 2\n')
+        config.update_from_file(json_path)
+        reordered.update_from_file(yaml_path)
+        self.assertEqual(config.fingerprint(), reordered.fingerprint())
+        self.assertEqual(config.fingerprint(), config.copy().fingerprint())
+
+        config.e = False
+        self.assertNotEqual(config.fingerprint(), reordered.fingerprint())
+        self.assertNotEqual(JsonCfg({'a': True}).fingerprint(), JsonCfg({'a': 1}).fingerprint())
+        self.assertNotEqual(JsonCfg({'a': '1'}).fingerprint(), JsonCfg({'a': 1}).fingerprint())
+        self.assertNotEqual(JsonCfg({'a': {'b': 1}}).fingerprint(), JsonCfg({'b': {'a': 1}}).fingerprint())
+
+    def test_incremental(self):
+        config = JsonCfg(test_config)
+        sub_fingerprint = config.f.f_d.fingerprint()
+        fingerprint = config.fingerprint()
+        config['f.f_d.f_d_a'] = 'changed'
+        config.update({'a': 5, 'f': {'f_b': 7}})
+        self.assertNotEqual(config.fingerprint(), fingerprint)
+        self.assertNotEqual(config.f.f_d.fingerprint(), sub_fingerprint)
+        self.assertEqual(config.fingerprint(), config.copy().fingerprint())
+
+        hashed = []
+        orig_hash_leaf = fingerprint_module._hash_leaf
+        def _hash_leaf(key, value):
+            hashed.append(key)
+            return orig_hash_leaf(key, value)
+        fingerprint_module._hash_leaf = _hash_leaf
+        try:
+            config.f.f_d.f_d_a = 's'
+            config.update({'a': 1, 'f.f_b': 2})
+            self.assertEqual(config.fingerprint(), fingerprint)
+        finally:
+            fingerprint_module._hash_leaf = orig_hash_leaf
+        self.assertEqual(sorted(hashed), ['a', 'f_b', 'f_d_a'])
+
+
+class TestCodegen(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        self.meta = dict(test_config, g=(0.5, 'positive', lambda x: x > 0),
+                         w={'_default': [1.0, 2.0], '_type': 'list[float]'})
+
+    def test_access(self):
+        Config = codegen.load_classes(self.meta, cache_dir=self.tmp_dir)
+        self.assertIs(Config, codegen.load_classes(self.meta, cache_dir=self.tmp_dir))
+        values = {'a': 2, 'f': {'f_b': 3}, 'f.f_d.f_d_a': 'x'}
+        config = Config.from_dict(values)
+        jcfg_config = JsonCfg(self.meta)
+        jcfg_config.update(values)
+        self.assertEqual(config.to_dict(), jcfg_config.to_dict())
+        self.assertEqual(config.f.f_d.f_d_a, 'x')
+        self.assertEqual(config['f.f_b'], 3)
+        self.assertIsInstance(config.w, array.array)
+        self.assertFalse(hasattr(config, '__dict__'))
+        self.assertEqual(Config(a=3).a, 3)
+        self.assertEqual(Config().d, [1, 2, 3, 4])
+        self.assertIsNot(Config().d, Config().d)
+
+        config.b = 2
+        with self.assertRaises(JCfgValueTypeMismatchError):
+            config.a = 'str'
+        with self.assertRaises(JCfgValidateFailError):
+            config.g = -1.0
+        with self.assertRaises(JCfgValidateFailError):
+            config.update({'a': 5, 'g': -1.0})
+        self.assertEqual(config.a, 2)
+        with self.assertRaises(JCfgKeyNotFoundError):
+            config.update({'f.no_key': 1})
+        with self.assertRaises(JCfgInvalidSetValueError):
+            config.f = 1
+
+    def test_file(self):
+        Config = codegen.load_classes(self.meta, cache_dir=self.tmp_dir)
+        json_path = os.path.join(self.tmp_dir, 'config.json')
+        Path(json_path).write_text('{"f": {"f_a": 3}, // comment\n "w": [4]}')
+        config = Config.from_file(json_path)
+        jcfg_config = JsonCfg(self.meta)
+        jcfg_config.update_from_file(json_path)
+        self.assertEqual(config.to_dict(), jcfg_config.to_dict())
+
+        save_path = os.path.join(self.tmp_dir, 'saved.yaml')
+        config.save_to_file(save_path)
+        self.assertEqual(Config.from_file(save_path), config)
+
+    def test_stable_digest(self):
+        def _make_meta():
+            return {'a': (0.5, 'positive', lambda x: x > 0), 'b': {'c': 1}}
+        digest = codegen.get_digest(_make_meta())
+        self.assertEqual(codegen.get_digest(_make_meta()), digest)
+        self.assertNotEqual(codegen.get_digest(_make_meta(), class_name='Other'), digest)
+        # validators do not change the generated source, nor the digest
+        meta = {'a': (0.5, 'positive', _Limit(1.0).check), 'b': {'c': 1}}
+        self.assertEqual(codegen.get_digest(meta), digest)
+
+    def test_descriptions(self):
+        meta = {'a': (1, 'C:\\Names\\x'), 'b': (2, "'''quoted'''\nsecond line \\")}
+        source = codegen.generate_source(meta)
+        self.assertIn('# a: C:\\Names\\x', source)
+        namespace = {}
+        exec(compile(source, 'gen_config', 'exec'), namespace)
+        self.assertEqual(namespace['Config']().to_dict(), {'a': 1, 'b': 2})
+
+    def test_cli(self):
+        meta_path = os.path.join(self.tmp_dir, 'meta.json')
+        output_path = os.path.join(self.tmp_dir, 'gen_config.py')
+        loader.dump_file(test_config, meta_path)
+        codegen.main([meta_path, '-o', output_path, '--class-name', 'AppConfig'])
+        source = Path(output_path).read_text()
+        self.assertIn('class AppConfig(GeneratedCfg):', source)
+        mtime = os.stat(output_path).st_mtime_ns
+        codegen.main([meta_path, '-o', output_path, '--class-name', 'AppConfig'])
+        self.assertEqual(os.stat(output_path).st_mtime_ns, mtime)
+
+        module = codegen._import_file(output_path, 'gen_config')
+        self.assertEqual(module.AppConfig().to_dict(), JsonCfg(test_config).to_dict())
+        with self.assertRaises(JCfgInvalidKeyError):
+            codegen.generate_source({'class': 1})
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.config_path = os.path.join(tmp_dir.name, 'config.json')
+        self._write({'a': 2, 'f': {'f_a': 3, 'f_b': 2}})
+        self.config = JsonCfg(test_config)
+
+    def _write(self, config_dict):
+        with loader.atomic_write(self.config_path) as wf:
+            loader.dump(config_dict, wf, self.config_path)
+
+    def test_reload_applies_changed_keys(self):
+        watcher = JsonCfgWatcher(self.config, self.config_path)
+        # f.f_b already has the value of the file
+        self.assertEqual(watcher.reload(), {'a': 2, 'f.f_a': 3})
+        self.assertEqual(watcher.reload(), {})
+
+        section_changes, key_changes = [], []
+        watcher.subscribe('f', section_changes.append)
+        watcher.subscribe('a', key_changes.append)
+        self._write({'a': 2, 'f': {'f_a': 4, 'f_b': 5}})
+        self.assertEqual(watcher.reload(), {'f.f_a': 4, 'f.f_b': 5})
+        self.assertEqual(self.config.f.f_b, 5)
+        self.assertEqual(section_changes, [{'f.f_a': 4, 'f.f_b': 5}])
+        self.assertEqual(key_changes, [])
+
+    def _check_watch(self, use_inotify):
+        changed_event = threading.Event()
+        changes = []
+        def _on_change(changed):
+            changes.append(changed)
+            changed_event.set()
+
+        watcher = JsonCfgWatcher(self.config, self.config_path, interval=0.02, use_inotify=use_inotify)
+        watcher.subscribe('', _on_change)
+        with watcher:
+            self.assertTrue(changed_event.wait(5))
+            changed_event.clear()
+            self._write({'a': 7, 'f': {'f_a': 3, 'f_b': 2}})
+            self.assertTrue(changed_event.wait(5))
+        self.assertEqual(changes, [{'a': 2, 'f.f_a': 3}, {'a': 7}])
+        self.assertEqual(self.config.a, 7)
+
+    def test_watch_with_inotify(self):
+        self._check_watch(use_inotify=True)
+
+    def test_watch_with_polling(self):
+        self._check_watch(use_inotify=False)
+
+    def test_reload_with_includes(self):
+        fragment_path = os.path.join(os.path.dirname(self.config_path), 'fragment.json')
+        Path(fragment_path).write_text('{"f": {"f_a": 5, "f_b": 6}}')
+        self._write({'_include': ['fragment.json'], 'f': {'f_b': 7}})
+        watcher = JsonCfgWatcher(self.config, self.config_path)
+        self.assertEqual(watcher.reload(), {'f.f_a': 5, 'f.f_b': 7})
+
+        atomic_cfg = AtomicJsonCfg(JsonCfg(test_config))
+        atomic_cfg.update_from_file(self.config_path)
+        self.assertEqual((atomic_cfg.f.f_a, atomic_cfg.f.f_b), (5, 7))
+
+
+class TestBatchUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.config = JsonCfg({
+            'a': 1,
+            'b': (0.0, 'positive float', lambda x: x >= 0.0),
+            'f': {
+                'f_a': 1,
+                'f_b': 'x',
+            },
+        })
+
+    def test_update(self):
+        self.config.update({'a': 2, 'b': 3, 'f': {'f_a': 4}, 'f.f_b': 'y'})
+        self.assertEqual(self.config.to_dict(), {'a': 2, 'b': 3, 'f': {'f_a': 4, 'f_b': 'y'}})
+
+    def test_update_all_or_nothing(self):
+        before = self.config.to_dict()
+        with self.assertRaises(JCfgValueTypeMismatchError):
+            self.config.update({'a': 2, 'f.f_b': 1})
+        with self.assertRaises(JCfgValidateFailError):
+            self.config.update({'a': 2, 'b': -1.0})
+        with self.assertRaises(JCfgKeyNotFoundError):
+            self.config.update({'a': 2, 'f.f_c': 1})
+        with self.assertRaises(JCfgInvalidSetValueError):
+            self.config.update({'a': 2, 'f': 'not a section'})
+        self.assertEqual(self.config.to_dict(), before)
+
+    def test_failed_set_keeps_value(self):
+        with self.assertRaises(JCfgValidateFailError):
+            self.config.b = -1.0
+        self.assertEqual(self.config.b, 0.0)
+
+
+class TestAtomicJsonCfg(unittest.TestCase):
+
+    def test_update_publishes_new_snapshot(self):
+        atomic_cfg = AtomicJsonCfg(JsonCfg(test_config))
+        snap = atomic_cfg.snapshot
+        atomic_cfg.update({'f.f_a': 5, 'a': 2})
+        self.assertEqual(snap.f.f_a, 1)
+        self.assertEqual(atomic_cfg.snapshot.f.f_a, 5)
+        self.assertEqual(atomic_cfg.a, 2)
+        self.assertEqual(atomic_cfg.version, 1)
+        # untouched sections are shared between versions
+        self.assertIs(atomic_cfg.snapshot.f.f_d, snap.f.f_d)
+
+        with self.assertRaises(JCfgValueTypeMismatchError):
+            atomic_cfg.update({'f.f_b': 3, 'a': 'x'})
+        self.assertEqual(atomic_cfg.snapshot.f.f_b, 2)
+        self.assertEqual(atomic_cfg.version, 1)
+        self.assertEqual(atomic_cfg.to_config().to_dict(), atomic_cfg.snapshot.to_dict())
+
+    def test_concurrent_readers(self):
+        atomic_cfg = AtomicJsonCfg(JsonCfg({
+            'counter': {'x': 0, 'y': 0},
+            'other': {'z': 0},
+        }))
+        num_updates = 200
+        stop_event = threading.Event()
+        errors = []
+
+        def _read():
+            last_x = 0
+            while not stop_event.is_set():
+                snap = atomic_cfg.snapshot
+                x, y = snap.counter.x, snap.counter.y
+                if x != y or x < last_x:
+                    errors.append((x, y, last_x))
+                    return
+                last_x = x
+
+        readers = [threading.Thread(target=_read) for _ in range(8)]
+        for reader in readers:
+            reader.start()
+        try:
+            for i in range(1, num_updates + 1):
+                atomic_cfg.update({'counter': {'x': i, 'y': i}, 'other.z': -i})
+        finally:
+            stop_event.set()
+            for reader in readers:
+                reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(atomic_cfg.snapshot.counter.y, num_updates)
+
+
+def _read_shared_cfg(shared_cfg, key):
+    return shared_cfg[key]
+
+
+class TestBinaryView(unittest.TestCase):
+
+    def test_encode_decode(self):
+        cfg = JsonCfg(test_config)
+        cfg.a = -2 ** 40
+        view = binary.BinaryCfgView(binary.encode(cfg.items()))
+        self.assertEqual(len(view), len(list(cfg.keys())))
+        self.assertEqual(list(view.keys()), sorted(cfg.keys()))
+        for key, value in cfg.items():
+            self.assertEqual(view[key], value if not isinstance(value, list) else tuple(value))
+        self.assertEqual(view.f.f_d.f_d_a, 's')
+        self.assertEqual(view['f']['f_c'], 1)
+        self.assertIs(view.e, True)
+        with self.assertRaises(JCfgKeyNotFoundError):
+            view['f.not_exist']
+        with self.assertRaises(JCfgBinaryFormatError):
+            binary.BinaryCfgView(b'not a binary config' * 4)
+
+    def test_binary_file(self):
+        cfg = JsonCfg(dict(test_config, g=[1.5, [2, []], 'é'], h=2 ** 70, i='',
+                           w={'_default': [1.0, 2.0], '_type': 'list[float]'}))
+        cfg.update({'a': -3, 'b': float('inf'), 'f.f_d.f_d_a': 'x\0é', 'e': False})
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        save_path = os.path.join(tmp_dir.name, 'config.jcfgb')
+        self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+        self.assertFalse(cfg.save_to_file(save_path, skip_unchanged=True))
+
+        loaded = JsonCfg(dict(test_config, g=[], h=0, i='x', w={'_default': [], '_type': 'list[float]'}))
+        loaded.update_from_file(save_path)
+        self.assertEqual(loaded.to_dict(), cfg.to_dict())
+        self.assertIs(loaded.e, False)
+        self.assertEqual(loader.load_file(save_path), cfg.to_dict())
+
+        view = binary.load_file(save_path)
+        self.assertEqual(view['f.f_d.f_d_a'], 'x\0é')
+        self.assertEqual(view.g, (1.5, (2, ()), 'é'))
+        self.assertEqual(view.h, 2 ** 70)
+        # lists and big ints are stored as json, which any python version decodes safely
+        self.assertIn('[1.5,[2,[]],"é"]'.encode('utf-8'), Path(save_path).read_bytes())
+        self.assertEqual(view.to_flat_dict(), binary.BinaryCfgView(binary.encode(cfg.items())).to_flat_dict())
+
+        Path(save_path).write_bytes(b'')
+        with self.assertRaises(JCfgBinaryFormatError):
+            loaded.update_from_file(save_path)
+        Path(save_path).write_bytes(binary.encode(cfg.items())[:-1])
+        with self.assertRaises(JCfgBinaryFormatError):
+            binary.load_file(save_path)
+
+    def test_shared_memory(self):
+        cfg = JsonCfg(test_config)
+        cfg.f.f_d.f_d_a = 'shared'
+        with SharedJsonCfg(cfg) as shared_cfg:
+            self.assertEqual(shared_cfg.view['f.f_d.f_d_a'], 'shared')
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(_read_shared_cfg, [shared_cfg] * 4, ['f.f_d.f_d_a', 'a', 'd', 'e']))
+        self.assertEqual(results, ['shared', 1, (1, 2, 3, 4), True])
+
+    def test_shared_memory_views_released(self):
+        from jcfg import shared
+        orig_max_views = shared.MAX_ATTACHED_VIEWS
+        shared.MAX_ATTACHED_VIEWS = 2
+        self.addCleanup(setattr, shared, 'MAX_ATTACHED_VIEWS', orig_max_views)
+        shared_cfgs = [SharedJsonCfg(JsonCfg({'a': idx})) for idx in range(3)]
+        try:
+            for shared_cfg in shared_cfgs:
+                # map the memory, as a worker would, instead of reusing the view of the publisher
+                shared.detach_shared_cfg(shared_cfg.name)
+            views = [shared.attach_shared_cfg(shared_cfg.name) for shared_cfg in shared_cfgs]
+            self.assertEqual([view.a for view in views], [0, 1, 2])
+            self.assertEqual(list(shared._attached_views), [shared_cfg.name for shared_cfg in shared_cfgs[1:]])
+            self.assertIs(shared.attach_shared_cfg(shared_cfgs[2].name), views[2])
+            views[2].detach()
+            self.assertEqual(list(shared._attached_views), [shared_cfgs[1].name])
+            self.assertEqual(views[2].a, 2)
+            del views
+        finally:
+            for shared_cfg in shared_cfgs:
+                shared_cfg.close()
+                shared_cfg.unlink()
+
+
+def _is_positive(x):
+    return x > 0
+
+
+def _is_less(limit, x):
+    return x < limit
+
+
+class _Limit(object):
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def check(self, x):
+        return x < self.limit
+
+
+class TestPickle(unittest.TestCase):
+
+    def test_pickle_config(self):
+        cfg = JsonCfg(test_config)
+        cfg.f.f_d.f_d_b = ['x']
+        new_cfg = pickle.loads(pickle.dumps(cfg))
+        self.assertEqual(new_cfg.to_dict(), cfg.to_dict())
+        new_cfg.f.f_d.f_d_b.append('y')
+        self.assertEqual(cfg.f.f_d.f_d_b, ['x'])
+
+    def test_pickle_with_schema(self):
+        meta = {'a': (1, 'desc', lambda x: x > 0), 'b': {'c': 'val'}}
+        schema = JsonCfgSchema(meta)
+        cfg = schema.create()
+        cfg.update({'a': 2, 'b.c': 'new'})
+        data = pickle.dumps(cfg)
+        self.assertNotIn(b'desc', data)
+
+        new_cfg = pickle.loads(data)
+        self.assertEqual(new_cfg.to_dict(), cfg.to_dict())
+        # the validator (a lambda, which can not be pickled) comes from the schema
+        with self.assertRaises(JCfgValidateFailError):
+            new_cfg.a = -1
+
+        from jcfg import json_config
+        del json_config._schema_cache[schema.fingerprint]
+        try:
+            with self.assertRaises(JCfgSchemaNotFoundError):
+                pickle.loads(data)
+        finally:
+            json_config._schema_cache[schema.fingerprint] = schema
+
+    def test_pickle_with_partial_validator(self):
+        from jcfg import json_config
+        import functools
+        schema = JsonCfgSchema({'a': (1, 'desc', functools.partial(_is_less, 10))})
+        data = pickle.dumps(schema.create())
+        # the same schema, built again (e.g. in another process), is found by fingerprint
+        del json_config._schema_cache[schema.fingerprint]
+        same_schema = JsonCfgSchema({'a': (1, 'desc', functools.partial(_is_less, 10))})
+        self.assertEqual(same_schema.fingerprint, schema.fingerprint)
+        self.assertIs(pickle.loads(data)._JsonCfg__schema, same_schema)
+        self.assertNotEqual(JsonCfgSchema({'a': (1, 'desc', functools.partial(_is_less, 5))}).fingerprint,
+                            schema.fingerprint)
+
+    def test_pickle_with_bound_method_validator(self):
+        from jcfg import json_config
+        # bound methods have no signature stable across processes, the meta is pickled instead
+        schema = JsonCfgSchema({'a': (1, 'desc', _Limit(10).check)})
+        self.assertIsNone(schema.fingerprint)
+        cfg = schema.create()
+        cfg.a = 2
+        num_schemas = len(json_config._schema_cache) + len(json_config._unregistered_schemas)
+        for _ in range(5):
+            new_cfg = pickle.loads(pickle.dumps(cfg))
+            self.assertEqual(new_cfg.a, 2)
+            with self.assertRaises(JCfgValidateFailError):
+                new_cfg.a = 20
+            pickle.loads(pickle.dumps(JsonCfg({'b': (1, 'desc', _Limit(10).check)})))
+        self.assertEqual(len(json_config._schema_cache) + len(json_config._unregistered_schemas), num_schemas)
+
+    def test_pickle_value(self):
+        value = JsonCfgValue.create_from_value((1, 'desc', _is_positive))
+        value.set(3)
+        new_value = pickle.loads(pickle.dumps(value))
+        self.assertEqual(new_value.get(), 3)
+        self.assertEqual(new_value.default, 1)
+        self.assertEqual(new_value.get_meta('_desc'), 'desc')
+        self.assertFalse(new_value.validate(-1))
+
+    def test_special_attributes(self):
+        cfg = JsonCfg(test_config)
+        self.assertFalse(hasattr(cfg, '__getstate__x__'))
+        self.assertEqual(JsonCfg(cfg.to_meta()).to_dict(), cfg.to_dict())
+
+
+class TestFastParseArgs(unittest.TestCase):
+
+    def _parse(self, args, fast):
+        cfg = JsonCfg({
+            'a': 1,
+            'b': 1.0,
+            'c': 'val',
+            'd': [1, 2],
+            'e': True,
+            'f': {'f_a': 1, 'input_name': 'x'},
+            '_private': 0,
+        })
+        cfg.parse_args(args=args, fast=fast)
+        return cfg.to_dict()
+
+    def _assert_same(self, args):
+        self.assertEqual(self._parse(args, fast=True), self._parse(args, fast=False))
+
+    def test_same_results(self):
+        self._assert_same([])
+        self._assert_same(['--a', '5', '--f.f_a', '-3', '--b=2.5', '--c', '-', '--e', 'false'])
+        self._assert_same(['--d', 'x', '-1', '--a', '2', '--d'])
+        self._assert_same(['--d', 'x', 'y', '--a=3', '--a', '4'])
+        self._assert_same(['--d=x', '--b', '-.5', '--c', ''])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = os.path.join(tmp_dir, 'config.json')
+            Path(config_path).write_text('{"a": 7, "c": "from_file", "f": {"f_a": 8}}')
+            self._assert_same(['-c', config_path, '--a', '3'])
+            self.assertEqual(self._parse(['-c', config_path, '--a', '3'], fast=True)['c'], 'from_file')
+        # abbreviated option, only handled by argparse
+        self._assert_same(['--f.input', 'y'])
+
+    def test_errors_from_argparse(self):
+        for args in (['-h'], ['--a', 'x'], ['--_private', '1'], ['--f', '1'], ['--not_exist', '1'],
+                     ['--a'], ['positional'], ['--e', 'yes']):
+            for fast in (True, False):
+                with self.assertRaises(SystemExit, msg=args):
+                    self._parse(args, fast)
+
+
+class TestSaveToFile(unittest.TestCase):
+
+    def test_same_output_as_json(self):
+        import json
+        cfg = JsonCfg(dict(test_config, g=[1.5, [2, []], {'y': 1, 'x': 'é'}], h=[]))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_path = os.path.join(tmp_dir, 'config.json')
+            for indent in (4, 0, None, '\t'):
+                for sort_keys in (True, False):
+                    cfg.save_to_file(save_path, indent=indent, sort_keys=sort_keys)
+                    self.assertEqual(Path(save_path).read_text(encoding='utf-8'),
+                                     json.dumps(cfg.to_dict(), indent=indent, sort_keys=sort_keys))
+
+    def test_skip_unchanged(self):
+        cfg = JsonCfg(test_config)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_path = os.path.join(tmp_dir, 'config.json')
+            yaml_path = os.path.join(tmp_dir, 'config.yaml')
+            self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+            self.assertFalse(cfg.save_to_file(save_path, skip_unchanged=True))
+            self.assertTrue(cfg.save_to_file(yaml_path, skip_unchanged=True))
+            self.assertFalse(cfg.save_to_file(yaml_path, skip_unchanged=True))
+            self.assertTrue(cfg.save_to_file(save_path))
+
+            # writes through sub configs mark the whole config as modified
+            cfg.f.f_d.f_d_a = 'x'
+            self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+            self.assertEqual(loader.load_file(save_path)['f']['f_d']['f_d_a'], 'x')
+            cfg.update({'a': 2})
+            self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+            self.assertFalse(cfg.save_to_file(save_path, skip_unchanged=True))
+
+            # the file is written again if it was changed or removed by someone else
+            Path(save_path).write_text('{}')
+            self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+            os.remove(save_path)
+            self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+
+            # copies are tracked separately
+            cfg_copy = cfg.copy()
+            self.assertTrue(cfg_copy.save_to_file(save_path, skip_unchanged=True))
+            cfg_copy.a = 3
+            self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+            self.assertEqual(loader.load_file(save_path)['a'], 2)
+
+            # sub configs are tracked separately from their root
+            self.assertTrue(cfg.f.save_to_file(save_path, skip_unchanged=True))
+            self.assertTrue(cfg.save_to_file(save_path, skip_unchanged=True))
+            self.assertEqual(loader.load_file(save_path)['a'], 2)
+
+            # writes are only skipped on request, lists modified in place are always saved
+            cfg.d.append(5)
+            self.assertTrue(cfg.save_to_file(save_path))
+            self.assertEqual(loader.load_file(save_path)['d'], [1, 2, 3, 4, 5])
+
+            # plain saves are not recorded
+            cfg_copy = cfg.copy()
+            for idx in range(3):
+                cfg_copy.save_to_file(os.path.join(tmp_dir, 'step{}.json'.format(idx)))
+            self.assertIsNone(cfg_copy._JsonCfg__saved_files)
+
+    def test_atomic_save(self):
+        cfg = JsonCfg({'a': 1, 'b': 0})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_path = os.path.join(tmp_dir, 'config.json')
+            cfg.save_to_file(save_path)
+            cfg.b = 2
+            # a value which can not be serialized fails the save half way
+            cfg._get_value_slot('a')._JsonCfgValue__value = object()
+            with self.assertRaises(TypeError):
+                cfg.save_to_file(save_path)
+            self.assertEqual(loader.load_file(save_path), {'a': 1, 'b': 0})
+            self.assertEqual(os.listdir(tmp_dir), ['config.json'])
+
+    def test_save_through_symlink(self):
+        cfg = JsonCfg({'a': 1})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            target_path = os.path.join(tmp_dir, 'target.json')
+            link_path = os.path.join(tmp_dir, 'config.json')
+            Path(target_path).write_text('{}')
+            os.symlink(target_path, link_path)
+            cfg.a = 2
+            cfg.save_to_file(link_path)
+            self.assertTrue(os.path.islink(link_path))
+            self.assertEqual(loader.load_file(target_path), {'a': 2})
+
+
+class TestLayers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, 'config.json')
+        Path(self.config_path).write_text('{"a": 2, "f": {"f_a": 2, "f_b": 2}}')
+        self.cfg = JsonCfg(test_config)
+        self.layers = LayeredJsonCfg(self.cfg)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_precedence_and_provenance(self):
+        layers = self.layers
+        layers.add_file(self.config_path)
+        env = {'APP__F__F_A': '3', 'APP__f__f_d__f_d_b': '["x"]', 'APP__E': 'false', 'OTHER': '1'}
+        layers.add_env('APP', environ=env)
+        layers.add_args(args=['--f.f_a', '4', '--c', 'cli'])
+        layers.add_dict({'c': 'override'}, name='override')
+
+        self.assertEqual((self.cfg.a, self.cfg.f.f_a, self.cfg.f.f_b, self.cfg.c), (2, 4, 2, 'override'))
+        self.assertEqual(self.cfg.f.f_d.f_d_b, ['x'])
+        self.assertFalse(self.cfg.e)
+        self.assertEqual(layers.layer_names, [self.config_path, 'env:APP', 'cli', 'override'])
+        self.assertEqual(layers.source_of('f.f_a'), 'cli')
+        self.assertEqual(layers.source_of('f.f_d.f_d_b'), 'env:APP')
+        self.assertEqual(layers.source_of('b'), 'default')
+        self.assertEqual(layers.sources('f.f_a'), [(self.config_path, 2), ('env:APP', 3), ('cli', 4)])
+        self.assertEqual(layers.provenance()['a'], self.config_path)
+
+        # keys fall back to lower layers, then to values before any layer
+        layers.remove('cli')
+        self.assertEqual((self.cfg.f.f_a, self.cfg.c), (3, 'override'))
+        layers.add_dict({'c': 'new'}, name='override')
+        self.assertEqual(self.cfg.c, 'new')
+        layers.remove('override')
+        self.assertEqual(self.cfg.c, 'val')
+        self.assertEqual(layers.source_of('c'), 'default')
+
+    def test_reload_only_changed(self):
+        layers = self.layers
+        env = {'APP__A': '5'}
+        layers.add_file(self.config_path)
+        layers.add_env('APP', environ=env)
+        self.assertEqual(layers.reload(), {})
+
+        env['APP__A'] = '6'
+        Path(self.config_path).write_text('{"a": 2, "f": {"f_a": 2, "f_b": 7}}')
+        self.assertEqual(layers.reload(), {'a': 6, 'f.f_b': 7})
+        del env['APP__A']
+        self.assertEqual(layers.reload('env:APP'), {'a': 2})
+
+    def test_invalid_layers(self):
+        layers = self.layers
+        layers.add_dict({'a': 3})
+        with self.assertRaises(JCfgValueTypeMismatchError):
+            layers.add_dict({'b': 2.0, 'c': 1})
+        with self.assertRaises(JCfgInvalidValueError):
+            layers.add_env('APP', environ={'APP__A': 'x'})
+        with self.assertRaises(JCfgKeyNotFoundError):
+            layers.add_env('APP', environ={'APP__NOT_EXIST': '1'})
+        # failed layers are not added, and nothing is applied
+        self.assertEqual(layers.layer_names, ['dict:0'])
+        self.assertEqual((self.cfg.a, self.cfg.b), (3, 1.0))
+
+
+class TestTypedList(unittest.TestCase):
+
+    def setUp(self):
+        self.cfg = JsonCfg({
+            'weights': {'_default': [1, 0.5], '_type': 'list[float]', '_desc': 'class weights'},
+            'sub': {'buckets': {'_default': [], '_type': 'list[int32]'}},
+        })
+
+    def test_values(self):
+        cfg = self.cfg
+        self.assertEqual(cfg.weights, array.array('d', [1.0, 0.5]))
+        self.assertEqual(memoryview(cfg.weights).format, 'd')
+        cfg.sub.buckets = (1, 2, 3)
+        self.assertEqual(cfg['sub.buckets'].typecode, 'i')
+        weights = array.array('d', [2.0])
+        cfg.weights = weights
+        self.assertIs(cfg.weights, weights)
+
+        for value in ([1.5], ['1'], 1, 'ab', [2 ** 40]):
+            with self.assertRaises(JCfgValueTypeMismatchError, msg=value):
+                cfg.sub.buckets = value
+        with self.assertRaises(JCfgInvalidValueError):
+            JsonCfg({'a': {'_default': [], '_type': 'list[str]'}})
+
+    def test_convert(self):
+        cfg = self.cfg
+        self.assertEqual(cfg.to_dict(), {'weights': [1.0, 0.5], 'sub': {'buckets': []}})
+        self.assertEqual(cfg.freeze().weights, (1.0, 0.5))
+        cfg_copy = cfg.copy()
+        cfg_copy.weights[0] = 3.0
+        self.assertEqual(cfg.weights[0], 1.0)
+        self.assertEqual(pickle.loads(pickle.dumps(cfg)).weights, cfg.weights)
+        self.assertEqual(JsonCfg(cfg.to_meta()).weights, cfg.weights)
+        self.assertEqual(binary.BinaryCfgView(binary.encode(cfg.items()))['weights'], (1.0, 0.5))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for ext in ('.json', '.yaml'):
+                config_path = os.path.join(tmp_dir, 'config' + ext)
+                cfg.sub.buckets = [4, 5]
+                cfg.save_to_file(config_path)
+                loaded = JsonCfg(cfg.to_meta())
+                loaded.update_from_file(config_path)
+                self.assertEqual(loaded.sub.buckets, array.array('i', [4, 5]))
+
+    def test_parse_args(self):
+        for fast in (True, False):
+            cfg = self.cfg.copy()
+            cfg.parse_args(args=['--sub.buckets', '3', '-1', '--weights=2'], fast=fast)
+            self.assertEqual(cfg.sub.buckets, array.array('i', [3, -1]))
+            self.assertEqual(cfg.weights, array.array('d', [2.0]))
+            with self.assertRaises(SystemExit):
+                cfg.parse_args(args=['--sub.buckets', '1.5'], fast=fast)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = instrument.enable()
+        self.stats.reset()
+
+    def tearDown(self):
+        instrument.disable()
+
+    def test_access_counters(self):
+        cfg = JsonCfg(test_config)
+        cfg.a
+        cfg['a']
+        cfg.f.f_d.f_d_a
+        cfg['f.f_a'] = 3
+        cfg.update({'b': 2.0, 'f': {'f_a': 4}})
+
+        report = self.stats.report(cfg)
+        self.assertEqual(report['reads'], {'a': 2, 'f.f_d.f_d_a': 1})
+        self.assertEqual(report['writes'], {'b': 1, 'f.f_a': 2})
+        self.assertEqual(report['never_read'], [k for k in cfg.keys() if k not in ('a', 'f.f_d.f_d_a')])
+
+    def test_stage_timings(self):
+        cfg = JsonCfg(test_config)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = os.path.join(tmp_dir, 'config.json')
+            cfg.save_to_file(config_path)
+            cfg.update_from_file(config_path)
+            cfg.parse_args(args=['--a', '2'])
+            report_path = os.path.join(tmp_dir, 'report.json')
+            self.stats.dump_report(cfg, report_path)
+            stages = loader.load_file(report_path)['stages']
+        for stage in ('read', 'parse', 'flatten', 'apply'):
+            self.assertEqual(stages['update_from_file.' + stage]['calls'], 1)
+        for stage in ('build', 'parse', 'apply'):
+            self.assertEqual(stages['parse_args.' + stage]['calls'], 1)
+
+    def test_disabled(self):
+        cfg = JsonCfg(test_config)
+        instrument.disable()
+        cfg.a
+        cfg.a = 2
+        self.assertEqual(self.stats.report(cfg)['reads'], {})
+        self.assertEqual(self.stats.report(cfg)['writes'], {})
+        self.assertIsNone(instrument.get_stats())
+
+
+class TestImportTime(unittest.TestCase):
+    # generous budget for `import jcfg`, in microseconds, as reported by `python -X importtime`
+    import_time_budget_us = 50000
+    lazy_modules = ['yaml', 'jstyleson', 'argparse', 'pprint', 'json', 'asyncio']
+
+    def test_import_time(self):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.abspath('..')
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import sys, jcfg; print(" ".join(sys.modules))'],
+            env=env, capture_output=True, text=True, check=True)
+
+        loaded_modules = set(proc.stdout.split())
+        for module in self.lazy_modules:
+            self.assertNotIn(module, loaded_modules, '{} should be imported lazily'.format(module))
+
+        jcfg_line = [line for line in proc.stderr.splitlines() if line.endswith('| jcfg')][-1]
+        cumulative_us = int(jcfg_line.split('|')[1])
+        self.assertLess(cumulative_us, self.import_time_budget_us)
+
+
 if __name__ == '__main__':
     # test_argparser()
     unittest.main()